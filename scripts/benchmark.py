@@ -0,0 +1,523 @@
+# scripts/benchmark.py
+"""
+Micro-benchmarks for hot paths of the realtime pipeline and the trading loop.
+
+Usage:
+    python scripts/benchmark.py                # run every benchmark
+    python scripts/benchmark.py orderbook trades   # run selected benchmarks
+"""
+import os
+import gc
+import sys
+import json
+import math
+import time
+import pickle
+import random
+import asyncio
+import logging
+import tempfile
+import argparse
+from collections import deque
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+# Add project root to path to allow absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccxt.async_support.base.ws.order_book import OrderBook
+from ccxt.base.errors import RateLimitExceeded
+from src.core.native_model import NativeModel, export_native
+from src.core.signal_parser import SignalParser, generate_signals
+from src.logger import logger
+from src.data_fetch import data_source, rate_limit, realtime_manager
+from src.data_fetch.exchange_pool import exchange_pool
+from src.data_fetch.feature_engine import FeatureEngine
+from src.data_fetch.fetch_scheduler import FetchScheduler
+from src.data_fetch.microstructure import OrderBookImbalance, RollingTakerFlow
+from src.data_fetch.replay_exchange import ReplayExchange
+from src.data_fetch.tick_recorder import TickReader, TickRecorder
+from src.shared.feature_store import FeatureStore
+
+def report(name: str, operations: int, seconds: float, unit: str = "updates"):
+    print(f"{name:<50} {operations / seconds:>14,.0f} {unit}/s   ({seconds * 1e6 / operations:.2f} µs/op)")
+
+def make_book_updates(count: int, depth: int = 50, changes_per_update: int = 4, seed: int = 0):
+    """
+    Simulates a busy book: each update changes a few levels near the top. Returns the
+    merged snapshots (as a ccxt.pro client sees them) and the equivalent deltas.
+    """
+    rng = random.Random(seed)
+    mid, tick = 42000.0, 0.5
+    bids = {mid - tick * (i + 1): rng.uniform(0.1, 5.0) for i in range(depth * 2)}
+    asks = {mid + tick * (i + 1): rng.uniform(0.1, 5.0) for i in range(depth * 2)}
+    snapshots, deltas = [], []
+    for _ in range(count):
+        update = []
+        for _ in range(changes_per_update):
+            side, levels = ("bids", bids) if rng.random() < 0.5 else ("asks", asks)
+            offset = tick * (1 + int(rng.expovariate(0.3)))
+            price = mid - offset if side == "bids" else mid + offset
+            size = 0.0 if rng.random() < 0.2 else rng.uniform(0.1, 5.0)
+            if size:
+                levels[price] = size
+            else:
+                levels.pop(price, None)
+            update.append((side, price, size))
+        deltas.append(update)
+        snapshots.append((
+            [[p, bids[p]] for p in sorted(bids, reverse=True)[:depth]],
+            [[p, asks[p]] for p in sorted(asks)[:depth]],
+        ))
+    return snapshots, deltas
+
+def best_of(run, repeats: int = 5) -> float:
+    """Fastest of several timed runs; `run` returns elapsed seconds."""
+    return min(run() for _ in range(repeats))
+
+def bench_orderbook(updates: int = 20000):
+    """Order-book imbalance per tick: list re-sums vs tracked ccxt.pro book vs snapshots."""
+    for changes in (1, 4):
+        print(f"-- {changes} level change(s) per tick --")
+        _bench_orderbook(updates, changes)
+
+def _bench_orderbook(updates: int, changes_per_update: int):
+    snapshots, deltas = make_book_updates(updates, changes_per_update=changes_per_update)
+    first_bids, first_asks = snapshots[0]
+
+    def run_ccxt_book(on_tick=None, bands=None):
+        orderbook = OrderBook({"bids": first_bids, "asks": first_asks}, depth=50)
+        book = OrderBookImbalance(bands) if bands else None
+        if book is not None:
+            book.track(orderbook)
+        started = time.perf_counter()
+        for update in deltas:
+            # ccxt.pro applies each websocket delta to its cached book in every variant
+            for side, price, size in update:
+                orderbook[side].storeArray([price, size])
+            orderbook.limit()
+            if on_tick is not None:
+                on_tick(orderbook, book)
+        return time.perf_counter() - started
+
+    def legacy_tick(orderbook, _):
+        # Previous realtime_manager implementation, one band only
+        total_bid = sum([price * size for price, size in orderbook["bids"]])
+        total_ask = sum([price * size for price, size in orderbook["asks"]])
+        total = total_bid + total_ask
+        _ = (total_bid - total_ask) / total if total > 0 else 0.0
+
+    def legacy_bands_tick(orderbook, _):
+        # The same approach extended to bands 5/10/50
+        bids, asks = orderbook["bids"], orderbook["asks"]
+        for band in (5, 10, 50):
+            total_bid = sum([price * size for price, size in bids[:band]])
+            total_ask = sum([price * size for price, size in asks[:band]])
+            total = total_bid + total_ask
+            _ = (total_bid - total_ask) / total if total > 0 else 0.0
+
+    def tracked_tick(_, book):
+        _ = book.imbalance(5), book.imbalance(10), book.imbalance(50)
+
+    report("orderbook: ccxt book maintenance only", updates, best_of(run_ccxt_book))
+    report("orderbook: + list re-sum per tick, top 50", updates, best_of(lambda: run_ccxt_book(legacy_tick)))
+    report("orderbook: + list re-sums per tick, bands 5/10/50", updates, best_of(lambda: run_ccxt_book(legacy_bands_tick)))
+    report("orderbook: + tracked bands 5/10/50", updates, best_of(lambda: run_ccxt_book(tracked_tick, (5, 10, 50))))
+
+    def run_snapshots():
+        book = OrderBookImbalance()
+        started = time.perf_counter()
+        for bids, asks in snapshots:
+            book.apply_snapshot(bids, asks)
+            _ = book.imbalance(5), book.imbalance(10), book.imbalance(50)
+        return time.perf_counter() - started
+    report("orderbook: plain snapshots, bands 5/10/50", updates, best_of(run_snapshots))
+
+    def run_raw_deltas():
+        book = OrderBookImbalance()
+        for price, size in first_bids:
+            book.apply_delta("bids", price, size)
+        for price, size in first_asks:
+            book.apply_delta("asks", price, size)
+        started = time.perf_counter()
+        for update in deltas:
+            for side, price, size in update:
+                book.apply_delta(side, price, size)
+            _ = book.imbalance(5), book.imbalance(10), book.imbalance(50)
+        return time.perf_counter() - started
+    report("orderbook: raw deltas, bands 5/10/50", updates, best_of(run_raw_deltas))
+
+def make_trade_batches(count: int, batch_size: int = 5, spacing_ms: int = 5, seed: int = 0):
+    """Busy-market trades: `count` trades `spacing_ms` apart, delivered in batches."""
+    rng = random.Random(seed)
+    trades = [{
+        "timestamp": 1_700_000_000_000 + i * spacing_ms,
+        "side": "buy" if rng.random() < 0.5 else "sell",
+        "price": 42000.0,
+        "amount": rng.uniform(0.001, 0.5),
+    } for i in range(count)]
+    for trade in trades:
+        trade["cost"] = trade["price"] * trade["amount"]
+    return [trades[i:i + batch_size] for i in range(0, count, batch_size)]
+
+def bench_trades(count: int = 50000):
+    """Taker flow per trade: old 60s deque re-sum vs ring-buffer windows 10s/60s/5m."""
+    batches = make_trade_batches(count)
+
+    def run_legacy():
+        recent_trades = deque()
+        started = time.perf_counter()
+        for batch in batches:
+            now = batch[-1]["timestamp"]
+            for trade in batch:
+                recent_trades.append(trade)
+            while recent_trades and now - recent_trades[0]["timestamp"] > 60_000:
+                recent_trades.popleft()
+            buy = sum(t["cost"] for t in recent_trades if t["side"] == "buy")
+            sell = sum(t["cost"] for t in recent_trades if t["side"] == "sell")
+            _ = buy / sell if sell > 0 else buy
+        return time.perf_counter() - started
+
+    def run_rolling():
+        flow = RollingTakerFlow((10, 60, 300))
+        started = time.perf_counter()
+        for batch in batches:
+            flow.update(batch)
+            _ = flow.ratio(10), flow.ratio(60), flow.ratio(300)
+        return time.perf_counter() - started
+
+    report("trades: deque re-sum per batch, 60s", count, best_of(run_legacy, repeats=1), unit="trades")
+    report("trades: rolling windows 10s/60s/5m", count, best_of(run_rolling), unit="trades")
+
+def bench_features(count: int = 20000):
+    """Feature publishing: JSON file dump/load vs shared feature-store slots."""
+    symbols = ["BTC", "ETH", "SOL", "DOGE", "XRP", "ADA", "WIF", "1000PEPE"]
+    names = ["order_book_imbalance", "order_book_imbalance_5", "taker_buy_sell_ratio", "taker_buy_sell_ratio_10s"]
+    features = {symbol: {name: 0.1234 for name in names} for symbol in symbols}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "features.json")
+
+        def run_json_dump():
+            started = time.perf_counter()
+            for _ in range(count // 100):
+                with open(json_path, "w") as f:
+                    json.dump(features, f, indent=4)
+            return (time.perf_counter() - started) * 100
+
+        def run_json_load():
+            started = time.perf_counter()
+            for _ in range(count // 100):
+                with open(json_path) as f:
+                    _ = json.load(f)["BTC"]
+            return (time.perf_counter() - started) * 100
+
+        store = FeatureStore.create(os.path.join(tmp, "features.bin"), symbols, names)
+        reader = FeatureStore(os.path.join(tmp, "features.bin"))
+
+        def run_store_write():
+            started = time.perf_counter()
+            for i in range(count):
+                store.write(symbols[i % len(symbols)], features["BTC"])
+            return time.perf_counter() - started
+
+        def run_store_read():
+            started = time.perf_counter()
+            for _ in range(count):
+                _ = reader.read("BTC")
+            return time.perf_counter() - started
+
+        report("features: JSON dump, all symbols", count, best_of(run_json_dump), unit="writes")
+        report("features: store write, one symbol", count, best_of(run_store_write), unit="writes")
+        report("features: JSON load, one symbol", count, best_of(run_json_load), unit="reads")
+        report("features: store read, one symbol", count, best_of(run_store_read), unit="reads")
+        reader.close()
+        store.close()
+
+def bench_engine(count: int = 50000):
+    """Trade features per batch: re-computing each over a 60s deque vs the single-pass engine."""
+    batches = make_trade_batches(count)
+    rng = random.Random(1)
+    for batch in batches:
+        for trade in batch:
+            trade["price"] += rng.uniform(-5.0, 5.0)
+
+    def run_full_passes():
+        recent_trades = deque()
+        started = time.perf_counter()
+        for batch in batches:
+            now = batch[-1]["timestamp"]
+            recent_trades.extend(batch)
+            while recent_trades and now - recent_trades[0]["timestamp"] > 60_000:
+                recent_trades.popleft()
+            # One pass over the window per feature: VWAP, realized volatility, intensity
+            _ = sum(t["cost"] for t in recent_trades) / sum(t["amount"] for t in recent_trades)
+            prices = [t["price"] for t in recent_trades]
+            _ = sum(math.log(b / a) ** 2 for a, b in zip(prices, prices[1:])) ** 0.5
+            _ = sum(1 for t in recent_trades if t["timestamp"] > now - 10_000) / 10
+        return time.perf_counter() - started
+
+    def run_engine():
+        engine = FeatureEngine([("vwap", {"windows": (60,)}), ("realized_volatility", {"windows": (60,)}),
+                                ("trade_intensity", {"windows": (10,)})])
+        started = time.perf_counter()
+        for batch in batches:
+            engine.on_trades(batch)
+            _ = engine.values("trades")
+        return time.perf_counter() - started
+
+    def run_all_features():
+        engine = FeatureEngine(realtime_manager.FEATURE_SPECS)
+        started = time.perf_counter()
+        for batch in batches:
+            engine.on_trades(batch)
+            _ = engine.values("trades")
+        return time.perf_counter() - started
+
+    report("engine: full pass per feature, 3 features", count, best_of(run_full_passes, repeats=1), unit="trades")
+    report("engine: single pass, 3 features", count, best_of(run_engine), unit="trades")
+    report("engine: single pass, all realtime trade features", count, best_of(run_all_features), unit="trades")
+
+    snapshots, deltas = make_book_updates(count // 5)
+    bids, asks = snapshots[0]
+    orderbook = OrderBook({"bids": bids, "asks": asks}, depth=50)
+    engine = FeatureEngine(realtime_manager.FEATURE_SPECS)
+
+    def run_book():
+        started = time.perf_counter()
+        for update in deltas:
+            for side, price, size in update:
+                orderbook[side].storeArray([price, size])
+            orderbook.limit()
+            engine.on_book(orderbook)
+            _ = engine.values("book")
+        return time.perf_counter() - started
+    report("engine: ccxt book + all realtime book features", len(deltas), best_of(run_book))
+
+def bench_recorder(updates: int = 20000):
+    """Tick recording: cost on the event loop per book update, writer throughput and read-back."""
+    snapshots, _ = make_book_updates(updates)
+    books = [{"timestamp": 1_700_000_000_000 + i * 10, "bids": bids, "asks": asks} for i, (bids, asks) in enumerate(snapshots)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Event-loop side alone: the writer thread only starts once everything is queued.
+        # GC is paused because a live queue never holds this many books at once.
+        recorder = TickRecorder(tmp, max_queue=updates + 1)
+        gc.disable()
+        started = time.perf_counter()
+        for book in books:
+            recorder.record_book("BTC", book)
+        enqueued = time.perf_counter() - started
+        gc.enable()
+        report("recorder: copy + enqueue top 50 levels (event loop)", updates, enqueued)
+        started = time.perf_counter()
+        recorder.start().close()
+        report("recorder: diff + encode + write (writer thread)", updates, time.perf_counter() - started)
+
+        size = sum(os.path.getsize(path) for _, path in TickReader(tmp).segments("BTC"))
+        print(f"{'recorder: bytes per update':<50} {size / updates:>14,.1f}")
+
+        reader = TickReader(tmp)
+        def run_read():
+            started = time.perf_counter()
+            for _ in reader.iter_range("BTC"):
+                pass
+            return time.perf_counter() - started
+        report("recorder: read back all records", updates, best_of(run_read), unit="records")
+
+def bench_inference(pairs: int = 35, repeats: int = 20):
+    """Signals for every pair closing on one boundary: one predict per pair vs one per model."""
+    rng = np.random.default_rng(0)
+    columns = ["open", "high", "low", "close", "volume"]
+    X = pd.DataFrame(rng.normal(size=(2000, len(columns))), columns=columns)
+    model = xgb.XGBClassifier(n_estimators=200, max_depth=6, n_jobs=1)
+    model.fit(X, (X["close"] > 0).astype(int))
+    frames = [
+        pd.DataFrame(rng.normal(size=(120, len(columns))), columns=columns)
+        .assign(timestamp=pd.date_range("2024-01-01", periods=120, freq="h"))
+        for _ in range(pairs)
+    ]
+    parser = SignalParser(model)
+    requests = [(parser, frame) for frame in frames]
+
+    def run_single():
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for frame in frames:
+                parser.generate_signal(frame)
+        return time.perf_counter() - started
+
+    def run_batched():
+        started = time.perf_counter()
+        for _ in range(repeats):
+            generate_signals(requests)
+        return time.perf_counter() - started
+
+    # Per-signal logging is not what is being measured
+    level = logger.level
+    logger.setLevel("WARNING")
+    try:
+        report(f"inference: predict per pair ({pairs} pairs)", pairs * repeats, best_of(run_single, repeats=3), unit="signals")
+        report(f"inference: one batched predict ({pairs} pairs)", pairs * repeats, best_of(run_batched, repeats=3), unit="signals")
+    finally:
+        logger.setLevel(level)
+
+def bench_model_format(loads: int = 20, predictions: int = 2000):
+    """Pickled sklearn wrapper vs native booster + manifest: load time and per-signal predict."""
+    rng = np.random.default_rng(0)
+    columns = ["open", "high", "low", "close", "volume"]
+    X = pd.DataFrame(rng.normal(size=(2000, len(columns))), columns=columns)
+    model = xgb.XGBClassifier(n_estimators=200, max_depth=6, n_jobs=1)
+    model.fit(X, (X["close"] > 0).astype(int))
+    frame = pd.DataFrame(rng.normal(size=(120, len(columns))), columns=columns)
+    row = SignalParser.features(frame)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path, native_path = os.path.join(tmp, "model.pkl"), os.path.join(tmp, "model.ubj")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(model, f)
+        export_native(model, native_path, columns)
+        print(f"model files: pickle {os.path.getsize(pickle_path) / 1024:.0f} KiB, "
+              f"native {os.path.getsize(native_path) / 1024:.0f} KiB")
+
+        def load_pickle():
+            started = time.perf_counter()
+            for _ in range(loads):
+                with open(pickle_path, "rb") as f:
+                    pickle.load(f)
+            return time.perf_counter() - started
+
+        def load_native():
+            started = time.perf_counter()
+            for _ in range(loads):
+                NativeModel.load(native_path)
+            return time.perf_counter() - started
+
+        report("model load: pickle", loads, best_of(load_pickle, repeats=3), unit="loads")
+        report("model load: native .ubj + manifest", loads, best_of(load_native, repeats=3), unit="loads")
+        native = NativeModel.load(native_path)
+
+    assert (native.predict_proba(frame) - model.predict_proba(frame)).max() < 1e-5
+
+    def predict_with(m):
+        def run():
+            started = time.perf_counter()
+            for _ in range(predictions):
+                m.predict(row)
+                m.predict_proba(row)
+            return time.perf_counter() - started
+        return run
+
+    report("predict: sklearn wrapper (DMatrix)", predictions, best_of(predict_with(model), repeats=3), unit="signals")
+    report("predict: native inplace_predict", predictions, best_of(predict_with(native), repeats=3), unit="signals")
+
+def bench_fetch(symbols: int = 8, candles: int = 6000, rate: float = 20.0, latency: float = 0.02):
+    """
+    History fetch against rate-limited replay exchanges: every job gathered at once with
+    the exchange fallback chain (the old burst) vs FetchScheduler with shared budgets.
+    """
+    start_ms = 1_704_067_200_000
+    bars = [[start_ms + i * 60_000, 100.0, 101.0, 99.0, 100.0, 1.0] for i in range(candles)]
+    keys = [f"SYM{i}" for i in range(symbols)]
+    timeframes = ["1m", "5m", "15m", "1h"]  # the old per-timeframe jobs
+    since = datetime.utcfromtimestamp(start_ms / 1000)
+
+    class CountingExchange(ReplayExchange):
+        rejected = 0
+
+        async def _request(self, method):
+            try:
+                await super()._request(method)
+            except RateLimitExceeded:
+                self.rejected += 1
+                raise
+
+    def make_exchanges():
+        # One instance per exchange id: its rate limit is the exchange's, whoever calls it
+        return {ex: CountingExchange(ex, ohlcv={(f"{key}USDT", "1m"): bars for key in keys},
+                                     latency=latency, rate_limit=rate) for ex in data_source.EXCHANGES}
+
+    async def legacy_job(exchanges, symbol, timeframe):
+        """Pages like fetch_ohlcv_pages, falling back on errors, with no shared throttle."""
+        fetched, cursor = 0, int(since.timestamp() * 1000)
+        while True:
+            for ex in data_source.EXCHANGES:
+                try:
+                    page = await exchanges[ex].fetch_ohlcv(f"{symbol}/USDT", timeframe, cursor, limit=1000)
+                    break
+                except Exception:
+                    continue
+            else:
+                return fetched, False  # every exchange refused: the job gives up
+            if not page:
+                return fetched, True
+            fetched += len(page)
+            cursor = page[-1][0] + 1
+
+    async def run_legacy(exchanges):
+        results = await asyncio.gather(*(legacy_job(exchanges, key, tf) for key in keys for tf in timeframes))
+        return sum(n for n, _ in results), sum(not complete for _, complete in results)
+
+    async def run_scheduled(exchanges):
+        async def job(symbol, timeframe):
+            fetched = 0
+            async for page in data_source.fetch_ohlcv_pages(symbol, timeframe, since):
+                fetched += len(page)
+            return fetched
+
+        exchange_pool.factory = lambda exchange_id, config: exchanges[exchange_id]
+        scheduler = FetchScheduler()
+        for key in keys:
+            for tf in timeframes:
+                scheduler.submit(key, tf, lambda s=key, t=tf: job(s, t))
+        results = await scheduler.run()
+        await exchange_pool.close_all()
+        return sum(r.candles for r in results), sum(r.error is not None for r in results)
+
+    def measure(name, run):
+        exchanges = make_exchanges()
+        rate_limit._budgets.clear()
+        data_source.latency_stats = data_source.ExchangeLatencyStats()
+        started = time.perf_counter()
+        fetched, incomplete = asyncio.run(run(exchanges))
+        seconds = time.perf_counter() - started
+        requests = sum(ex.calls.get("fetch_ohlcv", 0) for ex in exchanges.values())
+        rejected = sum(ex.rejected for ex in exchanges.values())
+        report(name, fetched, seconds, unit="candles")
+        print(f"{'':<50} {fetched}/{expected} candles, {requests} requests ({rejected} rate-limited), "
+              f"{incomplete} incomplete jobs")
+
+    # Per-request logging is not what is being measured
+    expected = symbols * sum(-(-candles * 60_000 // ms) for ms in (60_000, 300_000, 900_000, 3_600_000))
+    factory = exchange_pool.factory
+    logging.disable(logging.ERROR)
+    try:
+        print(f"fetch: {symbols * len(timeframes)} jobs, {expected} candles, {rate:.0f} requests/s per exchange")
+        measure("fetch: gather all jobs, fallback on rate limit", run_legacy)
+        measure("fetch: FetchScheduler + shared budgets", run_scheduled)
+    finally:
+        logging.disable(logging.NOTSET)
+        exchange_pool.factory = factory
+
+BENCHMARKS = {
+    "orderbook": bench_orderbook,
+    "trades": bench_trades,
+    "features": bench_features,
+    "engine": bench_engine,
+    "recorder": bench_recorder,
+    "inference": bench_inference,
+    "model_format": bench_model_format,
+    "fetch": bench_fetch,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run realtime pipeline micro-benchmarks.")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all). Choices: {', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
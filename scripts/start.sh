@@ -71,6 +71,10 @@ fi
 # --- 4. Launch Background Services ---
 log "--- Launching Application Services ---"
 
+# Launch the event bus broker that relays pushed events between the services below
+log "🚀 Launching event bus broker..."
+python -m src.shared.event_bus &
+
 # Launch the scheduler for retraining and sending alerts
 log "🚀 Launching background scheduler..."
 python -m src.scheduler.retrain_scheduler &
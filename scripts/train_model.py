@@ -5,51 +5,52 @@ import pandas as pd
 import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
-import joblib
-from ta import add_all_ta_features
 
 # Add project root to path to allow absolute imports
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from src.core.model_registry import model_filename, write_checksum
+from src.core.native_model import export_native
+from src.data_fetch.candle_store import candle_store
+from src.shared.indicators import add_indicators
+
 # --- Configuration ---
-DATA_DIR = "/workspace/data/history"
 OUTPUT_DIR = "/workspace/models_data"
+# Shortest gap-free window worth computing indicators on
+MIN_WINDOW_CANDLES = 100
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """Adds technical analysis features and a target column to the dataframe."""
-    df = add_all_ta_features(
-        df, open="open", high="high", low="low", close="close", volume="volume", fillna=True
-    )
+    df = add_indicators(df)  # the same features the trade loop predicts on
     # Target: 1 if next candle's close is higher, -1 if lower/same
     df['target'] = (df['close'].shift(-1) > df['close']).astype(int).replace(0, -1)
     df.dropna(inplace=True)
     return df
 
-def simulate_10m_from_1m(symbol: str) -> pd.DataFrame | None:
-    """Generates a 10m dataframe from 1m data if available."""
-    try:
-        path_1m = os.path.join(DATA_DIR, f"{symbol}USDT_1m.csv")
-        if not os.path.exists(path_1m):
-            logging.warning(f"1m data for {symbol} not found, cannot simulate 10m.")
-            return None
-
-        df_1m = pd.read_csv(path_1m)
-        df_1m['timestamp'] = pd.to_datetime(df_1m['timestamp'])
-        df_1m.set_index('timestamp', inplace=True)
+def load_clean_windows(symbol: str, tf: str) -> pd.DataFrame | None:
+    """
+    Loads stored candles and computes indicators separately for each gap-free window
+    from the coverage index, so gaps and invalid rows never leak into indicators or
+    targets. Windows shorter than MIN_WINDOW_CANDLES are skipped.
+    """
+    df = candle_store.read(symbol, tf)
+    if df.empty:
+        return None
 
-        df_10m = df_1m.resample('10T').agg({
-            'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
-        }).dropna().reset_index()
+    windows = candle_store.windows(symbol, tf, min_candles=MIN_WINDOW_CANDLES)
+    frames = []
+    for start, end in windows:
+        window = df[(df['timestamp'] >= start) & (df['timestamp'] <= end)].reset_index(drop=True)
+        frames.append(compute_indicators(window))
 
-        logging.info(f"Successfully simulated 10m timeframe for {symbol}.")
-        return df_10m
-    except Exception as e:
-        logging.warning(f"10m simulation failed for {symbol}: {e}")
-        return None
+    used = sum(len(f) for f in frames)
+    if used < len(df):
+        logging.info(f"🩹 {symbol}-{tf}: using {len(windows)} clean window(s), {len(df) - used} candles skipped.")
+    return pd.concat(frames, ignore_index=True) if frames else None
 
 def train_model(symbol: str, tf: str, df: pd.DataFrame):
     """Trains and saves a single XGBoost model."""
@@ -80,8 +81,10 @@ def train_model(symbol: str, tf: str, df: pd.DataFrame):
         preds = model.predict(X_test)
         acc = accuracy_score(y_test, preds)
 
-        model_path = os.path.join(OUTPUT_DIR, f"{symbol}USDT_{tf}_model.pkl")
-        joblib.dump(model, model_path)
+        # Native booster plus feature manifest: loads without pickle and predicts in place
+        model_path = os.path.join(OUTPUT_DIR, model_filename(symbol, tf))
+        export_native(model, model_path, features)
+        write_checksum(model_path)  # verified by the trade loop's model registry before loading
 
         logging.info(f"✅ {symbol}-{tf} model trained and saved. Accuracy: {acc:.4f}")
     except Exception as e:
@@ -111,20 +114,11 @@ def train_all():
     for symbol, timeframes in training_plan.items():
         logging.info(f"--- Processing symbol: {symbol} ---")
         for tf in timeframes:
-            df = None
-            # Handle the simulated 10m timeframe differently
-            if tf == '10m':
-                df = simulate_10m_from_1m(symbol)
+            # Every timeframe, including the resampled ones, comes from the candle store
+            df_features = load_clean_windows(symbol, tf)
+            if df_features is None:
+                logging.warning(f"⛔ No usable stored candles, cannot train model: {symbol}-{tf}")
             else:
-                # Load data from CSV for all other timeframes
-                csv_path = os.path.join(DATA_DIR, f"{symbol}USDT_{tf}.csv")
-                if os.path.exists(csv_path):
-                    df = pd.read_csv(csv_path)
-                else:
-                    logging.warning(f"⛔ Data file missing, cannot train model: {csv_path}")
-
-            if df is not None and not df.empty:
-                df_features = compute_indicators(df)
                 train_model(symbol, tf, df_features)
 
     logging.info("🏁 Model training cycle finished.")
@@ -45,10 +45,63 @@ class Config:
     SYMBOL = 'BTC/USDT'
     TIMEFRAME = '1h'
     TRADE_AMOUNT = 0.001 # Example amount in BTC
+    # (symbol, timeframe) pairs one TradeLoop trades concurrently, e.g. "BTC:1h,ETH:15m,SOL:5m";
+    # "all" trades every pair with a trained model in MODELS_DIR. Defaults to SYMBOL on TIMEFRAME.
+    TRADING_PAIRS = os.getenv("TRADING_PAIRS", f"{SYMBOL.split('/')[0]}:{TIMEFRAME}")
+    # Per-symbol order sizes, e.g. "ETH=0.01,SOL=0.5"; other symbols trade TRADE_AMOUNT
+    TRADE_AMOUNTS = {
+        symbol: float(amount) for symbol, amount in
+        (item.split("=") for item in os.getenv("TRADE_AMOUNTS", "").split(",") if "=" in item)
+    }
+    # Seconds before a candle fetch is also sent to the next fallback exchange
+    FETCH_HEDGE_DELAY_SECONDS = float(os.getenv("FETCH_HEDGE_DELAY_SECONDS", 1.5))
+    # Seconds after a candle boundary before the trade loop fetches it over REST (unless streamed), so the
+    # exchange has finalised it
+    CANDLE_SETTLE_SECONDS = float(os.getenv("CANDLE_SETTLE_SECONDS", 2))
+    # Stream the traded pairs' candles over websocket (watch_ohlcv) instead of fetching each close over REST
+    ENABLE_CANDLE_STREAM = os.getenv("ENABLE_CANDLE_STREAM", "true").lower() in ("true", "1")
+    # Seconds between checks for retrained models to hot-reload into the trade loop (0 disables)
+    MODEL_RELOAD_SECONDS = float(os.getenv("MODEL_RELOAD_SECONDS", 60))
+
+    # --- Data Fetching ---
+    # Maximum candle fetch jobs in flight during backfills
+    FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", 4))
+    # Optional per-exchange rate overrides in requests/second, e.g. "bybit=8,binance=15"
+    FETCH_RATE_LIMITS = {
+        name.strip(): float(rate) for name, rate in
+        (item.split("=") for item in os.getenv("FETCH_RATE_LIMITS", "").split(",") if "=" in item)
+    }
+    # Worker processes the realtime feature manager splits SYMBOLS across
+    REALTIME_SHARDS = int(os.getenv("REALTIME_SHARDS", 1))
+    # Directory for recorded order book and trade segments; empty disables recording
+    TICK_RECORDER_DIR = os.getenv("TICK_RECORDER_DIR", "")
+
+    # --- Exchange Replay (offline testing) ---
+    # Directory of recorded fixtures; when set, every exchange client is an offline replay
+    EXCHANGE_REPLAY_DIR = os.getenv("EXCHANGE_REPLAY_DIR", "")
+    EXCHANGE_REPLAY_LATENCY = float(os.getenv("EXCHANGE_REPLAY_LATENCY", 0.0))
+    EXCHANGE_REPLAY_JITTER = float(os.getenv("EXCHANGE_REPLAY_JITTER", 0.0))
+    EXCHANGE_REPLAY_ERROR_RATE = float(os.getenv("EXCHANGE_REPLAY_ERROR_RATE", 0.0))
+    # Requests/second before the replay raises RateLimitExceeded; unset means unlimited
+    EXCHANGE_REPLAY_RATE_LIMIT = float(os.getenv("EXCHANGE_REPLAY_RATE_LIMIT") or 0) or None
+    # Stream playback speed multiplier; unset replays as fast as possible
+    EXCHANGE_REPLAY_SPEED = float(os.getenv("EXCHANGE_REPLAY_SPEED") or 0) or None
+
+    # --- Performance ---
+    # Memory budget for models kept loaded by the trade loop's model registry
+    MODEL_CACHE_MB = float(os.getenv("MODEL_CACHE_MB", 1024))
+    # Journal of queued database writes, replayed on restart
+    WRITE_BEHIND_JOURNAL = os.getenv("WRITE_BEHIND_JOURNAL", "/workspace/data/write_behind.jsonl")
+    # Cycles slower than this many seconds log their span breakdown
+    TRACE_SLOW_CYCLE_SECONDS = float(os.getenv("TRACE_SLOW_CYCLE_SECONDS", 5))
+    # Unix socket of the event bus broker; empty disables the bus
+    EVENT_BUS_SOCKET = os.getenv("EVENT_BUS_SOCKET", "/workspace/data/event_bus.sock")
 
     # --- System Paths (CORRECTED) ---
     MODEL_PATH = "/workspace/models/model.pkl"
     BACKUP_MODEL_PATH = "/workspace/models/backup_model.pkl"
+    # Per-pair models written by scripts/train_model.py as {SYMBOL}USDT_{timeframe}_model.ubj
+    MODELS_DIR = "/workspace/models_data"
     ALERT_FLAG_PATH = "/workspace/data/alerts_on.flag"
     
     # --- Logging ---
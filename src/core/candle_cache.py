@@ -0,0 +1,110 @@
+# src/core/candle_cache.py
+"""
+Rolling in-memory candle buffer for one traded (symbol, timeframe) pair.
+
+The buffer is warmed once from the local candle store and then extended each cycle
+with only the candles that closed since the last one, instead of re-downloading days
+of history to use the last row. With a candle stream running, closed candles are
+pushed in and the fetch is skipped altogether. Only closed candles are kept, so the
+model never sees the few seconds of a candle that has just opened. A failed fetch
+leaves the buffer as it was; the next successful one catches up on every candle in
+between.
+"""
+import numpy as np
+import pandas as pd
+from src.logger import logger
+from src.core.tracing import span
+from src.data_fetch.candle_store import CANDLE_COLUMNS
+from src.data_fetch.data_source import fetch_ohlcv_data
+from src.shared.timeframes import floor_timestamp_ms, timeframe_to_ms
+
+DEFAULT_CANDLES = 120
+MAX_FETCH_CANDLES = 1000
+
+class CandleCache:
+    def __init__(self, symbol: str, timeframe: str, size: int = DEFAULT_CANDLES):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.size = size
+        self.tf_ms = timeframe_to_ms(timeframe)
+        self._timestamps = np.empty(0, dtype="int64")  # candle open times, ms
+        self._values = np.empty((0, len(CANDLE_COLUMNS) - 1), dtype="float64")
+        self._frame = None
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    @property
+    def last_timestamp_ms(self) -> int | None:
+        return int(self._timestamps[-1]) if len(self._timestamps) else None
+
+    def _merge(self, df: pd.DataFrame, now_ms: int) -> int:
+        """Adds the closed candles of `df`, replacing overlapping ones; returns how many are new."""
+        timestamps = pd.to_datetime(df["timestamp"]).to_numpy("datetime64[ms]").astype("int64")
+        closed = timestamps + self.tf_ms <= now_ms
+        return self._add(timestamps[closed], df[CANDLE_COLUMNS[1:]].to_numpy("float64")[closed])
+
+    def _add(self, timestamps: np.ndarray, values: np.ndarray) -> int:
+        if not len(timestamps):
+            return 0
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, values = timestamps[order], values[order]
+        last = self.last_timestamp_ms
+        added = int((timestamps > last).sum()) if last is not None else len(timestamps)
+        keep = self._timestamps < timestamps[0]
+        self._timestamps = np.concatenate([self._timestamps[keep], timestamps])[-self.size:]
+        self._values = np.concatenate([self._values[keep], values])[-self.size:]
+        self._frame = None
+        return added
+
+    def push(self, candle) -> bool:
+        """Adds one closed `[open_ms, o, h, l, c, v]` candle pushed by a stream; False if it was not new."""
+        return self._add(np.array([candle[0]], dtype="int64"), np.array([candle[1:6]], dtype="float64")) > 0
+
+    def warm(self, store, now_ms: int) -> int:
+        """Loads the newest stored candles; returns how many were loaded."""
+        try:
+            loaded = self._merge(store.tail(self.symbol, self.timeframe, self.size), now_ms)
+        except Exception as e:
+            logger.warning(f"Could not warm {self.symbol}-{self.timeframe} candles from local history: {e}")
+            return 0
+        logger.info(f"Warmed {loaded} {self.symbol}-{self.timeframe} candles from local history.")
+        return loaded
+
+    def is_current(self, now_ms: int) -> bool:
+        """True when the buffer ends with the last candle closed at `now_ms`."""
+        return self.last_timestamp_ms == floor_timestamp_ms(now_ms, self.timeframe) - self.tf_ms
+
+    async def refresh(self, now_ms: int, hedge_delay: float | None = None) -> bool:
+        """
+        Fetches the candles closed since the buffer's newest one. Returns whether the
+        buffer is current afterwards; on a failed fetch it keeps its previous contents.
+        """
+        if self.is_current(now_ms):
+            return True
+        last = self.last_timestamp_ms
+        missing = (now_ms - last) // self.tf_ms if last is not None else None
+        if missing is None or missing >= MAX_FETCH_CANDLES:
+            # Cold or too far behind to catch up: start over from the last `size` candles
+            since_ms, limit = floor_timestamp_ms(now_ms, self.timeframe) - self.size * self.tf_ms, self.size + 1
+        else:
+            since_ms, limit = last + self.tf_ms, missing + 1
+        with span("fetch"):
+            df = await fetch_ohlcv_data(
+                symbol=self.symbol, timeframe=self.timeframe,
+                since=pd.Timestamp(since_ms, unit="ms", tz="UTC").to_pydatetime(),
+                limit=limit, hedge_delay=hedge_delay
+            )
+        if df is None or df.empty:
+            logger.warning(f"Candle refresh failed for {self.symbol}-{self.timeframe}; keeping {len(self)} cached candles.")
+            return False
+        added = self._merge(df, now_ms)
+        logger.debug(f"Added {added} {self.symbol}-{self.timeframe} candles to the cache.")
+        return self.is_current(now_ms)
+
+    def frame(self) -> pd.DataFrame:
+        """The buffered candles, oldest first, as a DataFrame with the candle store's columns."""
+        if self._frame is None:
+            self._frame = pd.DataFrame(self._values, columns=CANDLE_COLUMNS[1:])
+            self._frame.insert(0, "timestamp", self._timestamps.astype("datetime64[ms]"))
+        return self._frame
@@ -0,0 +1,82 @@
+# src/core/candle_scheduler.py
+"""
+Candle-close scheduling for any ccxt timeframe.
+
+One heap holds the next close of every timeframe, so a loop trading 1m, 15m and 1h
+candles sleeps once until the earliest close and wakes with all the timeframes that
+close on it. Boundaries are computed from the epoch, not from "now + timeframe", so
+the time spent fetching and trading never makes the schedule drift. Each close is
+acted on `settle_seconds` late to give the exchange time to finalise the candle.
+
+After a stall (a long cycle, a suspended host) several boundaries may have passed;
+they are reported as missed and only the latest close of each timeframe is acted on.
+"""
+import time
+import heapq
+import asyncio
+from dataclasses import dataclass, field
+from src.logger import logger
+from src.shared.timeframes import floor_timestamp_ms, timeframe_to_ms
+
+DEFAULT_SETTLE_SECONDS = 2.0
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+def next_close(timeframe: str, timestamp_ms: int) -> int:
+    """Close time (= next candle's open) of the `timeframe` candle containing `timestamp_ms`."""
+    return floor_timestamp_ms(timestamp_ms, timeframe) + timeframe_to_ms(timeframe)
+
+@dataclass
+class Boundary:
+    """Timeframes whose candles closed, acted on together."""
+    close_ms: int  # latest close among `timeframes`
+    timeframes: list[str]
+    missed: dict[str, int] = field(default_factory=dict)  # timeframe -> boundaries skipped after a stall
+
+class CandleScheduler:
+    def __init__(self, timeframes, settle_seconds: float = DEFAULT_SETTLE_SECONDS, start_ms: int | None = None):
+        self.timeframes = list(dict.fromkeys(timeframes))
+        if not self.timeframes:
+            raise ValueError("CandleScheduler needs at least one timeframe.")
+        self.settle_ms = int(settle_seconds * 1000)
+        start_ms = now_ms() if start_ms is None else start_ms
+        self._heap = [(next_close(tf, start_ms), tf) for tf in self.timeframes]
+        heapq.heapify(self._heap)
+
+    def peek(self) -> tuple[int, list[str]]:
+        """The next close time and every timeframe closing on it."""
+        close_ms = self._heap[0][0]
+        return close_ms, sorted((tf for ms, tf in self._heap if ms == close_ms), key=self.timeframes.index)
+
+    def due_ms(self) -> int:
+        """When the next close is due to be acted on (close + settle delay)."""
+        return self._heap[0][0] + self.settle_ms
+
+    def pop(self, timestamp_ms: int | None = None, settle: bool = True) -> Boundary | None:
+        """
+        Takes every timeframe whose close is due at `timestamp_ms` (now by default) and
+        reschedules it; None if nothing is due yet. `settle=False` skips the settle delay,
+        for callers that already know the candle closed (e.g. from a candle-closed event).
+        """
+        cutoff = (now_ms() if timestamp_ms is None else timestamp_ms) - (self.settle_ms if settle else 0)
+        closes, missed = {}, {}
+        while self._heap and self._heap[0][0] <= cutoff:
+            close_ms, tf = heapq.heappop(self._heap)
+            latest = floor_timestamp_ms(cutoff, tf)
+            skipped = (latest - close_ms) // timeframe_to_ms(tf)
+            if skipped:
+                missed[tf] = skipped
+            closes[tf] = latest
+            heapq.heappush(self._heap, (latest + timeframe_to_ms(tf), tf))
+        if not closes:
+            return None
+        if missed:
+            logger.warning(f"Missed candle boundaries after a stall: {missed}; acting on the latest closes only.")
+        return Boundary(max(closes.values()), [tf for tf in self.timeframes if tf in closes], missed)
+
+    async def wait(self) -> Boundary:
+        """Sleeps until the next close is due and returns it."""
+        while (boundary := self.pop()) is None:
+            await asyncio.sleep(max(self.due_ms() - now_ms(), 0) / 1000)
+        return boundary
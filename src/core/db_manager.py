@@ -1,6 +1,6 @@
 # src/core/db_manager.py
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from tenacity import retry, stop_after_attempt, wait_exponential
 from src.logger import setup_logger
 
@@ -119,4 +119,30 @@ class DBManager:
         """
         params = (context['symbol'], context['timeframe'], context['signal'], context.get('confidence', 0))
         self.execute_query(query, params)
-        logger.info(f"🔮 Logged prediction for {context['symbol']} with {context.get('confidence', 0):.2f}% confidence.")
\ No newline at end of file
+        logger.info(f"🔮 Logged prediction for {context['symbol']} with {context.get('confidence', 0):.2f}% confidence.")
+
+    def write_batch(self, trades=(), predictions=()):
+        """
+        Inserts many trades and predictions in one transaction.
+
+        Args:
+            trades: (timestamp, symbol, type, price, amount, status) tuples.
+            predictions: (timestamp, symbol, timeframe, signal, confidence) tuples.
+        """
+        try:
+            if self.conn is None or self.conn.closed:
+                logger.warning("Connection was closed. Reconnecting...")
+                self.connect()
+
+            with self.conn.cursor() as cursor:
+                if trades:
+                    execute_values(cursor, "INSERT INTO trades (timestamp, symbol, type, price, amount, status) VALUES %s", trades)
+                if predictions:
+                    execute_values(cursor, "INSERT INTO predictions (timestamp, symbol, timeframe, signal, confidence) VALUES %s", predictions)
+            self.conn.commit()
+        except (psycopg2.DatabaseError, psycopg2.OperationalError) as e:
+            logger.error(f"Batch insert of {len(trades)} trades and {len(predictions)} predictions failed: {e}")
+            if not self.conn.closed:
+                self.conn.rollback()
+            raise
+        logger.info(f"📝 Logged {len(trades)} trades and {len(predictions)} predictions.")
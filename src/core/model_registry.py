@@ -0,0 +1,301 @@
+# src/core/model_registry.py
+"""
+Registry of the per-pair models written by scripts/train_model.py.
+
+`discover()` indexes `{SYMBOL}USDT_{timeframe}_model.ubj` files (native XGBoost, see
+`native_model`) by (symbol, timeframe), so lookups are a dict access; older `.pkl`
+models are used for pairs without a native one. Models are only loaded on first use, after their
+SHA-256 matches the `.sha256` sidecar written next to them at training time, and are
+kept in an LRU bounded by `max_bytes`. The model file's size stands in for its memory
+footprint; the most recently used model is always kept, even if it alone is larger.
+
+Retrained models are hot-reloaded: `reload_changed()` (run off the event loop) notices
+files whose mtime, size or sidecar changed, loads and validates the new model and
+stages it; `promote()` then swaps the staged models in at once, between trading cycles.
+The model a pair first loads, and every model that passes validation after it, is
+snapshotted to the pair's backup file (`<model>.bak`, owned by the registry). A model
+that fails verification or validation is not retried until its file changes again;
+the pair keeps the model it already has in memory, and later loads come from the
+backup, or from a read-only fallback given to `register()` while there is none yet.
+"""
+import io
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+import joblib
+from src.config import config
+from src.logger import logger
+from src.core.model_validator import get_checksum, get_file_checksum
+from src.core.native_model import MANIFEST_SUFFIX, NATIVE_SUFFIX, NativeModel
+from src.core.tracing import span
+
+CHECKSUM_SUFFIX = ".sha256"
+BACKUP_SUFFIX = ".bak"
+MODEL_FILE_PATTERN = re.compile(r"^(?P<symbol>[A-Z0-9]+)USDT_(?P<timeframe>\d+[mhdw])_model(?P<suffix>\.pkl|\.ubj)$")
+
+def model_filename(symbol: str, timeframe: str, suffix: str = NATIVE_SUFFIX) -> str:
+    return f"{symbol}USDT_{timeframe}_model{suffix}"
+
+def _checksum(data: bytes, manifest: bytes | None) -> str:
+    return get_checksum(data) if manifest is None else get_checksum(data, manifest)
+
+def _read_model_files(model_path: str, native: bool) -> tuple[bytes, bytes | None]:
+    with open(model_path, "rb") as f:
+        data = f.read()
+    if not native:
+        return data, None
+    with open(model_path + MANIFEST_SUFFIX, "rb") as f:
+        return data, f.read()
+
+def write_checksum(model_path: str, checksum: str | None = None) -> str:
+    """Writes the SHA-256 of the model (and its manifest, if it has one) to its `.sha256` sidecar; returns it."""
+    if checksum is None:
+        manifest = [model_path + MANIFEST_SUFFIX] if os.path.exists(model_path + MANIFEST_SUFFIX) else []
+        checksum = get_file_checksum(model_path, *manifest)
+        if checksum is None:
+            raise FileNotFoundError(f"Cannot checksum {model_path}: file missing")
+    _write_atomic(model_path + CHECKSUM_SUFFIX, (checksum + "\n").encode())
+    return checksum
+
+def _write_atomic(path: str, data: bytes):
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+def _fingerprint(path: str) -> tuple:
+    """Changes whenever the model file, its manifest or its checksum sidecar is rewritten."""
+    stat = os.stat(path)
+    sidecars = []
+    for suffix in (MANIFEST_SUFFIX, CHECKSUM_SUFFIX):
+        try:
+            sidecars.append(os.stat(path + suffix).st_mtime_ns)
+        except FileNotFoundError:
+            sidecars.append(None)
+    return stat.st_mtime_ns, stat.st_size, *sidecars
+
+def read_checksum(model_path: str) -> str | None:
+    try:
+        with open(model_path + CHECKSUM_SUFFIX) as f:
+            return f.read().split()[0]
+    except (FileNotFoundError, IndexError):
+        return None
+
+class ModelIntegrityError(ValueError):
+    """A model file does not match its recorded checksum."""
+
+@dataclass
+class ModelEntry:
+    path: str
+    size: int
+    fingerprint: tuple  # of `path` when it was last looked at
+    backup_path: str  # written by the registry
+    source: str  # file loads read: `path`, or `backup_path` (or `fallback_path`) after a rollback
+    backed_up: bool = False  # `backup_path` holds a good model
+    fallback_path: str | None = None  # never written; rolled back to only without a backup
+
+    def is_native(self, source: str) -> bool:
+        # The backup takes the model's format; a fallback has its own
+        return (source if source == self.fallback_path else self.path).endswith(NATIVE_SUFFIX)
+
+class ModelRegistry:
+    def __init__(self, models_dir: str, max_bytes: int = int(config.MODEL_CACHE_MB * 1024 * 1024),
+                 require_checksum: bool = False):
+        """
+        Args:
+            models_dir: Directory scanned for per-pair model files.
+            max_bytes: Budget for loaded models, measured by their file sizes.
+            require_checksum: Refuse models without a sidecar instead of loading them with a warning.
+        """
+        self.models_dir = models_dir
+        self.max_bytes = max_bytes
+        self.require_checksum = require_checksum
+        self._entries: dict[tuple[str, str], ModelEntry] = {}
+        self._loaded: OrderedDict[tuple[str, str], tuple[object, int]] = OrderedDict()  # model, size
+        self._staged: dict[tuple[str, str], tuple[object, ModelEntry]] = {}
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.rollbacks = 0
+
+    def register(self, symbol: str, timeframe: str, path: str, fallback_path: str | None = None):
+        """
+        Adds or replaces the model file for a pair (e.g. a model outside `models_dir`).
+        The model is snapshotted to `<path>.bak` when it is first loaded; an existing
+        `fallback_path` (e.g. an operator's backup model) is only read, as the rollback
+        target while there is no snapshot yet.
+        """
+        fingerprint = _fingerprint(path)
+        fallback_path = fallback_path if fallback_path is not None and os.path.exists(fallback_path) else None
+        entry = ModelEntry(path, fingerprint[1], fingerprint, path + BACKUP_SUFFIX, path, fallback_path=fallback_path)
+        with self._lock:
+            self._entries[(symbol, timeframe)] = entry
+
+    def discover(self) -> list[tuple[str, str]]:
+        """Indexes every model file in `models_dir`; returns the (symbol, timeframe) pairs found."""
+        found = {}
+        names = sorted(os.listdir(self.models_dir)) if os.path.isdir(self.models_dir) else []
+        for name in names:
+            match = MODEL_FILE_PATTERN.match(name)
+            key = (match["symbol"], match["timeframe"]) if match else None
+            if match and (found.get(key) != NATIVE_SUFFIX or match["suffix"] == NATIVE_SUFFIX):
+                self.register(*key, os.path.join(self.models_dir, name))
+                found[key] = match["suffix"]
+        found = list(found)
+        logger.info(f"Discovered {len(found)} models in {self.models_dir}.")
+        return found
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._entries
+
+    def keys(self) -> list[tuple[str, str]]:
+        return list(self._entries)
+
+    def is_loaded(self, symbol: str, timeframe: str) -> bool:
+        return (symbol, timeframe) in self._loaded
+
+    @property
+    def loaded_bytes(self) -> int:
+        return self._loaded_bytes
+
+    def _load(self, path: str, native: bool) -> tuple[object, bytes, bytes | None]:
+        """
+        Loads a model after checking it (and a native model's manifest) against its
+        sidecar; returns it with the model and manifest bytes it came from.
+        """
+        # Checksum and load the same bytes, even if the files are rewritten meanwhile
+        data, manifest = _read_model_files(path, native)
+        expected = read_checksum(path)
+        if expected is None:
+            if self.require_checksum:
+                raise ModelIntegrityError(f"No checksum sidecar for {path}")
+            logger.warning(f"No checksum sidecar for {path}; loading it unverified.")
+        else:
+            actual = _checksum(data, manifest)
+            if actual != expected:
+                raise ModelIntegrityError(f"Checksum mismatch for {path}: expected {expected}, got {actual}")
+        with span("model_load"):
+            if native:
+                model = NativeModel.from_bytes(data, json.loads(manifest))
+            else:
+                model = joblib.load(io.BytesIO(data))  # reads plain pickles as well as joblib dumps
+        self.loads += 1
+        logger.info(f"Loaded model {os.path.basename(path)} ({len(data) / 1024:.0f} KiB).")
+        return model, data, manifest
+
+    def _insert(self, key: tuple[str, str], model, size: int):
+        """Caches a loaded model, evicting least recently used ones over budget. Needs the lock."""
+        previous = self._loaded.pop(key, None)
+        if previous is not None:
+            self._loaded_bytes -= previous[1]
+        self._loaded[key] = (model, size)
+        self._loaded_bytes += size
+        while self._loaded_bytes > self.max_bytes and len(self._loaded) > 1:
+            evicted, (_, evicted_size) = self._loaded.popitem(last=False)
+            self._loaded_bytes -= evicted_size
+            self.evictions += 1
+            logger.debug(f"Evicted model {evicted[0]}-{evicted[1]} from memory.")
+
+    def get(self, symbol: str, timeframe: str):
+        """The pair's model, loading (and verifying) it on first use. Raises KeyError for unknown pairs."""
+        key = (symbol, timeframe)
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key][0]
+            entry = self._entries.get(key)
+            if entry is None:
+                raise KeyError(f"No model registered for {symbol}-{timeframe}")
+            model, data, manifest = self._load(entry.source, entry.is_native(entry.source))
+            if not entry.backed_up and entry.source == entry.path:
+                try:
+                    self._back_up(entry, data, manifest)
+                except OSError as e:
+                    logger.warning(f"Could not back up {entry.path}: {e}")
+            self._insert(key, model, len(data))
+            return model
+
+    @staticmethod
+    def _back_up(entry: ModelEntry, data: bytes, manifest: bytes | None):
+        """Keeps the files a model was loaded from as the rollback target for the next bad model."""
+        _write_atomic(entry.backup_path, data)
+        if manifest is not None:
+            _write_atomic(entry.backup_path + MANIFEST_SUFFIX, manifest)
+        write_checksum(entry.backup_path, _checksum(data, manifest))
+        entry.backed_up = True
+
+    def evict(self, symbol: str, timeframe: str):
+        """Drops a loaded model so the next `get` reads it from disk again."""
+        with self._lock:
+            loaded = self._loaded.pop((symbol, timeframe), None)
+            if loaded is not None:
+                self._loaded_bytes -= loaded[1]
+
+    def changed(self, keys=None) -> list[tuple[str, str]]:
+        """The pairs (of `keys`, default all) whose model file was rewritten since it was last looked at."""
+        changed = []
+        for key in self.keys() if keys is None else keys:
+            entry = self._entries.get(key)
+            try:
+                if entry is not None and _fingerprint(entry.path) != entry.fingerprint:
+                    changed.append(key)
+            except FileNotFoundError:
+                pass  # mid-replace, or removed: keep serving what we have
+        return changed
+
+    def stage(self, symbol: str, timeframe: str, validate=None) -> bool:
+        """
+        Loads the pair's rewritten model file and runs `validate(key, model)`, which
+        raises if the model is unusable. A model that passes is backed up and staged for
+        `promote()`; one that fails is rolled back from. Returns whether it passed.
+        """
+        key = (symbol, timeframe)
+        entry = self._entries[key]
+        fingerprint = _fingerprint(entry.path)
+        try:
+            model, data, manifest = self._load(entry.path, entry.path.endswith(NATIVE_SUFFIX))
+            if validate is not None:
+                validate(key, model)
+        except Exception as e:
+            self._roll_back(key, fingerprint, e)
+            return False
+        staged = ModelEntry(entry.path, len(data), fingerprint, entry.backup_path, entry.path,
+                            fallback_path=entry.fallback_path)
+        self._back_up(staged, data, manifest)
+        with self._lock:
+            self._staged[key] = (model, staged)
+        logger.info(f"Validated new model for {symbol}-{timeframe}; swapping it in after this cycle.")
+        return True
+
+    def _roll_back(self, key: tuple[str, str], fingerprint: tuple, error: Exception):
+        with self._lock:
+            entry = self._entries[key]
+            entry.fingerprint = fingerprint  # not retried until the file changes again
+            if entry.backed_up:
+                entry.source = entry.backup_path
+            elif entry.fallback_path is not None:
+                entry.source = entry.fallback_path
+            self._staged.pop(key, None)
+            self.rollbacks += 1
+            kept = "keeping the loaded model" if key in self._loaded else f"falling back to {entry.source}"
+        logger.error(f"Rejected new model for {key[0]}-{key[1]} ({error}); {kept}.")
+
+    def reload_changed(self, keys=None, validate=None) -> list[tuple[str, str]]:
+        """Stages every changed model that validates; returns the staged pairs. Blocking."""
+        return [key for key in self.changed(keys) if self.stage(*key, validate=validate)]
+
+    def promote(self) -> list[tuple[str, str]]:
+        """Swaps all staged models in at once; returns their pairs."""
+        with self._lock:
+            staged, self._staged = self._staged, {}
+            for key, (model, entry) in staged.items():
+                self._entries[key] = entry
+                self._insert(key, model, entry.size)
+                self.reloads += 1
+        for symbol, timeframe in staged:
+            logger.info(f"Hot-swapped model for {symbol}-{timeframe}.")
+        return list(staged)
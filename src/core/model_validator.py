@@ -4,16 +4,31 @@ import os
 import hashlib
 from src.logger import logger
 
-def get_file_checksum(file_path):
+def _sha256(blocks):
     sha256_hash = hashlib.sha256()
-    try:
+    for byte_block in blocks:
+        sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
+
+def _file_blocks(file_paths):
+    for file_path in file_paths:
         with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+            yield from iter(lambda: f.read(4096), b"")
+
+def get_file_checksum(file_path, *extra_paths):
+    """
+    SHA-256 of `file_path` followed by `extra_paths` (e.g. a native model's feature
+    manifest, which is only valid with its booster); None if any of them is missing.
+    """
+    try:
+        return _sha256(_file_blocks((file_path, *extra_paths)))
     except FileNotFoundError:
         return None
 
+def get_checksum(*blobs: bytes):
+    """`get_file_checksum` of files already read into memory, in the same order."""
+    return _sha256(blobs)
+
 def load_model(model_path, backup_model_path=None):
     path_to_load = None
 
@@ -0,0 +1,84 @@
+# src/core/native_model.py
+"""
+XGBoost models in the booster's native binary format (UBJSON, `.ubj`).
+
+`train_model` exports the fitted booster together with a feature manifest sidecar
+(`<model>.ubj.features.json`) holding the feature order and class labels. Loading it
+needs neither pickle nor the sklearn wrapper, so it is faster to load and survives
+library upgrades. Predictions select the manifest's features, copy them into one
+contiguous float32 array and call `Booster.inplace_predict`, skipping the DMatrix
+the wrapper builds on every call. The `predict`/`predict_proba` interface matches
+the sklearn classifier, so `SignalParser` works with either.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+NATIVE_SUFFIX = ".ubj"
+MANIFEST_SUFFIX = ".features.json"
+
+def read_manifest(model_path: str) -> dict:
+    with open(model_path + MANIFEST_SUFFIX) as f:
+        return json.load(f)
+
+def write_manifest(model_path: str, manifest: dict):
+    with open(model_path + MANIFEST_SUFFIX + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(model_path + MANIFEST_SUFFIX + ".tmp", model_path + MANIFEST_SUFFIX)
+
+def export_native(model: xgb.XGBClassifier, model_path: str, features: list[str]) -> dict:
+    """Writes the classifier's booster to `model_path` and its manifest next to it; returns the manifest."""
+    manifest = {
+        "features": list(features),
+        "classes": [int(c) for c in model.classes_],
+        "objective": model.get_params()["objective"],
+        "xgboost": xgb.__version__,
+    }
+    # Each file is moved into place once written, so a running trade loop never reads half
+    # of one. The model goes first and the manifest last; a loader that reads them between
+    # the two sees a mismatch with the checksum sidecar (which covers both, see
+    # `model_registry.write_checksum`) and retries once training rewrites the sidecar.
+    with open(model_path + ".tmp", "wb") as f:
+        f.write(model.get_booster().save_raw(raw_format="ubj"))
+    os.replace(model_path + ".tmp", model_path)
+    write_manifest(model_path, manifest)
+    return manifest
+
+class NativeModel:
+    def __init__(self, booster: xgb.Booster, manifest: dict):
+        self.booster = booster
+        self.manifest = manifest
+        self.features = manifest["features"]
+        self.classes_ = np.asarray(manifest["classes"])
+
+    @classmethod
+    def from_bytes(cls, data: bytes, manifest: dict) -> "NativeModel":
+        booster = xgb.Booster()
+        booster.load_model(bytearray(data))
+        booster.set_param({"nthread": 1})  # a handful of rows per call: threads cost more than they save
+        return cls(booster, manifest)
+
+    @classmethod
+    def load(cls, model_path: str) -> "NativeModel":
+        with open(model_path, "rb") as f:
+            return cls.from_bytes(f.read(), read_manifest(model_path))
+
+    def _rows(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            # Column selection costs more than the prediction; skip it when already in manifest order
+            if list(X.columns) != self.features:
+                X = X[self.features]  # raises on missing features like the sklearn wrapper
+            X = X.to_numpy(dtype=np.float32)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def predict_proba(self, X) -> np.ndarray:
+        # Features are in manifest order already; the booster need not re-check their names
+        scores = np.asarray(self.booster.inplace_predict(self._rows(X), validate_features=False))
+        if scores.ndim == 1:  # binary objectives return P(class 1)
+            return np.column_stack([1 - scores, scores])
+        return scores
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -10,7 +10,7 @@ RETRYABLE_EXCEPTIONS = (
 )
 
 class OrderExecutor:
-    def __init__(self, exchange_id: str, api_key: str, api_secret: str):
+    def __init__(self, exchange_id: str, api_key: str, api_secret: str, exchange=None):
         """
         Initializes the OrderExecutor with explicit configuration.
 
@@ -18,7 +18,12 @@ class OrderExecutor:
             exchange_id (str): The CCXT-compatible exchange ID (e.g., 'bybit').
             api_key (str): The API key for the exchange.
             api_secret (str): The API secret for the exchange.
+            exchange: Optional ready-made client (e.g. a ReplayExchange) used instead of ccxt.
         """
+        if exchange is not None:
+            self.exchange = exchange
+            return
+
         # CORRECTED: The exchange ID is now passed in during initialization.
         if not hasattr(ccxt, exchange_id):
             raise ValueError(f"Exchange '{exchange_id}' is not supported by ccxt.")
@@ -1,13 +1,31 @@
 # src/core/signal_parser.py
+from typing import NamedTuple
 import pandas as pd
 from src.logger import logger
 
+class Prediction(NamedTuple):
+    signal: str
+    probability: float | None = None  # model's probability for the predicted class, when it has predict_proba
+
+def _signal_from(prediction) -> str:
+    if prediction == 1:
+        return 'buy'
+    # CORRECTED: The model predicts -1 for down/sell.
+    elif prediction == -1:
+        return 'sell'
+    return 'hold'
+
 class SignalParser:
     def __init__(self, model):
         if model is None:
             raise ValueError("SignalParser cannot be initialized with a None model.")
         self.model = model
 
+    @staticmethod
+    def features(market_data: pd.DataFrame) -> pd.DataFrame:
+        """The feature row the model predicts on: the latest candle without its timestamp."""
+        return market_data.drop(columns=['timestamp'], errors='ignore').iloc[-1:]
+
     def generate_signal(self, market_data: pd.DataFrame):
         logger.debug("Generating trading signal...")
         if market_data.empty:
@@ -15,19 +33,47 @@ class SignalParser:
             return 'hold'
 
         try:
-            features = market_data.drop(columns=['timestamp'], errors='ignore').iloc[-1:]
-            prediction = self.model.predict(features)[0]
-
-            if prediction == 1:
-                logger.info("Signal: BUY")
-                return 'buy'
-            # CORRECTED: The model predicts -1 for down/sell.
-            elif prediction == -1: 
-                logger.info("Signal: SELL")
-                return 'sell'
-            else:
-                logger.info("Signal: HOLD")
-                return 'hold'
+            prediction = self.model.predict(self.features(market_data))[0]
+            signal = _signal_from(prediction)
+            logger.info(f"Signal: {signal.upper()}")
+            return signal
         except Exception as e:
             logger.error(f"Error during model prediction: {e}")
-            return 'hold'
\ No newline at end of file
+            return 'hold'
+
+    def predict_batch(self, market_data_list: list[pd.DataFrame]) -> list[Prediction]:
+        """
+        Predicts on the latest row of every frame with one `predict` (and one
+        `predict_proba`) call. Empty frames, or a failing model, give 'hold'.
+        """
+        predictions = [Prediction('hold')] * len(market_data_list)
+        rows = [(i, self.features(df)) for i, df in enumerate(market_data_list) if not df.empty]
+        if not rows:
+            return predictions
+        try:
+            features = pd.concat([row for _, row in rows], ignore_index=True)
+            labels = self.model.predict(features)
+            probabilities = self.model.predict_proba(features).max(axis=1) if hasattr(self.model, "predict_proba") else None
+        except Exception as e:
+            logger.error(f"Error during batch model prediction: {e}")
+            return predictions
+        for j, (i, _) in enumerate(rows):
+            probability = float(probabilities[j]) if probabilities is not None else None
+            predictions[i] = Prediction(_signal_from(labels[j]), probability)
+        return predictions
+
+def generate_signals(requests: list[tuple[SignalParser, pd.DataFrame]]) -> list[Prediction]:
+    """
+    Predicts for many (parser, market data) requests, e.g. every pair closing on one
+    boundary. Requests whose parsers share a model are predicted in a single call;
+    results come back in request order.
+    """
+    groups: dict[int, list[int]] = {}
+    for i, (parser, _) in enumerate(requests):
+        groups.setdefault(id(parser.model), []).append(i)
+    predictions = [None] * len(requests)
+    for indices in groups.values():
+        parser = requests[indices[0]][0]
+        for i, prediction in zip(indices, parser.predict_batch([requests[i][1] for i in indices])):
+            predictions[i] = prediction
+    return predictions
@@ -0,0 +1,158 @@
+# src/core/tracing.py
+"""
+Lightweight latency tracing for the trading path.
+
+A trade-loop cycle runs inside `tracer.cycle(...)`, which makes a `Trace` current for
+everything the cycle awaits, including tasks it gathers and work it hands to threads
+(both copy the context). Code along the path wraps its stages in `span("fetch")`,
+`span("predict")`, ... without being passed the trace. When the cycle ends, each
+stage's wall time (from its first span's start to its last span's end, since a group
+of pairs runs a stage concurrently) goes into a rolling histogram. A cycle taking
+longer than the slow threshold from its origin (the candle close) is logged with its
+per-stage breakdown.
+
+Spans outside any cycle, such as background database flushes, are recorded directly.
+Worker threads record too (predictions, flushes), so histograms are created and
+updated under the tracer's lock.
+"""
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from src.config import config
+from src.logger import logger
+
+HISTOGRAM_WINDOW = 1000
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("current_trace", default=None)
+
+def _percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return float("nan")
+    return ordered[min(int(q / 100 * len(ordered)), len(ordered) - 1)]
+
+class Histogram:
+    """Rolling window of the last `window` durations, in seconds."""
+
+    def __init__(self, window: int = HISTOGRAM_WINDOW):
+        self._values = deque(maxlen=window)
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, seconds: float):
+        self._values.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        return _percentile(sorted(self._values), q)
+
+    def summary(self) -> dict[str, float]:
+        ordered = sorted(self._values)
+        if not ordered:
+            return {"count": 0}
+        return {"count": len(ordered), "p50": _percentile(ordered, 50), "p95": _percentile(ordered, 95),
+                "p99": _percentile(ordered, 99), "max": ordered[-1]}
+
+class Trace:
+    """Spans of one cycle. `origin` is the wall-clock time (epoch seconds) the cycle responds to."""
+
+    def __init__(self, label: str, origin: float | None = None):
+        self.label = label
+        self.origin = origin
+        self.started_wall = time.time()
+        self.started = time.perf_counter()
+        self.finished = None
+        self.spans: list[tuple[str, float, float]] = []
+
+    def add(self, name: str, start: float, end: float):
+        self.spans.append((name, start, end))
+
+    def stages(self) -> dict[str, float]:
+        """Seconds per stage: wake-up delay after the origin, then each span name's extent."""
+        stages = {}
+        if self.origin is not None:
+            stages["wake"] = max(self.started_wall - self.origin, 0.0)
+        extents = {}
+        for name, start, end in self.spans:
+            first, last = extents.get(name, (start, end))
+            extents[name] = (min(first, start), max(last, end))
+        stages.update((name, last - first) for name, (first, last) in extents.items())
+        return stages
+
+    @property
+    def total(self) -> float:
+        """Seconds from the origin (or the cycle start) to the end of the cycle."""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        if self.origin is None:
+            return elapsed
+        return elapsed + max(self.started_wall - self.origin, 0.0)
+
+class Tracer:
+    def __init__(self, window: int = HISTOGRAM_WINDOW, slow_seconds: float = config.TRACE_SLOW_CYCLE_SECONDS):
+        self.window = window
+        self.slow_seconds = slow_seconds
+        self.histograms: dict[str, Histogram] = {}
+        self.cycles = 0
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram(self.window)
+            self.histograms[stage].add(seconds)
+
+    @contextmanager
+    def cycle(self, label: str, origin: float | None = None):
+        """Traces one cycle; spans opened while it runs are attributed to it."""
+        trace = Trace(label, origin)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace.finished = time.perf_counter()
+            self._finish(trace)
+
+    def _finish(self, trace: Trace):
+        self.cycles += 1
+        stages = trace.stages()
+        for stage, seconds in stages.items():
+            self.record(stage, seconds)
+        total = trace.total
+        self.record("total", total)
+        if total > self.slow_seconds:
+            breakdown = ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in stages.items())
+            logger.warning(f"Slow cycle {trace.label}: {total:.2f}s ({breakdown})")
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def report(self):
+        """Logs p50/p95/p99/max of every stage over its rolling window."""
+        lines = [
+            f"{stage}: p50={s['p50'] * 1000:.1f}ms p95={s['p95'] * 1000:.1f}ms "
+            f"p99={s['p99'] * 1000:.1f}ms max={s['max'] * 1000:.1f}ms (n={s['count']})"
+            for stage, s in self.summary().items() if s["count"]
+        ]
+        if lines:
+            logger.info(f"Cycle latency after {self.cycles} cycles: " + "; ".join(lines))
+
+@contextmanager
+def span(name: str):
+    """Times the enclosed block as stage `name` of the current cycle (or on its own outside one)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, start, end)
+        else:
+            tracer.record(name, end - start)
+
+# Shared tracer for the whole process
+tracer = Tracer()
@@ -0,0 +1,195 @@
+# src/core/write_behind.py
+"""
+Write-behind persistence for the trade loop.
+
+`log_trade` and `log_prediction` only append a record to an in-memory queue, so the
+event loop never waits on PostgreSQL. A background task (`run`) writes the queue in
+batches from a worker thread, one transaction per batch. When the database is down
+or slow to reconnect, batches are appended to a local JSONL journal instead, and the
+journal is replayed (oldest first) before anything newer is written, both while
+running and on the next start. Once records are committed, including replayed ones,
+they are handed to `on_commit` on the event loop, so consumers can act on rows that
+are in the database. Only one flush runs at a time; cancelling `run` lets the
+flush in progress finish, and `close` waits for it.
+
+Delivery is at-least-once: a crash between a committed replay and the journal being
+removed writes those records again.
+"""
+import os
+import json
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from src.config import config
+from src.logger import logger
+from src.core.tracing import span
+
+FLUSH_INTERVAL_SECONDS = 1.0
+RETRY_SECONDS = 10.0
+BATCH_SIZE = 500
+
+TRADE_FIELDS = ("timestamp", "symbol", "type", "price", "amount", "status")
+PREDICTION_FIELDS = ("timestamp", "symbol", "timeframe", "signal", "confidence")
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class WriteBehind:
+    def __init__(self, connect, journal_path: str = config.WRITE_BEHIND_JOURNAL, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS, retry_seconds: float = RETRY_SECONDS,
+                 on_commit=None):
+        """
+        Args:
+            connect: Blocking callable returning a ready `DBManager`; called from the
+                worker thread, again after a failed write.
+            journal_path: Where records are spilled while the database is unavailable.
+            on_commit: Called with the list of records of each committed batch.
+        """
+        self._connect = connect
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_seconds = retry_seconds
+        self.on_commit = on_commit
+        self._db = None
+        self._pending = deque()
+        self._committed = []  # appended by the worker, handed to on_commit by the event loop
+        self._in_flight = None
+        self._wake = asyncio.Event()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def log_trade(self, symbol, trade_type, price, amount, status, timestamp: str | None = None):
+        self._pending.append({"table": "trades", "timestamp": timestamp or _now(), "symbol": symbol,
+                              "type": trade_type, "price": price, "amount": amount, "status": status})
+        self._wake.set()
+
+    def log_prediction(self, symbol, timeframe, signal, confidence=0.0, timestamp: str | None = None,
+                       price: float | None = None):
+        # `price` is not stored; it rides along for `on_commit`
+        self._pending.append({"table": "predictions", "timestamp": timestamp or _now(), "symbol": symbol,
+                              "timeframe": timeframe, "signal": signal, "confidence": confidence or 0.0,
+                              "price": price})
+        self._wake.set()
+
+    # --- Worker thread side ---
+    def _write(self, records: list[dict]):
+        if self._db is None:
+            self._db = self._connect()
+        try:
+            with span("db_write"):
+                self._db.write_batch(
+                    [tuple(r[f] for f in TRADE_FIELDS) for r in records if r["table"] == "trades"],
+                    [tuple(r[f] for f in PREDICTION_FIELDS) for r in records if r["table"] == "predictions"],
+                )
+        except Exception:
+            self._close_db()  # reconnect from scratch next time
+            raise
+        self._committed.extend(records)
+
+    def _close_db(self):
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+            self._db = None
+
+    def _spill(self, records: list[dict]):
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        with open(self.journal_path, "a") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay(self) -> int:
+        """Writes the journal to the database and removes it; raises if the database is still down."""
+        with open(self.journal_path) as f:
+            # A torn last line from a crash mid-append is skipped
+            records = []
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable journal line in {self.journal_path}.")
+        for start in range(0, len(records), self.batch_size):
+            self._write(records[start:start + self.batch_size])
+            # Rewrite the unwritten remainder so a failure part-way does not repeat committed batches
+            remainder = records[start + self.batch_size:]
+            tmp_path = f"{self.journal_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.writelines(json.dumps(record) + "\n" for record in remainder)
+            os.replace(tmp_path, self.journal_path)
+        os.remove(self.journal_path)
+        return len(records)
+
+    def _flush(self, records: list[dict]) -> bool:
+        """Persists `records` behind any journaled ones; spills them if the database is unavailable."""
+        journaled = False
+        try:
+            if os.path.exists(self.journal_path):
+                if records:
+                    self._spill(records)
+                    journaled = True
+                logger.info(f"Replayed {self._replay()} journaled records into the database.")
+            elif records:
+                self._write(records)
+            return True
+        except Exception as e:
+            if records and not journaled:
+                self._spill(records)
+            logger.error(f"Database write failed ({e}); records are journaled in {self.journal_path}.")
+            return False
+
+    def _take(self) -> list[dict]:
+        return [self._pending.popleft() for _ in range(min(len(self._pending), self.batch_size))]
+
+    # --- Event loop side ---
+    async def _in_worker(self, fn, *args):
+        """Runs `fn` in a worker thread after any flush still in flight; cancelling the caller does not stop it."""
+        if self._in_flight is not None:
+            await asyncio.gather(self._in_flight, return_exceptions=True)
+        self._in_flight = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+        result = await asyncio.shield(self._in_flight)
+        self._announce()
+        return result
+
+    def _announce(self):
+        committed, self._committed = self._committed, []
+        if committed and self.on_commit is not None:
+            try:
+                self.on_commit(committed)
+            except Exception as e:
+                logger.error(f"Handling committed records failed: {e}", exc_info=True)
+
+    async def run(self):
+        """Flushes queued records until cancelled; replays any journal left by an earlier run first."""
+        healthy = not os.path.exists(self.journal_path) or await self._in_worker(self._flush, [])
+        while True:
+            if healthy:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(self.retry_seconds)  # don't reconnect on every new record while down
+            self._wake.clear()
+            while self._pending or not healthy:
+                healthy = await self._in_worker(self._flush, self._take())
+                if not healthy:
+                    break
+
+    async def close(self):
+        """Writes (or journals) everything still queued and closes the database connection."""
+        while self._pending:
+            # Waits for a flush the cancelled `run` left in flight before deciding, so
+            # nothing is written twice and the journal is not rewritten under it
+            if self._in_flight is not None:
+                await asyncio.gather(self._in_flight, return_exceptions=True)
+            if os.path.exists(self.journal_path):
+                # The database was unavailable; don't hold up shutdown reconnecting to it
+                await self._in_worker(self._spill, self._take())
+            else:
+                await self._in_worker(self._flush, self._take())
+        await self._in_worker(self._close_db)
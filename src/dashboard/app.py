@@ -11,6 +11,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from src.data.database import get_live_signals
 from src.telegram.send_alert import send_test_alert
 from src.dashboard.performance_metrics import render_performance_metrics
+from src.dashboard.realtime_features import render_realtime_features
+from src.dashboard.live_events import render_live_events
 from src.config import config # Import the central config object
 
 # --- Page Configuration & Styling ---
@@ -117,6 +119,16 @@ else:
         """, unsafe_allow_html=True)
 
 
+# --- Realtime Features Section ---
+if config.ENABLE_REALTIME_FEATURES:
+    st.markdown("---")
+    render_realtime_features()
+
+# --- Live Events Section ---
+if config.EVENT_BUS_SOCKET:
+    st.markdown("---")
+    render_live_events()
+
 # --- Accuracy Stats Section ---
 st.markdown("---")
 # This now calls the corrected, Streamlit-native performance module
@@ -0,0 +1,51 @@
+# src/dashboard/live_events.py
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from dataclasses import asdict
+import streamlit as st
+import pandas as pd
+from src.shared.event_bus import EventBus, CandleClosed, OrderFilled, PredictionMade, connect
+
+logger = logging.getLogger(__name__)
+
+LIVE_EVENTS_REFRESH_SECONDS = 2
+MAX_LIVE_EVENTS = 200
+
+class EventListener:
+    """Collects pushed candle closes, predictions and fills on a background thread."""
+
+    def __init__(self, maxlen: int = MAX_LIVE_EVENTS):
+        self.events = deque(maxlen=maxlen)
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._listen()), name="dashboard-events", daemon=True)
+        self._thread.start()
+
+    async def _listen(self):
+        bus = EventBus()
+        link = asyncio.create_task(connect(bus))
+        try:
+            async for event in bus.subscribe(CandleClosed, PredictionMade, OrderFilled):
+                self.events.appendleft((time.time(), event))
+        finally:
+            link.cancel()
+
+@st.cache_resource
+def get_event_listener():
+    """Starts one event bus listener per dashboard process."""
+    return EventListener()
+
+@st.fragment(run_every=LIVE_EVENTS_REFRESH_SECONDS)
+def render_live_events():
+    """Renders the most recent bus events; refreshes from memory without a page rerun."""
+    st.header("Live Events")
+    st.caption("Candle closes, predictions and fills pushed on the event bus")
+
+    events = list(get_event_listener().events)
+    if not events:
+        st.info("No events received yet. Is the event bus broker running?")
+        return
+    rows = [{"received": pd.to_datetime(received, unit="s"), "event": type(event).__name__, **asdict(event)}
+            for received, event in events]
+    st.dataframe(pd.DataFrame(rows), use_container_width=True)
@@ -0,0 +1,40 @@
+# src/dashboard/realtime_features.py
+import streamlit as st
+import pandas as pd
+import logging
+from src.shared.feature_store import FeatureStore, FEATURE_STORE_PATH
+
+logger = logging.getLogger(__name__)
+
+@st.cache_resource
+def get_feature_store():
+    """Maps the realtime feature store once per dashboard process."""
+    return FeatureStore(FEATURE_STORE_PATH)
+
+def load_realtime_features() -> pd.DataFrame:
+    """Reads the latest features of every symbol, plus their age in seconds."""
+    try:
+        store = get_feature_store()
+    except (FileNotFoundError, ValueError) as e:
+        logger.warning(f"Realtime feature store unavailable: {e}")
+        get_feature_store.clear()
+        return pd.DataFrame()
+
+    rows = {}
+    for symbol in store.symbols:
+        features = store.read(symbol)
+        if features:
+            features["age_s"] = store.age_seconds(symbol)
+            rows[symbol] = features
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+def render_realtime_features():
+    """Renders the realtime microstructure features section in Streamlit."""
+    st.header("Realtime Market Features")
+    st.caption("Order-book and trade-flow microstructure features, read live from the feature store")
+
+    df = load_realtime_features()
+    if df.empty:
+        st.info("No realtime features published yet. Is the realtime manager running?")
+        return
+    st.dataframe(df.round(4), use_container_width=True)
@@ -0,0 +1,188 @@
+# src/data_fetch/candle_store.py
+"""
+Columnar candle storage.
+
+Candles live in monthly Parquet partitions:
+
+    {base_path}/{SYMBOL}USDT/{timeframe}/{YYYY-MM}.parquet
+
+Columns are typed (timestamp[ms] + float64 OHLCV), reads are column-pruned and
+memory-mapped, and a time-range query only opens the partitions it overlaps.
+Appends rewrite just the partitions they touch, so cost stays bounded by the size
+of a month instead of the length of the whole history. Every append then updates
+the store's coverage index (see `data_quality`); only after the partitions are
+written, so the index never claims candles that are not on disk.
+"""
+import os
+import glob
+import logging
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .data_quality import CoverageIndex
+
+CANDLE_STORE_PATH = "/workspace/data/candles"
+CANDLE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("ms")),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+])
+
+logger = logging.getLogger(__name__)
+
+class CandleStore:
+    """Reads and writes per-(symbol, timeframe) candles as partitioned Parquet files."""
+
+    def __init__(self, base_path: str = CANDLE_STORE_PATH):
+        self.base_path = base_path
+        self.coverage = CoverageIndex(os.path.join(base_path, "_coverage.json"))
+
+    def _pair_dir(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.base_path, f"{symbol}USDT", timeframe)
+
+    def _partition_path(self, symbol: str, timeframe: str, month: str) -> str:
+        return os.path.join(self._pair_dir(symbol, timeframe), f"{month}.parquet")
+
+    def partitions(self, symbol: str, timeframe: str) -> list[str]:
+        """Returns the partition files of a pair in chronological order."""
+        return sorted(glob.glob(os.path.join(self._pair_dir(symbol, timeframe), "*.parquet")))
+
+    def has_data(self, symbol: str, timeframe: str) -> bool:
+        return bool(self.partitions(symbol, timeframe))
+
+    def delete(self, symbol: str, timeframe: str):
+        """Removes all stored candles of a pair."""
+        for path in self.partitions(symbol, timeframe):
+            os.remove(path)
+        self.coverage.reset(symbol, timeframe)
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        df = df[CANDLE_COLUMNS].copy()
+        df["timestamp"] = pd.to_datetime(df["timestamp"]).astype("datetime64[ms]")
+        for column in CANDLE_COLUMNS[1:]:
+            df[column] = df[column].astype("float64")
+        return df
+
+    @staticmethod
+    def _write_partition(path: str, df: pd.DataFrame):
+        """Writes a partition atomically so readers never see a half-written file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+
+    def append(self, symbol: str, timeframe: str, df: pd.DataFrame) -> int:
+        """
+        Merges candles into the store. Rows are deduplicated on timestamp with the
+        newest write winning, so re-appending a still-forming candle replaces it.
+        Returns the number of rows written.
+        """
+        if df is None or df.empty:
+            return 0
+
+        df = self._normalize(df)
+        self._ensure_coverage(symbol, timeframe)
+        months = df["timestamp"].dt.strftime("%Y-%m")
+        for month, chunk in df.groupby(months, sort=True):
+            path = self._partition_path(symbol, timeframe, month)
+            if os.path.exists(path):
+                existing = pq.read_table(path, memory_map=True).to_pandas()
+                chunk = pd.concat([existing, chunk], ignore_index=True)
+            chunk = (chunk.drop_duplicates(subset="timestamp", keep="last")
+                          .sort_values("timestamp")
+                          .reset_index(drop=True))
+            self._write_partition(path, chunk)
+        self.coverage.update(symbol, timeframe, df)
+        return len(df)
+
+    def read(self, symbol: str, timeframe: str, start: datetime | None = None,
+             end: datetime | None = None, columns: list[str] | None = None) -> pd.DataFrame:
+        """
+        Returns candles with start <= timestamp < end, reading only the partitions
+        and columns needed. Missing pairs yield an empty frame.
+        """
+        columns = columns or CANDLE_COLUMNS
+        if "timestamp" not in columns:
+            columns = ["timestamp"] + list(columns)
+
+        start_month = pd.Timestamp(start).strftime("%Y-%m") if start is not None else None
+        end_month = pd.Timestamp(end).strftime("%Y-%m") if end is not None else None
+
+        filters = []
+        if start is not None:
+            filters.append(("timestamp", ">=", pd.Timestamp(start).to_datetime64()))
+        if end is not None:
+            filters.append(("timestamp", "<", pd.Timestamp(end).to_datetime64()))
+
+        frames = []
+        for path in self.partitions(symbol, timeframe):
+            month = os.path.basename(path)[:-len(".parquet")]
+            if (start_month and month < start_month) or (end_month and month > end_month):
+                continue
+            table = pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+            frames.append(table.to_pandas())
+
+        if not frames:
+            return pd.DataFrame({c: pd.Series(dtype="datetime64[ms]" if c == "timestamp" else "float64") for c in columns})
+        return pd.concat(frames, ignore_index=True)
+
+    def tail(self, symbol: str, timeframe: str, n: int) -> pd.DataFrame:
+        """Returns the last `n` candles, reading partitions backwards only as far as needed."""
+        frames, rows = [], 0
+        for path in reversed(self.partitions(symbol, timeframe)):
+            frame = pq.read_table(path, memory_map=True).to_pandas()
+            frames.insert(0, frame)
+            rows += len(frame)
+            if rows >= n:
+                break
+        if not frames:
+            return self.read(symbol, timeframe)
+        return pd.concat(frames, ignore_index=True).iloc[-n:].reset_index(drop=True)
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> pd.Timestamp | None:
+        """Returns the newest stored timestamp using Parquet column statistics only."""
+        partitions = self.partitions(symbol, timeframe)
+        if not partitions:
+            return None
+        metadata = pq.ParquetFile(partitions[-1]).metadata
+        ts_index = metadata.schema.names.index("timestamp")
+        maxima = [
+            metadata.row_group(i).column(ts_index).statistics.max
+            for i in range(metadata.num_row_groups)
+            if metadata.row_group(i).column(ts_index).statistics is not None
+        ]
+        return pd.Timestamp(max(maxima)) if maxima else None
+
+    def _ensure_coverage(self, symbol: str, timeframe: str):
+        """Builds the coverage entry from a full scan once, for data stored before the index existed."""
+        if not self.coverage.has(symbol, timeframe) and self.has_data(symbol, timeframe):
+            logger.info(f"Building coverage index for {symbol} {timeframe}...")
+            self.coverage.update(symbol, timeframe, self.read(symbol, timeframe))
+
+    def gaps(self, symbol: str, timeframe: str, start=None, end=None) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """Missing candle ranges within [start, end]; see CoverageIndex.gaps."""
+        self._ensure_coverage(symbol, timeframe)
+        return self.coverage.gaps(symbol, timeframe, start, end)
+
+    def windows(self, symbol: str, timeframe: str, min_candles: int = 1) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """Clean continuous windows of stored candles; see CoverageIndex.windows."""
+        self._ensure_coverage(symbol, timeframe)
+        return self.coverage.windows(symbol, timeframe, min_candles)
+
+    def import_csv(self, csv_path: str, symbol: str, timeframe: str) -> int:
+        """One-off migration of a legacy history CSV into the store."""
+        df = pd.read_csv(csv_path, parse_dates=["timestamp"])
+        written = self.append(symbol, timeframe, df)
+        logger.info(f"📦 Imported {written} candles for {symbol} {timeframe} from {csv_path}.")
+        return written
+
+# Shared store for the whole process
+candle_store = CandleStore()
@@ -0,0 +1,187 @@
+# src/data_fetch/candle_stream.py
+"""
+Streaming closed candles over ccxt.pro `watch_ohlcv`.
+
+All (symbol, timeframe) pairs are multiplexed on one client, and so on one websocket
+per exchange. Exchanges with `watchOHLCVForSymbols` get a single subscription for
+everything; others get one `watch_ohlcv` loop per pair on the same client. Kline
+streams push the forming candle over and over. Where the exchange marks its last push
+of a candle final (bybit's `confirm`, which ccxt drops when parsing and
+`_keep_confirm_flag` restores) the candle is handed to `on_close` on that push;
+otherwise a candle counts as final once the exchange pushes the next one.
+
+After a reconnect, the last forming candle's final values and any candles that opened
+while the stream was down are unknown. They are backfilled over REST before streaming
+resumes, so `on_close` sees every candle exactly once and in order.
+
+With a `base_timeframe`, only base candles are streamed (one subscription per symbol)
+and the pairs' higher timeframes are derived from them with `IncrementalResampler`,
+the same aggregation the candle store uses. A derived candle closes together with its
+last base candle. The first derived candle after startup is dropped when the stream
+began inside its bucket, as it would only cover part of it.
+"""
+import asyncio
+import logging
+import pandas as pd
+from .candle_store import CANDLE_COLUMNS
+from .rate_limit import get_budget
+from .resampler import IncrementalResampler
+from ..shared.timeframes import timeframe_to_ms
+
+RECONNECT_SECONDS = 2.0
+BACKFILL_LIMIT = 1000
+# Streamed candles carry the exchange's final flag after the six OHLCV values, when known
+CONFIRM_INDEX = 6
+
+logger = logging.getLogger(__name__)
+
+def _keep_confirm_flag(exchange) -> bool:
+    """
+    Wraps the client's `parse_ws_ohlcv` so a kline's boolean `confirm` field (bybit)
+    is kept as a seventh value instead of being dropped. Klines without it, and
+    clients without the method, are left alone. Returns whether the client was wrapped.
+    """
+    parse = getattr(exchange, "parse_ws_ohlcv", None)
+    if parse is None or getattr(parse, "keeps_confirm", False):
+        return parse is not None
+
+    def parse_ws_ohlcv(ohlcv, market=None):
+        candle = parse(ohlcv, market)
+        confirm = ohlcv.get("confirm") if isinstance(ohlcv, dict) else None
+        if isinstance(confirm, bool) and len(candle) == CONFIRM_INDEX:
+            candle.append(confirm)
+        return candle
+
+    parse_ws_ohlcv.keeps_confirm = True
+    exchange.parse_ws_ohlcv = parse_ws_ohlcv
+    return True
+
+class CandleStream:
+    def __init__(self, exchange, pairs: list[tuple[str, str]], on_close, reconnect_seconds: float = RECONNECT_SECONDS,
+                 base_timeframe: str | None = None):
+        """
+        Args:
+            exchange: ccxt.pro client with `watch_ohlcv` (and ideally `watch_ohlcv_for_symbols`).
+            pairs: (base symbol, timeframe) pairs, e.g. ("BTC", "1h").
+            on_close: Called as `on_close(symbol, timeframe, [open_ms, o, h, l, c, v])` per closed candle.
+            base_timeframe: Stream only this timeframe and derive the pairs' others from it.
+        """
+        self.exchange = exchange
+        _keep_confirm_flag(exchange)
+        self.targets = set(pairs)  # what on_close is called for
+        self._derived: dict[tuple[str, str], list[IncrementalResampler]] = {}
+        if base_timeframe is not None:
+            for symbol, timeframe in pairs:
+                if timeframe != base_timeframe:
+                    self._derived.setdefault((symbol, base_timeframe), []).append(
+                        IncrementalResampler(timeframe, base_timeframe))
+            pairs = [(symbol, base_timeframe if timeframe != base_timeframe else timeframe) for symbol, timeframe in pairs]
+        self.pairs = list(dict.fromkeys(pairs))  # what is streamed
+        self.on_close = on_close
+        self.reconnect_seconds = reconnect_seconds
+        self._markets = {f"{symbol}/USDT": symbol for symbol, _ in self.pairs}
+        self._forming: dict[tuple[str, str], list] = {}  # latest update of the current candle
+        self._last_closed: dict[tuple[str, str], int] = {}  # open time of the last emitted candle
+        self._resync: set[tuple[str, str]] = set()
+        self._first_base: dict[tuple[str, str], int] = {}  # open time of the first base candle streamed
+        self.closed = 0
+        self.backfilled = 0
+
+    @staticmethod
+    def supported(exchange) -> bool:
+        return bool(exchange.has.get("watchOHLCVForSymbols") or exchange.has.get("watchOHLCV"))
+
+    def _emit(self, key: tuple[str, str], candle: list):
+        if candle[0] <= self._last_closed.get(key, -1):
+            return  # already emitted, e.g. on its confirmed push
+        candle = candle[:CONFIRM_INDEX]
+        self._last_closed[key] = candle[0]
+        self.closed += 1
+        if key in self.targets:
+            self.on_close(key[0], key[1], list(candle))
+        if key in self._derived:
+            self._derive(key, candle)
+
+    def _derive(self, key: tuple[str, str], candle: list):
+        first = self._first_base.setdefault(key, candle[0])
+        row = pd.DataFrame([candle[:6]], columns=CANDLE_COLUMNS)
+        row["timestamp"] = pd.to_datetime(row["timestamp"], unit="ms")
+        for resampler in self._derived[key]:
+            for bar in resampler.update(row).itertuples(index=False):
+                open_ms = int(pd.Timestamp(bar.timestamp).value // 1_000_000)
+                if open_ms < first:
+                    logger.debug(f"Dropped partial first {key[0]}-{resampler.timeframe} candle derived from the stream.")
+                    continue
+                self.on_close(key[0], resampler.timeframe, [open_ms, bar.open, bar.high, bar.low, bar.close, bar.volume])
+
+    async def _backfill(self, key: tuple[str, str], market: str, until_ms: int):
+        """Emits the candles that closed before `until_ms` but were not streamed."""
+        symbol, timeframe = key
+        start = self._last_closed.get(key)
+        forming = self._forming.get(key)
+        since = start + timeframe_to_ms(timeframe) if start is not None else forming[0] if forming else None
+        if since is None or since >= until_ms:
+            return
+        await get_budget(self.exchange).acquire()
+        candles = await self.exchange.fetch_ohlcv(market, timeframe, since, limit=BACKFILL_LIMIT)
+        missed = [c for c in candles or () if since <= c[0] < until_ms]
+        for candle in missed:
+            self._emit(key, candle)
+        self.backfilled += len(missed)
+        if missed:
+            logger.info(f"Backfilled {len(missed)} {symbol}-{timeframe} candles over REST after a stream gap.")
+
+    async def _on_candles(self, market: str, timeframe: str, candles: list):
+        key = (self._markets[market.split(":")[0]], timeframe)  # swap clients report BTC/USDT:USDT
+        tf_ms = timeframe_to_ms(timeframe)
+        for candle in sorted(candles, key=lambda c: c[0]):
+            forming = self._forming.get(key)
+            if forming is not None and candle[0] < forming[0]:
+                continue  # late update of a candle already closed
+            if forming is not None and candle[0] > forming[0]:
+                if key in self._resync or candle[0] > forming[0] + tf_ms:
+                    # `forming` may be stale and candles may have been skipped: take them from REST
+                    await self._backfill(key, market, candle[0])
+                else:
+                    self._emit(key, forming)
+            self._resync.discard(key)
+            self._forming[key] = candle
+            if len(candle) > CONFIRM_INDEX and candle[CONFIRM_INDEX] is True:
+                self._emit(key, candle)  # final by the exchange's own flag; no need to wait for the next one
+
+    async def _watch_all(self):
+        subscriptions = [[f"{symbol}/USDT", timeframe] for symbol, timeframe in self.pairs]
+        while True:
+            updates = await self.exchange.watch_ohlcv_for_symbols(subscriptions)
+            for market, by_timeframe in updates.items():
+                for timeframe, candles in by_timeframe.items():
+                    await self._on_candles(market, timeframe, candles)
+
+    async def _watch_one(self, symbol: str, timeframe: str):
+        market = f"{symbol}/USDT"
+        while True:
+            await self._on_candles(market, timeframe, await self.exchange.watch_ohlcv(market, timeframe))
+
+    async def _watch_each(self):
+        tasks = [asyncio.create_task(self._watch_one(symbol, tf)) for symbol, tf in self.pairs]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:  # one failed loop restarts them all
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self):
+        """Streams until cancelled, reconnecting (and backfilling) after errors."""
+        while True:
+            try:
+                if self.exchange.has.get("watchOHLCVForSymbols"):
+                    await self._watch_all()
+                else:
+                    await self._watch_each()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Candle stream interrupted ({e}); reconnecting in {self.reconnect_seconds}s.")
+                self._resync.update(self._forming)
+                await asyncio.sleep(self.reconnect_seconds)
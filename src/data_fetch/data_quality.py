@@ -0,0 +1,253 @@
+# src/data_fetch/data_quality.py
+"""
+Vectorized candle validation and a persistent per-(symbol, timeframe) coverage index.
+
+The index records the continuous ranges of stored candles, anomalous rows and gaps
+the exchange has confirmed it cannot fill. It is updated from each appended batch
+only, so the backfill can ask for exactly the missing ranges and training can split
+history into clean windows without rescanning every file.
+
+Several processes (the scheduler's history refresh, a manual backfill) may append to
+one store, so every change to the index re-reads the file and saves it under an
+exclusive `flock` on `<index>.lock`, and readers reload it once it has changed.
+"""
+import os
+import json
+import fcntl
+import logging
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from ..shared.timeframes import timeframe_to_ms, floor_timestamp_ms
+
+# Anomalous timestamps kept per pair and kind; counts keep growing past this
+MAX_TRACKED_ANOMALIES = 10000
+
+logger = logging.getLogger(__name__)
+
+def _to_ms(timestamps) -> np.ndarray:
+    return pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype="datetime64[ms]").astype(np.int64)
+
+def _from_ms(ms: int) -> pd.Timestamp:
+    return pd.Timestamp(int(ms), unit="ms")
+
+def _merge_ranges(ranges: list[list[int]], step_ms: int) -> list[list[int]]:
+    """Unions inclusive [start, end] ranges, joining ranges that are one step apart."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + step_ms:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def scan_candles(df: pd.DataFrame, timeframe: str) -> dict:
+    """
+    Validates a batch of candles in a few vectorized passes.
+
+    Returns a dict with:
+    - ranges: continuous [first, last] open times (ms) after sorting and deduplicating
+    - duplicates / out_of_order: counts in the batch as received
+    - misaligned, zero_volume, invalid_ohlc: timestamps (ms) of offending rows
+    """
+    step = timeframe_to_ms(timeframe)
+    if df.empty:
+        return {"ranges": [], "duplicates": 0, "out_of_order": 0, "misaligned": [], "zero_volume": [], "invalid_ohlc": []}
+
+    raw_ts = _to_ms(df["timestamp"])
+    out_of_order = int(np.count_nonzero(np.diff(raw_ts) < 0))
+    duplicates = int(len(raw_ts) - len(np.unique(raw_ts)))
+
+    o, h, l, c, v = (df[col].to_numpy(dtype=np.float64) for col in ("open", "high", "low", "close", "volume"))
+    invalid = (
+        ~np.isfinite(o) | ~np.isfinite(h) | ~np.isfinite(l) | ~np.isfinite(c)
+        | (np.minimum.reduce([o, h, l, c]) <= 0)
+        | (h < np.maximum(o, c)) | (l > np.minimum(o, c))
+    )
+    zero_volume = ~(v > 0)
+    misaligned = floor_timestamp_ms(raw_ts, timeframe) != raw_ts
+
+    ts = np.unique(raw_ts)
+    breaks = np.flatnonzero(np.diff(ts) != step)
+    starts = np.r_[ts[0], ts[breaks + 1]]
+    ends = np.r_[ts[breaks], ts[-1]]
+
+    return {
+        "ranges": [[int(s), int(e)] for s, e in zip(starts, ends)],
+        "duplicates": duplicates,
+        "out_of_order": out_of_order,
+        "misaligned": raw_ts[misaligned].tolist(),
+        "zero_volume": raw_ts[zero_volume].tolist(),
+        "invalid_ohlc": raw_ts[invalid].tolist(),
+    }
+
+class CoverageIndex:
+    """Persistent coverage and anomaly index for all pairs of one candle store."""
+
+    ANOMALY_KINDS = ("misaligned", "zero_volume", "invalid_ohlc")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries = None
+        self._version = None  # (mtime, size) of the file `_entries` was read from
+
+    @staticmethod
+    def _key(symbol: str, timeframe: str) -> str:
+        return f"{symbol}|{timeframe}"
+
+    def _file_version(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> dict:
+        """The index, re-read whenever another process (or instance) has saved it since."""
+        version = self._file_version()
+        if self._entries is None or version != self._version:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._entries = {}
+            self._version = version
+        return self._entries
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+        self._version = self._file_version()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Yields the index freshly read from disk under an exclusive lock and saves it on
+        exit, so concurrent writers merge their changes instead of overwriting each other's.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # released when the file is closed
+            self._entries = None
+            try:
+                yield self._load()
+            except BaseException:
+                self._entries = None  # drop a half-applied change
+                raise
+            self._save()
+
+    def has(self, symbol: str, timeframe: str) -> bool:
+        return self._key(symbol, timeframe) in self._load()
+
+    def reset(self, symbol: str, timeframe: str):
+        if self.has(symbol, timeframe):
+            with self._locked() as entries:
+                entries.pop(self._key(symbol, timeframe), None)
+
+    def update(self, symbol: str, timeframe: str, df: pd.DataFrame) -> dict:
+        """Merges a newly appended batch into the index and returns the batch scan."""
+        scan = scan_candles(df, timeframe)
+        with self._locked() as entries:
+            self._merge_scan(entries, symbol, timeframe, df, scan)
+        return scan
+
+    def _merge_scan(self, entries: dict, symbol: str, timeframe: str, df: pd.DataFrame, scan: dict):
+        entry = entries.setdefault(self._key(symbol, timeframe), {
+            "ranges": [], "confirmed_gaps": [], "duplicates": 0, "out_of_order": 0,
+            **{kind: [] for kind in self.ANOMALY_KINDS},
+            "anomaly_counts": {kind: 0 for kind in self.ANOMALY_KINDS},
+        })
+
+        entry["ranges"] = _merge_ranges(entry["ranges"] + scan["ranges"], timeframe_to_ms(timeframe))
+        entry["duplicates"] += scan["duplicates"]
+        entry["out_of_order"] += scan["out_of_order"]
+
+        # Rewritten rows replace their earlier verdict, so drop the batch's timestamps first.
+        if scan["ranges"]:
+            batch_ts = set(_to_ms(df["timestamp"]).tolist())
+            for kind in self.ANOMALY_KINDS:
+                kept = [ts for ts in entry[kind] if ts not in batch_ts]
+                fresh = scan[kind]
+                entry["anomaly_counts"][kind] += len(fresh)
+                entry[kind] = sorted(set(kept + fresh))[-MAX_TRACKED_ANOMALIES:]
+
+        if scan["duplicates"] or scan["out_of_order"] or any(scan[k] for k in self.ANOMALY_KINDS):
+            logger.warning(
+                f"⚠️ {symbol} {timeframe}: {scan['duplicates']} duplicate, {scan['out_of_order']} out-of-order, "
+                + ", ".join(f"{len(scan[k])} {k}" for k in self.ANOMALY_KINDS) + " rows in appended batch."
+            )
+
+    def ranges(self, symbol: str, timeframe: str) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """Continuous stored ranges as inclusive (first, last) candle open times."""
+        entry = self._load().get(self._key(symbol, timeframe), {})
+        return [(_from_ms(s), _from_ms(e)) for s, e in entry.get("ranges", [])]
+
+    def gaps(self, symbol: str, timeframe: str, start=None, end=None) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Missing candles as inclusive (first, last) open times within [start, end],
+        excluding gaps the exchange has confirmed it has no data for. With no stored
+        data the whole window is one gap.
+        """
+        step = timeframe_to_ms(timeframe)
+        entry = self._load().get(self._key(symbol, timeframe), {})
+        covered = _merge_ranges(entry.get("ranges", []) + entry.get("confirmed_gaps", []), step)
+        if not covered and (start is None or end is None):
+            return []
+
+        lo = int(floor_timestamp_ms(int(_to_ms([start])[0]), timeframe)) if start is not None else covered[0][0]
+        hi = int(floor_timestamp_ms(int(_to_ms([end])[0]), timeframe)) if end is not None else covered[-1][1]
+
+        gaps, cursor = [], lo
+        for range_start, range_end in covered:
+            if range_end < cursor:
+                continue
+            if range_start > hi:
+                break
+            if range_start > cursor:
+                gaps.append((cursor, range_start - step))
+            cursor = range_end + step
+        if cursor <= hi:
+            gaps.append((cursor, hi))
+        return [(_from_ms(s), _from_ms(e)) for s, e in gaps]
+
+    def confirm_gap(self, symbol: str, timeframe: str, start, end):
+        """Records a gap the exchange could not fill so the backfill stops asking for it."""
+        if not self.has(symbol, timeframe):
+            return
+        span = [int(_to_ms([start])[0]), int(_to_ms([end])[0])]
+        with self._locked() as entries:
+            entry = entries[self._key(symbol, timeframe)]
+            entry["confirmed_gaps"] = _merge_ranges(entry["confirmed_gaps"] + [span], timeframe_to_ms(timeframe))
+
+    def windows(self, symbol: str, timeframe: str, min_candles: int = 1) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Clean, gap-free windows: the stored ranges split around invalid or misaligned
+        rows, keeping only windows of at least `min_candles` candles.
+        """
+        step = timeframe_to_ms(timeframe)
+        entry = self._load().get(self._key(symbol, timeframe), {})
+        bad = np.array(sorted(set(entry.get("invalid_ohlc", [])) | set(entry.get("misaligned", []))), dtype=np.int64)
+
+        windows = []
+        for start, end in entry.get("ranges", []):
+            inside = bad[(bad >= start) & (bad <= end)]
+            bounds = np.r_[start - step, inside, end + step]
+            for left, right in zip(bounds[:-1], bounds[1:]):
+                w_start, w_end = int(left) + step, int(right) - step
+                if w_end >= w_start and (w_end - w_start) // step + 1 >= min_candles:
+                    windows.append((_from_ms(w_start), _from_ms(w_end)))
+        return windows
+
+    def summary(self, symbol: str, timeframe: str) -> dict:
+        """Counts suitable for logging or a dashboard."""
+        entry = self._load().get(self._key(symbol, timeframe), {})
+        return {
+            "ranges": len(entry.get("ranges", [])),
+            "gaps": len(self.gaps(symbol, timeframe)),
+            "confirmed_gaps": len(entry.get("confirmed_gaps", [])),
+            "duplicates": entry.get("duplicates", 0),
+            "out_of_order": entry.get("out_of_order", 0),
+            **entry.get("anomaly_counts", {}),
+        }
@@ -1,64 +1,168 @@
 # src/data_fetch/data_source.py
 import os
-import ccxt.pro as ccxt_pro # Use the async version
+import time
 import logging
 from datetime import datetime
 import pandas as pd
 import asyncio
+from ..shared.timeframes import timeframe_to_ms
+from .exchange_pool import exchange_pool
+from .rate_limit import get_budget
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def fetch_ohlcv_data(symbol: str, timeframe: str, since: datetime) -> pd.DataFrame | None:
+EXCHANGES = ["bybit", "binance", "okx", "kucoin"]
+
+class ExchangeLatencyStats:
     """
-    Fetches OHLCV data asynchronously using ccxt.pro, trying a list of exchanges as fallbacks.
+    Exponentially weighted fetch latency per exchange, used to order the fallback list.
+    Failures count as a slow response so a flaky exchange drifts to the back.
+    Exchanges without measurements keep their default position.
     """
-    symbol_pair = f"{symbol}/USDT"
-    since_ms = int(since.timestamp() * 1000)
-    exchanges_to_try = ["bybit", "binance", "okx", "kucoin"]
 
-    for ex_name in exchanges_to_try:
-        exchange = None
-        try:
-            exchange_class = getattr(ccxt_pro, ex_name)
-            exchange_config = {"enableRateLimit": True, 'options': {'defaultType': 'swap'}}
+    def __init__(self, alpha: float = 0.2, failure_penalty: float = 5.0, prior: float = 1.0):
+        self.alpha = alpha
+        self.failure_penalty = failure_penalty
+        self.prior = prior
+        self._ewma = {}
 
-            if ex_name == "bybit":
-                exchange_config.update({
-                    "apiKey": os.getenv("BYBIT_API_KEY", ""),
-                    "secret": os.getenv("BYBIT_API_SECRET", ""),
-                })
+    def record(self, exchange_id: str, seconds: float, ok: bool = True):
+        sample = seconds if ok else seconds + self.failure_penalty
+        previous = self._ewma.get(exchange_id)
+        self._ewma[exchange_id] = sample if previous is None else previous + self.alpha * (sample - previous)
 
-            exchange = exchange_class(exchange_config)
+    def latency(self, exchange_id: str) -> float | None:
+        return self._ewma.get(exchange_id)
 
-            if not exchange.has.get("fetchOHLCV"):
-                logger.debug(f"Exchange {ex_name} does not support fetchOHLCV.")
-                continue
+    def ordered(self, exchange_ids: list[str]) -> list[str]:
+        # sorted() is stable, so ties and unmeasured exchanges keep the default order.
+        return sorted(exchange_ids, key=lambda ex: self._ewma.get(ex, self.prior))
 
-            if timeframe not in exchange.timeframes:
-                logger.warning(f"{ex_name} does not support timeframe {timeframe}, skipping.")
-                continue
+latency_stats = ExchangeLatencyStats()
 
-            logger.info(f"🔄 Fetching {symbol_pair} @ {timeframe} from {ex_name}...")
-            # Await the async call
-            data = await exchange.fetch_ohlcv(symbol_pair, timeframe, since_ms, limit=1000)
+async def _fetch_from_exchange(ex_name: str, symbol_pair: str, timeframe: str, since_ms: int, limit: int) -> pd.DataFrame | None:
+    """Fetches from a single exchange, returning None instead of raising on failure."""
+    started = time.perf_counter()
+    try:
+        # Throttling is done by the shared per-exchange budget instead of per client.
+        exchange_config = {"enableRateLimit": False, 'options': {'defaultType': 'swap'}}
 
-            if not data:
-                logger.warning(f"⚠️ {ex_name} returned no data for {symbol_pair}.")
-                continue
+        if ex_name == "bybit":
+            exchange_config.update({
+                "apiKey": os.getenv("BYBIT_API_KEY", ""),
+                "secret": os.getenv("BYBIT_API_SECRET", ""),
+            })
 
-            df = pd.DataFrame(data, columns=["timestamp", "open", "high", "low", "close", "volume"])
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        exchange = await exchange_pool.get(ex_name, exchange_config)
 
-            logger.info(f"✅ Successfully fetched {len(df)} rows from {ex_name}.")
-            return df
+        if not exchange.has.get("fetchOHLCV"):
+            logger.debug(f"Exchange {ex_name} does not support fetchOHLCV.")
+            return None
+
+        if timeframe not in exchange.timeframes:
+            logger.warning(f"{ex_name} does not support timeframe {timeframe}, skipping.")
+            return None
+
+        logger.info(f"🔄 Fetching {symbol_pair} @ {timeframe} from {ex_name}...")
+        await get_budget(exchange).acquire()
+        data = await exchange.fetch_ohlcv(symbol_pair, timeframe, since_ms, limit=limit)
+
+        if not data:
+            logger.warning(f"⚠️ {ex_name} returned no data for {symbol_pair}.")
+            latency_stats.record(ex_name, time.perf_counter() - started, ok=False)
+            return None
 
-        except Exception as e:
-            logger.error(f"Error fetching from {ex_name}: {e}")
-            continue
-        finally:
-            if exchange:
-                await exchange.close() # Always close the connection
+        latency_stats.record(ex_name, time.perf_counter() - started)
+        df = pd.DataFrame(data, columns=["timestamp", "open", "high", "low", "close", "volume"])
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+
+        logger.info(f"✅ Successfully fetched {len(df)} rows from {ex_name}.")
+        return df
+
+    except asyncio.CancelledError:
+        # Lost a hedge race: the elapsed time is a lower bound on this exchange's latency.
+        latency_stats.record(ex_name, time.perf_counter() - started)
+        raise
+    except Exception as e:
+        latency_stats.record(ex_name, time.perf_counter() - started, ok=False)
+        logger.error(f"Error fetching from {ex_name}: {e}")
+        return None
+
+async def _fetch_hedged(exchanges: list[str], hedge_delay: float, *args) -> pd.DataFrame | None:
+    """
+    Starts the first exchange and, each time `hedge_delay` passes without a usable answer
+    (or as soon as a request fails), starts the next one alongside it. The first
+    non-empty result wins and every other in-flight request is cancelled.
+    """
+    remaining = list(exchanges)
+    pending = set()
+    try:
+        while remaining or pending:
+            if remaining:
+                pending.add(asyncio.create_task(_fetch_from_exchange(remaining.pop(0), *args)))
+
+            done, pending = await asyncio.wait(
+                pending, timeout=hedge_delay if remaining else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                df = task.result()
+                if df is not None and not df.empty:
+                    return df
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+async def fetch_ohlcv_data(symbol: str, timeframe: str, since: datetime, limit: int = 1000,
+                           hedge_delay: float | None = None) -> pd.DataFrame | None:
+    """
+    Fetches OHLCV data asynchronously using ccxt.pro, trying a list of exchanges as fallbacks.
+    Returns at most `limit` candles starting at `since`. Clients come from the shared
+    exchange pool and stay open for later calls.
+
+    Exchanges are tried fastest-first according to recent latency. With `hedge_delay`
+    set, a slow exchange no longer blocks the fallback: the next one is started in
+    parallel after that many seconds and the first valid answer is used.
+    """
+    symbol_pair = f"{symbol}/USDT"
+    since_ms = int(since.timestamp() * 1000)
+    exchanges_to_try = latency_stats.ordered(EXCHANGES)
+
+    if hedge_delay is not None:
+        df = await _fetch_hedged(exchanges_to_try, hedge_delay, symbol_pair, timeframe, since_ms, limit)
+        if df is not None:
+            return df
+    else:
+        for ex_name in exchanges_to_try:
+            df = await _fetch_from_exchange(ex_name, symbol_pair, timeframe, since_ms, limit)
+            if df is not None:
+                return df
 
     logger.error(f"❌ All exchanges failed to provide data for {symbol_pair}.")
-    return None
\ No newline at end of file
+    return None
+
+async def fetch_ohlcv_pages(symbol: str, timeframe: str, since: datetime, until: datetime | None = None, limit: int = 1000):
+    """
+    Pages forward from `since` until `until` (default: now), yielding one DataFrame per page.
+    Each page starts where the previous one ended, so callers can persist pages as they
+    arrive and resume from the last stored timestamp after a crash.
+    """
+    tf_ms = timeframe_to_ms(timeframe)
+    until_ms = int((until or datetime.utcnow()).timestamp() * 1000)
+    cursor = since
+
+    while int(cursor.timestamp() * 1000) <= until_ms:
+        page = await fetch_ohlcv_data(symbol, timeframe, cursor, limit=limit)
+        if page is None or page.empty:
+            return
+
+        yield page
+
+        last_ts = page["timestamp"].iloc[-1]
+        next_cursor = last_ts.to_pydatetime() + pd.Timedelta(milliseconds=tf_ms)
+        # Exchanges cap `limit` differently, so only stop when the cursor stops advancing.
+        if next_cursor <= cursor:
+            return
+        cursor = next_cursor
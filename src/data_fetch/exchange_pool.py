@@ -0,0 +1,89 @@
+# src/data_fetch/exchange_pool.py
+import asyncio
+import json
+import logging
+import ccxt.pro as ccxt_pro
+from .replay_exchange import replay_factory_from_config
+
+logger = logging.getLogger(__name__)
+
+class ExchangePool:
+    """
+    Process-wide cache of ccxt.pro clients keyed by exchange id and config.
+
+    Clients keep their HTTP session and loaded markets between calls, so repeated
+    fetches skip connection setup, TLS and market loading. ccxt.pro sessions are bound
+    to the event loop that created them; a client requested from a different loop
+    (e.g. a new `asyncio.run`) is replaced rather than reused. Call `close_all()` once
+    at shutdown.
+
+    An optional `factory(exchange_id, config)` replaces ccxt.pro client construction,
+    e.g. with `ReplayExchange` for offline runs.
+    """
+
+    def __init__(self, factory=None):
+        self.factory = factory
+        self._clients = {}  # key -> (exchange, loop)
+        self._lock = None
+        self._lock_loop = None
+
+    @staticmethod
+    def _make_key(exchange_id: str, exchange_config: dict | None) -> tuple:
+        return exchange_id, json.dumps(exchange_config or {}, sort_keys=True, default=str)
+
+    def _get_lock(self, loop) -> asyncio.Lock:
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _create(self, exchange_id: str, exchange_config: dict | None):
+        if self.factory is not None:
+            return self.factory(exchange_id, dict(exchange_config or {}))
+        exchange_class = getattr(ccxt_pro, exchange_id)
+        return exchange_class(dict(exchange_config or {}))
+
+    async def get(self, exchange_id: str, exchange_config: dict | None = None):
+        """Returns a ready-to-use client, creating it and loading its markets on first use."""
+        key = self._make_key(exchange_id, exchange_config)
+        loop = asyncio.get_running_loop()
+
+        entry = self._clients.get(key)
+        if entry and entry[1] is loop:
+            return entry[0]
+
+        async with self._get_lock(loop):
+            entry = self._clients.get(key)
+            if entry and entry[1] is loop:
+                return entry[0]
+            if entry:
+                logger.warning(f"Discarding {exchange_id} client bound to a previous event loop.")
+                del self._clients[key]
+
+            exchange = self._create(exchange_id, exchange_config)
+            try:
+                await exchange.load_markets()
+            except Exception:
+                await exchange.close()
+                raise
+
+            self._clients[key] = (exchange, loop)
+            logger.info(f"🔌 Opened pooled {exchange_id} client.")
+            return exchange
+
+    async def close_all(self):
+        """Closes every client owned by the current event loop and forgets the rest."""
+        loop = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for (exchange_id, _), (exchange, owner_loop) in clients.items():
+            if owner_loop is not loop:
+                continue
+            try:
+                await exchange.close()
+            except Exception as e:
+                logger.error(f"Error closing pooled {exchange_id} client: {e}")
+        if clients:
+            logger.info(f"Closed {len(clients)} pooled exchange client(s).")
+
+# Shared pool for the whole process; EXCHANGE_REPLAY_DIR switches it to offline replay
+exchange_pool = ExchangePool(factory=replay_factory_from_config())
@@ -0,0 +1,281 @@
+# src/data_fetch/feature_engine.py
+"""
+Pluggable realtime feature engine.
+
+A feature is a small stateful object that updates in constant time per order-book
+update (`on_book`, which only sees the merged book and its top levels) and/or per
+public trade (`on_trade`). Features register under a name with `@register_feature`;
+a `FeatureEngine` is built from a list of feature specs, walks each event once,
+hands it to every interested feature and publishes all their values in one write.
+
+Adding a feature therefore costs its own O(1) update per event, never another pass
+over the book or the trade batch.
+"""
+import math
+import time
+import logging
+from .microstructure import OrderBookImbalance, RollingSums, RollingTakerFlow
+
+logger = logging.getLogger(__name__)
+
+FEATURES: dict[str, type["Feature"]] = {}
+
+def register_feature(name: str):
+    """Class decorator adding a feature to the registry under `name`."""
+    def decorator(cls):
+        if name in FEATURES:
+            raise ValueError(f"Feature '{name}' is already registered.")
+        FEATURES[name] = cls
+        cls.registry_name = name
+        return cls
+    return decorator
+
+class Feature:
+    """
+    Base class for realtime features. Subclasses set `names` (the values they publish)
+    in `__init__` and override `on_book` and/or `on_trade`; the engine only dispatches
+    the events a feature overrides.
+    """
+    registry_name = None
+    names: tuple[str, ...] = ()
+
+    def on_book(self, orderbook, bids, asks):
+        """Called per order-book update with non-empty, best-first `bids` and `asks`."""
+
+    def on_trade(self, timestamp_ms: int, side: str, price: float, amount: float, cost: float):
+        """Called per public trade, in arrival order."""
+
+    def advance(self, now_ms: int):
+        """Moves time-windowed state forward without an event."""
+
+    def values(self) -> dict[str, float]:
+        """Current values for `names`; NaN while a value is not defined yet."""
+        raise NotImplementedError
+
+def _windowed(prefix: str, windows) -> tuple[str, ...]:
+    return tuple(f"{prefix}_{seconds}s" for seconds in windows)
+
+# --- Order-book features ---
+@register_feature("order_book_imbalance")
+class OrderBookImbalanceFeature(Feature):
+    """Bid/ask notional imbalance over several depth bands (see `OrderBookImbalance`)."""
+
+    def __init__(self, bands: tuple[int, ...] = (5, 10, 50)):
+        self.book = OrderBookImbalance(bands)
+        self.bands = self.book.bands
+        self.names = ("order_book_imbalance",) + tuple(f"order_book_imbalance_{band}" for band in self.bands)
+
+    def on_book(self, orderbook, bids, asks):
+        # ccxt.pro books are mirrored delta by delta; plain snapshots are summed once.
+        if not self.book.track(orderbook):
+            self.book.apply_snapshot(bids, asks)
+
+    def values(self):
+        values = {f"order_book_imbalance_{band}": self.book.imbalance(band) for band in self.bands}
+        values["order_book_imbalance"] = values[f"order_book_imbalance_{self.bands[-1]}"]
+        return values
+
+@register_feature("spread")
+class SpreadFeature(Feature):
+    """Best bid/ask spread, absolute and in basis points of the mid price."""
+    names = ("spread", "spread_bps")
+
+    def __init__(self):
+        self.spread = self.spread_bps = math.nan
+
+    def on_book(self, orderbook, bids, asks):
+        bid, ask = bids[0][0], asks[0][0]
+        self.spread = ask - bid
+        self.spread_bps = self.spread / (ask + bid) * 2e4
+
+    def values(self):
+        return {"spread": self.spread, "spread_bps": self.spread_bps}
+
+@register_feature("microprice")
+class MicropriceFeature(Feature):
+    """
+    Size-weighted mid price of the top of book, and its offset from the plain mid in
+    basis points (positive when the bid side is heavier).
+    """
+    names = ("microprice", "microprice_offset_bps")
+
+    def __init__(self):
+        self.microprice = self.offset_bps = math.nan
+
+    def on_book(self, orderbook, bids, asks):
+        (bid, bid_size), (ask, ask_size) = bids[0][:2], asks[0][:2]
+        total = bid_size + ask_size
+        mid = (bid + ask) / 2
+        self.microprice = (bid * ask_size + ask * bid_size) / total if total > 0 else mid
+        self.offset_bps = (self.microprice - mid) / mid * 1e4
+
+    def values(self):
+        return {"microprice": self.microprice, "microprice_offset_bps": self.offset_bps}
+
+# --- Trade features ---
+@register_feature("taker_flow")
+class TakerFlowFeature(Feature):
+    """Taker buy/sell notional ratio over trailing windows (see `RollingTakerFlow`)."""
+
+    def __init__(self, windows: tuple[int, ...] = (10, 60, 300), primary_window: int = 60):
+        self.flow = RollingTakerFlow(windows)
+        self.primary_window = primary_window
+        self.names = ("taker_buy_sell_ratio",) + _windowed("taker_buy_sell_ratio", self.flow.windows)
+
+    def on_trade(self, timestamp_ms, side, price, amount, cost):
+        self.flow.append(timestamp_ms, side, cost)
+
+    def advance(self, now_ms):
+        self.flow.advance(now_ms)
+
+    def values(self):
+        values = {f"taker_buy_sell_ratio_{seconds}s": self.flow.ratio(seconds) for seconds in self.flow.windows}
+        values["taker_buy_sell_ratio"] = values[f"taker_buy_sell_ratio_{self.primary_window}s"]
+        return values
+
+@register_feature("vwap")
+class RollingVWAPFeature(Feature):
+    """Rolling volume-weighted average trade price, and the last price's deviation from it in bps."""
+
+    def __init__(self, windows: tuple[int, ...] = (60, 300)):
+        self.sums = RollingSums(windows, columns=2)  # notional, base amount
+        self.last_price = math.nan
+        self.names = _windowed("vwap", self.sums.windows) + _windowed("vwap_deviation_bps", self.sums.windows)
+
+    def on_trade(self, timestamp_ms, side, price, amount, cost):
+        self.sums.append(timestamp_ms, (cost, amount))
+        self.last_price = price
+
+    def advance(self, now_ms):
+        self.sums.advance(now_ms)
+
+    def values(self):
+        values = {}
+        for seconds in self.sums.windows:
+            notional, amount = self.sums.sums(seconds)
+            vwap = notional / amount if amount > 0 else math.nan
+            values[f"vwap_{seconds}s"] = vwap
+            values[f"vwap_deviation_bps_{seconds}s"] = (self.last_price - vwap) / vwap * 1e4
+        return values
+
+@register_feature("realized_volatility")
+class RealizedVolatilityFeature(Feature):
+    """
+    Realized volatility of trade prices: square root of the summed squared log returns
+    between consecutive trades within each window (not annualized).
+    """
+
+    def __init__(self, windows: tuple[int, ...] = (60, 300)):
+        self.sums = RollingSums(windows, columns=1)
+        self.last_price = None
+        self.names = _windowed("realized_volatility", self.sums.windows)
+
+    def on_trade(self, timestamp_ms, side, price, amount, cost):
+        if self.last_price is not None and price > 0:
+            log_return = math.log(price / self.last_price)
+            self.sums.append(timestamp_ms, (log_return * log_return,))
+        if price > 0:
+            self.last_price = price
+
+    def advance(self, now_ms):
+        self.sums.advance(now_ms)
+
+    def values(self):
+        # max() guards against tiny negative sums left by floating-point eviction
+        return {f"realized_volatility_{seconds}s": math.sqrt(max(self.sums.sums(seconds)[0], 0.0))
+                for seconds in self.sums.windows}
+
+@register_feature("trade_intensity")
+class TradeIntensityFeature(Feature):
+    """Trades per second over trailing windows."""
+
+    def __init__(self, windows: tuple[int, ...] = (10, 60)):
+        self.sums = RollingSums(windows, columns=0)
+        self.names = _windowed("trade_intensity", self.sums.windows)
+
+    def on_trade(self, timestamp_ms, side, price, amount, cost):
+        self.sums.append(timestamp_ms)
+
+    def advance(self, now_ms):
+        self.sums.advance(now_ms)
+
+    def values(self):
+        return {f"trade_intensity_{seconds}s": self.sums.count(seconds) / seconds for seconds in self.sums.windows}
+
+# --- Engine ---
+def build_feature(spec) -> Feature:
+    """Instantiates a registered feature from a name or a `(name, kwargs)` pair."""
+    name, kwargs = (spec, {}) if isinstance(spec, str) else spec
+    if name not in FEATURES:
+        raise ValueError(f"Unknown feature '{name}'. Registered: {', '.join(sorted(FEATURES))}")
+    return FEATURES[name](**kwargs)
+
+class FeatureEngine:
+    """Dispatches order-book and trade events to a set of features in a single pass."""
+
+    def __init__(self, specs):
+        self.features = [build_feature(spec) for spec in specs]
+        self.names = [name for feature in self.features for name in feature.names]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Duplicate feature names in {self.names}")
+        # Bound methods of the features that actually handle each event type
+        self._book_handlers = [f.on_book for f in self.features if type(f).on_book is not Feature.on_book]
+        self._trade_handlers = [f.on_trade for f in self.features if type(f).on_trade is not Feature.on_trade]
+        self._advancers = [f.advance for f in self.features if type(f).advance is not Feature.advance]
+        self._book_features = [f for f in self.features if type(f).on_book is not Feature.on_book]
+        self._trade_features = [f for f in self.features if type(f).on_trade is not Feature.on_trade]
+        self.last_trade_ms = None      # exchange time of the newest trade fed
+        self._last_trade_at = None     # local monotonic time it was fed at
+
+    def on_book(self, orderbook) -> bool:
+        """Feeds one order-book update to every book feature; False for an empty side."""
+        bids, asks = orderbook["bids"], orderbook["asks"]
+        if not bids or not asks:
+            return False
+        for handler in self._book_handlers:
+            handler(orderbook, bids, asks)
+        return True
+
+    def on_trades(self, trades) -> int:
+        """Feeds a batch of ccxt trades to every trade feature; returns how many were fed."""
+        handlers = self._trade_handlers
+        for trade in trades:
+            price, amount = trade["price"], trade["amount"]
+            cost = trade.get("cost")
+            if cost is None:
+                cost = price * amount
+            timestamp, side = trade["timestamp"], trade["side"]
+            for handler in handlers:
+                handler(timestamp, side, price, amount, cost)
+        if trades and (self.last_trade_ms is None or trades[-1]["timestamp"] >= self.last_trade_ms):
+            self.last_trade_ms, self._last_trade_at = trades[-1]["timestamp"], time.monotonic()
+        return len(trades)
+
+    def trade_clock_ms(self) -> int | None:
+        """
+        Exchange time now, extrapolated from the newest trade by the local time since it
+        arrived; None before the first trade. Keeps windows keyed on exchange time
+        whatever the offset between the exchange's clock and ours (or a replay's).
+        """
+        if self.last_trade_ms is None:
+            return None
+        return self.last_trade_ms + int((time.monotonic() - self._last_trade_at) * 1000)
+
+    def advance(self, now_ms: int):
+        """Moves every time-windowed feature forward to `now_ms` without an event."""
+        for advance in self._advancers:
+            advance(now_ms)
+
+    def values(self, kind: str | None = None) -> dict[str, float]:
+        """Values of all features, or only of the `"book"` or `"trades"` features."""
+        features = {"book": self._book_features, "trades": self._trade_features}.get(kind, self.features)
+        values = {}
+        for feature in features:
+            values.update(feature.values())
+        return values
+
+    def publish(self, store, symbol: str, kind: str | None = None, **extra: float):
+        """Writes the current values, plus any `extra` ones, to the feature store in one seqlocked update."""
+        values = self.values(kind)
+        values.update(extra)
+        store.write(symbol, values)
@@ -4,68 +4,119 @@ import logging
 import pandas as pd
 from datetime import datetime, timedelta
 import asyncio
+import argparse
 # Use the async-compatible data_source
-from .data_source import fetch_ohlcv_data
-from ..shared.constants import SYMBOLS, NATIVE_TIMEFRAMES
+from .data_source import fetch_ohlcv_pages
+from .exchange_pool import exchange_pool
+from .candle_store import candle_store
+from .fetch_scheduler import FetchScheduler
+from .resampler import derive_timeframes
+from ..config import config
+from ..shared.constants import SYMBOLS, BASE_TIMEFRAME, DERIVED_TIMEFRAMES
 
+# Legacy CSV history, only read to migrate it into the candle store
 DATA_BASE_PATH = "/workspace/data/history"
+BACKFILL_DAYS = 90
+# Pages are buffered and written together to limit partition rewrites
+FLUSH_ROWS = 10000
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 os.makedirs(DATA_BASE_PATH, exist_ok=True)
 
 def get_csv_path(symbol: str, timeframe: str) -> str:
-    """Helper function to get the full, consistent path for CSV files."""
+    """Helper function to get the full, consistent path for legacy CSV files."""
     return os.path.join(DATA_BASE_PATH, f"{symbol}USDT_{timeframe}.csv")
 
-async def fetch_and_store(symbol: str, timeframe: str):
-    """Asynchronously fetches data and stores it."""
-    now = datetime.utcnow()
-    start_date = now - timedelta(days=90) # Fetch more data for better indicator calculation
-    # Await the async function
-    df = await fetch_ohlcv_data(symbol, timeframe, start_date)
+async def _store_pages(symbol: str, timeframe: str, since: datetime, until: datetime | None = None) -> tuple[int, bool]:
+    """
+    Pages candles from `since` to `until` into the store, flushing every FLUSH_ROWS rows.
+    Returns (candles stored, whether the exchange answered at all).
+    """
+    buffer, buffered_rows, stored, answered = [], 0, 0, False
+    async for page in fetch_ohlcv_pages(symbol, timeframe, since, until=until):
+        answered = True
+        if until is not None:
+            page = page[page["timestamp"] <= until]
+        buffer.append(page)
+        buffered_rows += len(page)
+        if buffered_rows >= FLUSH_ROWS:
+            stored += candle_store.append(symbol, timeframe, pd.concat(buffer, ignore_index=True))
+            buffer, buffered_rows = [], 0
+    if buffer:
+        stored += candle_store.append(symbol, timeframe, pd.concat(buffer, ignore_index=True))
+    return stored, answered
 
-    if df is not None and not df.empty:
-        df.to_csv(get_csv_path(symbol, timeframe), index=False)
-    else:
-        logging.error(f"❌ No data for {symbol} on {timeframe}.")
+async def fetch_and_store(symbol: str, timeframe: str, days: int = BACKFILL_DAYS, full: bool = False):
+    """
+    Incrementally backfills candles for one symbol/timeframe into the candle store.
 
-def simulate_10m(symbol: str):
-    """Remains synchronous as it only performs local file I/O."""
-    try:
-        path_1m = get_csv_path(symbol, '1m')
-        if not os.path.exists(path_1m):
-            logging.warning(f"⚠️ Cannot simulate 10m for {symbol}, 1m data missing at {path_1m}.")
-            return
+    Pages forward from the last stored timestamp (or `days` ago for a new pair) and
+    appends only new candles. The last stored candle is re-fetched and replaced because
+    it may have been the still-forming candle. Buffered pages are flushed every
+    FLUSH_ROWS rows, so an interrupted run resumes close to where it stopped. Gaps the
+    coverage index finds inside the window are then re-requested individually.
+    Returns the number of candles stored.
+    """
+    if full:
+        candle_store.delete(symbol, timeframe)
+    elif not candle_store.has_data(symbol, timeframe) and os.path.exists(get_csv_path(symbol, timeframe)):
+        candle_store.import_csv(get_csv_path(symbol, timeframe), symbol, timeframe)
 
-        df_1m = pd.read_csv(path_1m, parse_dates=['timestamp'])
-        df_1m = df_1m.set_index('timestamp')
+    window_start = datetime.utcnow() - timedelta(days=days)
+    last_ts = candle_store.last_timestamp(symbol, timeframe)
+    since = last_ts.to_pydatetime() if last_ts is not None else window_start
 
-        resampled_df = df_1m.resample('10T').agg({
-            'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
-        }).dropna().reset_index()
+    stored, _ = await _store_pages(symbol, timeframe, since)
 
-        resampled_df.to_csv(get_csv_path(symbol, '10m'), index=False)
-        logging.info(f"🧪 {symbol} 10m timeframe simulated and saved.")
-    except Exception as e:
-        logging.error(f"❌ Failed to simulate 10m for {symbol}: {e}")
+    # Fill holes inside the backfill window, requesting only the missing ranges.
+    if last_ts is not None:
+        for gap_start, gap_end in candle_store.gaps(symbol, timeframe, start=window_start, end=last_ts):
+            filled, answered = await _store_pages(symbol, timeframe, gap_start.to_pydatetime(), until=gap_end.to_pydatetime())
+            if answered and not filled:
+                # The exchange skipped this range entirely; don't ask again on every run.
+                candle_store.coverage.confirm_gap(symbol, timeframe, gap_start, gap_end)
+            stored += filled
+
+    if stored:
+        logging.info(f"💾 {symbol} {timeframe}: stored {stored} candles.")
+    elif last_ts is None:
+        logging.error(f"❌ No data for {symbol} on {timeframe}.")
+    else:
+        logging.info(f"{symbol} {timeframe} is already up to date.")
+    return stored
 
-async def main():
+async def main(days: int = BACKFILL_DAYS, full: bool = False, concurrency: int = config.FETCH_CONCURRENCY):
     """Main async function to coordinate fetching and processing."""
     logging.info("--- Fetching All Futures Data ---")
-    # Create concurrent tasks for fetching native timeframes
-    tasks = []
+    # Only the base timeframe is downloaded; the scheduler bounds how many run at once.
+    scheduler = FetchScheduler(max_concurrency=concurrency)
     for symbol in SYMBOLS:
-        for tf in NATIVE_TIMEFRAMES:
-            tasks.append(fetch_and_store(symbol, tf))
-    
-    await asyncio.gather(*tasks)
+        scheduler.submit(symbol, BASE_TIMEFRAME, lambda s=symbol: fetch_and_store(s, BASE_TIMEFRAME, days=days, full=full))
+
+    try:
+        await scheduler.run()
+    finally:
+        # All fetches share pooled clients; close them once the run is done.
+        await exchange_pool.close_all()
     
-    # Run synchronous simulation after all data is fetched
-    logging.info("--- Simulating 10m Timeframes ---")
+    # Resample the new base tail into every other timeframe
+    logging.info("--- Deriving Timeframes ---")
     for symbol in SYMBOLS:
-        simulate_10m(symbol)
+        if full:
+            for tf in DERIVED_TIMEFRAMES:
+                candle_store.delete(symbol, tf)
+        try:
+            derive_timeframes(candle_store, symbol, DERIVED_TIMEFRAMES, base_timeframe=BASE_TIMEFRAME)
+        except Exception as e:
+            logging.error(f"❌ Failed to derive timeframes for {symbol}: {e}")
 
     logging.info("--- Data Fetching Complete ---")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Incrementally backfill historical futures candles.")
+    parser.add_argument("--days", type=int, default=BACKFILL_DAYS, help="History to backfill for new files. Default is 90.")
+    parser.add_argument("--full", action="store_true", help="Discard stored history and re-download everything.")
+    parser.add_argument("--concurrency", type=int, default=config.FETCH_CONCURRENCY, help="Maximum fetch jobs in flight.")
+    args = parser.parse_args()
+
+    asyncio.run(main(days=args.days, full=args.full, concurrency=args.concurrency))
\ No newline at end of file
@@ -0,0 +1,98 @@
+# src/data_fetch/fetch_scheduler.py
+import time
+import asyncio
+import logging
+import itertools
+from ..config import config
+from ..shared.timeframes import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+class FetchJobResult:
+    """Outcome and timing of one scheduled fetch job."""
+
+    def __init__(self, symbol: str, timeframe: str, seconds: float, candles: int = 0, error: Exception | None = None):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.seconds = seconds
+        self.candles = candles
+        self.error = error
+
+    def __repr__(self):
+        status = f"error={self.error!r}" if self.error else f"candles={self.candles}"
+        return f"FetchJobResult({self.symbol} {self.timeframe}, {self.seconds:.2f}s, {status})"
+
+class FetchScheduler:
+    """
+    Runs fetch jobs with a bounded number in flight, in priority order.
+
+    Jobs default to the timeframe length as priority, so short timeframes (which go
+    stale fastest and need the most pages) start first; jobs of equal priority run in
+    submission order. `fetch_futures_data` only fetches the base timeframe (the others
+    are derived from it), so there it runs symbols in SYMBOLS order; the timeframe
+    priority matters to callers that submit several timeframes. Request pacing itself
+    is left to the per-exchange budgets in `rate_limit`, which every job shares.
+    """
+
+    def __init__(self, max_concurrency: int = config.FETCH_CONCURRENCY):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self._jobs = []
+        self._sequence = itertools.count()
+
+    def submit(self, symbol: str, timeframe: str, job_factory, priority: float | None = None):
+        """
+        Queues a job. `job_factory` is a zero-argument callable returning a coroutine
+        that resolves to the number of candles fetched.
+        """
+        if priority is None:
+            priority = timeframe_to_seconds(timeframe)
+        self._jobs.append((priority, next(self._sequence), symbol, timeframe, job_factory))
+
+    async def _run_job(self, symbol, timeframe, job_factory) -> FetchJobResult:
+        started = time.perf_counter()
+        try:
+            candles = await job_factory()
+            return FetchJobResult(symbol, timeframe, time.perf_counter() - started, candles or 0)
+        except Exception as e:
+            logger.error(f"❌ Fetch job {symbol} {timeframe} failed: {e}")
+            return FetchJobResult(symbol, timeframe, time.perf_counter() - started, error=e)
+
+    async def run(self) -> list[FetchJobResult]:
+        """Runs every queued job and returns their results in completion order."""
+        queue = asyncio.PriorityQueue()
+        for job in self._jobs:
+            queue.put_nowait(job)
+        self._jobs = []
+
+        results = []
+
+        async def worker():
+            while True:
+                try:
+                    _, _, symbol, timeframe, job_factory = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results.append(await self._run_job(symbol, timeframe, job_factory))
+
+        started = time.perf_counter()
+        workers = min(self.max_concurrency, queue.qsize())
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        self.log_report(results, time.perf_counter() - started)
+        return results
+
+    @staticmethod
+    def log_report(results: list[FetchJobResult], elapsed: float):
+        """Logs per-job timings and overall throughput."""
+        if not results:
+            return
+        for result in sorted(results, key=lambda r: r.seconds, reverse=True):
+            logger.info(f"⏱️ {result!r}")
+        candles = sum(r.candles for r in results)
+        failed = sum(1 for r in results if r.error)
+        rate = candles / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"📊 {len(results)} fetch jobs in {elapsed:.1f}s: {candles} candles "
+            f"({rate:.0f} candles/s), {failed} failed."
+        )
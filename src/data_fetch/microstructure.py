@@ -0,0 +1,458 @@
+# src/data_fetch/microstructure.py
+"""
+Incremental market-microstructure state for the realtime feature manager.
+
+`OrderBookImbalance` keeps bid/ask notional for several depth bands (e.g. top 5, 10
+and 50 levels) so the imbalance can be read after every book update without
+rebuilding lists or re-summing the whole book. `RollingSums` keeps running sums
+over several trailing time windows; `RollingTakerFlow` uses it for taker
+buy/sell notional. `TradeCandles` builds OHLCV candles from the trade stream.
+"""
+import logging
+from array import array
+from bisect import bisect_left
+from ..shared.timeframes import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+def _probe_ccxt_book_side():
+    """
+    `OrderBookImbalance.track` relies on private ccxt.pro internals: book sides are
+    lists kept sorted alongside an `_index` of keys (negated prices for bids), with a
+    `side` flag, changed through `storeArray`/`clear`/`pop`. Returns ccxt's
+    `OrderBookSide` if a sample book still behaves that way, else None.
+    """
+    try:
+        from ccxt.async_support.base.ws.order_book_side import Asks, Bids, OrderBookSide
+        bids, asks = Bids([[1.0, 1.0], [2.0, 1.0]]), Asks([[3.0, 1.0], [2.5, 1.0]])
+        bids.storeArray([1.0, 0.0])
+        if (bids._index, [list(level) for level in bids], bids.side) != ([-2.0], [[2.0, 1.0]], True) \
+                or (asks._index, asks.side) != ([2.5, 3.0], False) \
+                or not all(callable(getattr(bids, name, None)) for name in ("clear", "pop")):
+            raise ValueError("unexpected book side layout")
+        return OrderBookSide
+    except Exception as e:
+        logger.warning(f"ccxt.pro order books cannot be tracked incrementally ({e}); "
+                       "order-book bands are recomputed from each snapshot instead.")
+        return None
+
+_CcxtOrderBookSide = _probe_ccxt_book_side()
+
+DEFAULT_BANDS = (5, 10, 50)
+
+# Running sums drift by float rounding; recompute them exactly after this many deltas
+RESYNC_EVERY_DELTAS = 100_000
+
+def _update_bands(sums: list[float], bands: tuple[int, ...], levels, rank: int, price: float, old: float, new: float):
+    """
+    Adjusts cumulative band notionals for one level change at `rank`, given the
+    levels (best first) as they are after the change.
+    """
+    if old and new:
+        diff = price * (new - old)
+        for i, band in enumerate(bands):
+            if rank < band:
+                sums[i] += diff
+    elif old:
+        # Removed: the level that was just outside each band moves into it.
+        depth, removed = len(levels), price * old
+        for i, band in enumerate(bands):
+            if rank < band:
+                if depth >= band:
+                    level = levels[band - 1]
+                    sums[i] += level[0] * level[1] - removed
+                else:
+                    sums[i] -= removed
+    elif new:
+        # Inserted: the level that was last in each band is pushed out of it.
+        depth, added = len(levels), price * new
+        for i, band in enumerate(bands):
+            if rank < band:
+                if depth > band:
+                    level = levels[band]
+                    sums[i] += added - level[0] * level[1]
+                else:
+                    sums[i] += added
+
+def _exact_bands(levels, bands: tuple[int, ...], out: list[float]):
+    """Fills `out` in place with cumulative notional at each band depth, in one pass."""
+    total, depth, band_index, last_band = 0.0, 0, 0, len(bands)
+    next_depth = bands[0]
+    for level in levels:
+        total += level[0] * level[1]
+        depth += 1
+        if depth == next_depth:
+            out[band_index] = total
+            band_index += 1
+            if band_index == last_band:
+                return
+            next_depth = bands[band_index]
+    while band_index < last_band:
+        out[band_index] = total
+        band_index += 1
+
+class _BookSide:
+    """One side of a book fed by raw deltas: sorted keys (best first) parallel to [price, size] levels."""
+
+    def __init__(self, is_bid: bool):
+        self.sign = -1.0 if is_bid else 1.0  # keys ascend from the best level on both sides
+        self.keys = []
+        self.levels = []
+
+    def store(self, price: float, size: float) -> tuple[int, float]:
+        """Sets the size at a price (0 removes it); returns (rank, previous size)."""
+        key = price * self.sign
+        keys = self.keys
+        rank = bisect_left(keys, key)
+        if rank < len(keys) and keys[rank] == key:
+            old = self.levels[rank][1]
+            if size:
+                self.levels[rank][1] = size
+            else:
+                del keys[rank]
+                del self.levels[rank]
+            return rank, old
+        if size:
+            keys.insert(rank, key)
+            self.levels.insert(rank, [price, size])
+        return rank, 0.0
+
+class OrderBookImbalance:
+    """
+    Bid/ask notional imbalance over several depth bands, maintained incrementally.
+
+    Three ways to feed it:
+    - `track(orderbook)` hooks the cached ccxt.pro order book, so every level change
+      ccxt applies also updates the band sums in O(bands), without copying the book.
+    - `apply_delta` for feeds that publish raw book deltas (O(log n) per level).
+    - `apply_snapshot` for plain merged books; all bands in one pass, no allocation.
+    """
+
+    def __init__(self, bands: tuple[int, ...] = DEFAULT_BANDS):
+        self.bands = tuple(sorted(bands))
+        self.max_band = self.bands[-1]
+        self._band_index = {band: i for i, band in enumerate(self.bands)}
+        self._bid_sums = [0.0] * len(self.bands)
+        self._ask_sums = [0.0] * len(self.bands)
+        self._raw = None       # (_BookSide, _BookSide) when fed raw deltas
+        self._tracked = None   # (bids, asks) of a hooked ccxt.pro book
+        self._deltas = 0
+
+    def _reset(self, bid_levels=(), ask_levels=()):
+        _exact_bands(bid_levels, self.bands, self._bid_sums)
+        _exact_bands(ask_levels, self.bands, self._ask_sums)
+
+    def _count_delta(self):
+        self._deltas += 1
+        if self._deltas % RESYNC_EVERY_DELTAS == 0:
+            self._resync()
+
+    def _resync(self):
+        sources = self._tracked or (self._raw and (self._raw[0].levels, self._raw[1].levels))
+        if sources:
+            self._reset(*sources)
+
+    def apply_delta(self, side: str, price: float, size: float):
+        """Applies one level change; `side` is 'bid'/'bids' or 'ask'/'asks', size 0 deletes."""
+        if self._raw is None:
+            self.untrack()
+            self._raw = (_BookSide(True), _BookSide(False))
+            self._reset()
+        is_bid = side.startswith("bid")
+        book_side = self._raw[0] if is_bid else self._raw[1]
+        rank, old = book_side.store(price, size)
+        if old != size:
+            _update_bands(self._bid_sums if is_bid else self._ask_sums, self.bands, book_side.levels, rank, price, old, size)
+            self._count_delta()
+
+    def apply_snapshot(self, bids, asks):
+        """Replaces the state with a merged book (levels sorted best first)."""
+        self.untrack()
+        self._raw = None
+        self._reset(bids, asks)
+
+    # --- ccxt.pro order book hooks ---
+    def track(self, orderbook) -> bool:
+        """
+        Follows a ccxt.pro order book from now on. Returns False for books whose sides
+        are plain lists (e.g. REST or replay snapshots), or when the installed ccxt no
+        longer has the internals the hooks need; use `apply_snapshot` for those.
+        Calling it again with the same book is free; a new book object (e.g. after a
+        reconnect) replaces the old one.
+        """
+        bids, asks = orderbook["bids"], orderbook["asks"]
+        if self._tracked is not None and self._tracked[0] is bids and self._tracked[1] is asks:
+            return True
+        if _CcxtOrderBookSide is None or not all(
+            isinstance(side, _CcxtOrderBookSide) and hasattr(side, "_index") for side in (bids, asks)
+        ):
+            return False
+
+        self.untrack()
+        self._raw = None
+        self._reset(bids, asks)
+        self._hook(bids, self._bid_sums)
+        self._hook(asks, self._ask_sums)
+        self._tracked = (bids, asks)
+        return True
+
+    def untrack(self):
+        """Stops following the current ccxt.pro book, restoring its original methods."""
+        if self._tracked is not None:
+            for levels in self._tracked:
+                for name in ("storeArray", "clear", "pop"):
+                    levels.__dict__.pop(name, None)
+            self._tracked = None
+
+    def _hook(self, levels, sums: list[float]):
+        """
+        Wraps the mutators of one ccxt.pro book side (a list subclass kept sorted
+        alongside its `_index` of keys) so each change also updates `sums`.
+        """
+        store_array, clear, pop = levels.storeArray, levels.clear, levels.pop
+        index, is_bid, bands, max_band = levels._index, levels.side, self.bands, self.max_band
+        plain_side = type(levels).storeArray is _CcxtOrderBookSide.storeArray
+
+        def hooked_store_array(delta):
+            price = delta[0]
+            key = -price if is_bid else price
+            rank = bisect_left(index, key)
+            found = rank < len(index) and index[rank] == key
+            old = levels[rank][1] if found else 0.0
+            if plain_side:
+                # Same update as OrderBookSide.storeArray, reusing the bisect above.
+                new = delta[1]
+                if new:
+                    if found:
+                        levels[rank][1] = new
+                    else:
+                        index.insert(rank, key)
+                        levels.insert(rank, delta)
+                elif found:
+                    del index[rank]
+                    del levels[rank]
+            else:
+                store_array(delta)
+                # Read the result back so counted/indexed sides keep their own semantics.
+                new = levels[rank][1] if rank < len(index) and index[rank] == key else 0.0
+            if rank < max_band and old != new:
+                _update_bands(sums, bands, levels, rank, price, old, new)
+                self._deltas += 1
+                if self._deltas % RESYNC_EVERY_DELTAS == 0:
+                    self._resync()
+
+        def hooked_clear():
+            clear()
+            sums[:] = [0.0] * len(bands)
+
+        def hooked_pop(position=-1):
+            level = pop(position)
+            rank = position if position >= 0 else len(levels) + 1 + position
+            if rank < max_band:
+                _update_bands(sums, bands, levels, rank, level[0], level[1], 0.0)
+            return level
+
+        levels.storeArray, levels.clear, levels.pop = hooked_store_array, hooked_clear, hooked_pop
+
+    # --- Readers ---
+    def notional(self, band: int) -> tuple[float, float]:
+        """(bid, ask) notional within the top `band` levels."""
+        i = self._band_index[band]
+        return self._bid_sums[i], self._ask_sums[i]
+
+    def imbalance(self, band: int | None = None) -> float:
+        """(bid - ask) / (bid + ask) notional within the band, 0.0 for an empty book."""
+        i = self._band_index[band or self.max_band]
+        bid, ask = self._bid_sums[i], self._ask_sums[i]
+        total = bid + ask
+        return (bid - ask) / total if total > 0 else 0.0
+
+    def imbalances(self) -> dict[int, float]:
+        return {band: self.imbalance(band) for band in self.bands}
+
+class RollingSums:
+    """
+    Running sums of a few value columns over several trailing windows of event time
+    (e.g. 10s, 60s, 5m).
+
+    Events live once in a compact ring buffer (timestamp and value arrays); each window
+    keeps a cursor to its oldest event and one running sum per column, so an event costs
+    O(columns) per window on arrival and again on eviction, whatever the event rate.
+    """
+
+    def __init__(self, windows_seconds: tuple[int, ...] = (60,), columns: int = 1, capacity: int = 4096):
+        self.windows = tuple(sorted(windows_seconds))
+        self.columns = columns
+        self._window_ms = [int(w * 1000) for w in self.windows]
+        self._window_index = {w: i for i, w in enumerate(self.windows)}
+        capacity = 1 << max(capacity - 1, 1).bit_length()  # power of two for masking
+        self._ts = array("q", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity * columns))
+        self._mask = capacity - 1
+        self._head = 0                               # sequence number of the next event
+        self._tails = [0] * len(self.windows)        # oldest event still inside each window
+        self._sums = [[0.0] * columns for _ in self.windows]
+        self.latest_ts = None
+
+    def _grow(self):
+        """Doubles the ring, keeping events from the oldest live one onwards in order."""
+        start, columns, old_mask = self._tails[-1], self.columns, self._mask
+        ts, values = self._ts, self._values
+        capacity = (old_mask + 1) * 2
+        self._ts = array("q", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity * columns))
+        self._mask = capacity - 1
+        for seq in range(start, self._head):
+            old, new = seq & old_mask, seq & self._mask
+            self._ts[new] = ts[old]
+            self._values[new * columns:(new + 1) * columns] = values[old * columns:(old + 1) * columns]
+
+    def append(self, timestamp_ms: int, values: tuple[float, ...] = ()):
+        """Adds one event and evicts events that fell out of each window."""
+        if self._head - self._tails[-1] > self._mask:
+            self._grow()
+        slot = self._head & self._mask
+        self._ts[slot] = timestamp_ms
+        if values:
+            base = slot * self.columns
+            self._values[base:base + self.columns] = array("d", values)
+            for sums in self._sums:
+                for c, value in enumerate(values):
+                    sums[c] += value
+        self._head += 1
+        if self.latest_ts is None or timestamp_ms > self.latest_ts:
+            self.latest_ts = timestamp_ms
+        self._evict(self.latest_ts)
+
+    def advance(self, now_ms: int):
+        """Moves the window end forward without an event, e.g. on a timer in a quiet market."""
+        if self.latest_ts is None or now_ms > self.latest_ts:
+            self.latest_ts = now_ms
+            self._evict(now_ms)
+
+    def _evict(self, now_ms: int):
+        ts, values, mask, head, columns = self._ts, self._values, self._mask, self._head, self.columns
+        for i, window_ms in enumerate(self._window_ms):
+            tail, cutoff = self._tails[i], now_ms - window_ms
+            if tail == head or ts[tail & mask] > cutoff:
+                continue
+            sums = self._sums[i]
+            while tail < head and ts[tail & mask] <= cutoff:
+                base = (tail & mask) * columns
+                for c in range(columns):
+                    sums[c] -= values[base + c]
+                tail += 1
+            if tail == head:
+                sums[:] = [0.0] * columns  # drop accumulated rounding with the last event
+            self._tails[i] = tail
+
+    def sums(self, window_seconds: int) -> tuple[float, ...]:
+        """Per-column sums within the window."""
+        return tuple(self._sums[self._window_index[window_seconds]])
+
+    def count(self, window_seconds: int) -> int:
+        """Number of events within the window."""
+        return self._head - self._tails[self._window_index[window_seconds]]
+
+class RollingTakerFlow:
+    """
+    Taker buy/sell notional over several trailing windows (e.g. 10s, 60s, 5m), keyed on
+    exchange trade time, with O(1) work per trade and window (see `RollingSums`).
+    """
+
+    def __init__(self, windows_seconds: tuple[int, ...] = (10, 60, 300), capacity: int = 4096):
+        self._sums = RollingSums(windows_seconds, columns=2, capacity=capacity)
+        self.windows = self._sums.windows
+
+    @property
+    def latest_ts(self) -> int | None:
+        return self._sums.latest_ts
+
+    def append(self, timestamp_ms: int, side: str, cost: float):
+        """Adds one trade and evicts trades that fell out of each window."""
+        self._sums.append(timestamp_ms, (cost, 0.0) if side == "buy" else (0.0, cost))
+
+    def update(self, trades) -> int:
+        """Adds a batch of ccxt trades; returns how many were added."""
+        for trade in trades:
+            cost = trade.get("cost")
+            if cost is None:
+                cost = trade["price"] * trade["amount"]
+            self.append(trade["timestamp"], trade["side"], cost)
+        return len(trades)
+
+    def advance(self, now_ms: int):
+        """Moves the window end forward without a trade, e.g. on a timer in a quiet market."""
+        self._sums.advance(now_ms)
+
+    def volumes(self, window_seconds: int) -> tuple[float, float]:
+        """(taker buy, taker sell) notional within the window."""
+        return self._sums.sums(window_seconds)
+
+    def count(self, window_seconds: int) -> int:
+        return self._sums.count(window_seconds)
+
+    def ratio(self, window_seconds: int) -> float:
+        """Taker buy/sell notional ratio; the buy notional itself when there are no sells."""
+        buy, sell = self.volumes(window_seconds)
+        return buy / sell if sell > 0 else buy
+
+class TradeCandles:
+    """
+    OHLCV candles of several timeframes built from a trade stream. Trades only touch the
+    open base candle; larger timeframes fold in each base candle as it closes. A candle
+    is emitted, as `[open_time_ms, open, high, low, close, volume]`, by the first trade
+    of a later bucket; trades older than the open base candle are ignored. Candles that
+    opened before the first trade seen (since construction or `reset`) are partial and
+    are not emitted.
+    """
+
+    def __init__(self, timeframes=("1m",), base_timeframe: str = "1m"):
+        self.base_timeframe = base_timeframe
+        self._base_ms = timeframe_to_ms(base_timeframe)
+        self._emit_base = base_timeframe in timeframes
+        self._frames = sorted(((timeframe_to_ms(tf), tf) for tf in timeframes if tf != base_timeframe))
+        self.reset()
+
+    def reset(self):
+        """Drops the open candles, e.g. after a stream gap in which trades were missed."""
+        self._open = {tf: None for _, tf in self._frames}
+        self._base = None
+        self._since = None  # first trade time; candles opened earlier are partial
+
+    def add(self, timestamp_ms: int, price: float, amount: float) -> list[tuple[str, list]]:
+        """Adds one trade; returns the (timeframe, candle) pairs it closed."""
+        base = self._base
+        if base is not None and timestamp_ms < base[0] + self._base_ms:
+            if timestamp_ms >= base[0]:
+                if price > base[2]:
+                    base[2] = price
+                elif price < base[3]:
+                    base[3] = price
+                base[4] = price
+                base[5] += amount
+            return []
+
+        closed = []
+        if self._since is None:
+            self._since = timestamp_ms
+        if base is not None:
+            if self._emit_base and base[0] >= self._since:
+                closed.append((self.base_timeframe, list(base)))
+            for tf_ms, tf in self._frames:
+                candle = self._open[tf]
+                if candle is None:
+                    self._open[tf] = [base[0] - base[0] % tf_ms] + base[1:]
+                else:
+                    candle[2] = max(candle[2], base[2])
+                    candle[3] = min(candle[3], base[3])
+                    candle[4] = base[4]
+                    candle[5] += base[5]
+        for tf_ms, tf in self._frames:
+            candle = self._open[tf]
+            if candle is not None and timestamp_ms >= candle[0] + tf_ms:
+                if candle[0] >= self._since:
+                    closed.append((tf, candle))
+                self._open[tf] = None
+        self._base = [timestamp_ms - timestamp_ms % self._base_ms, price, price, price, price, amount]
+        return closed
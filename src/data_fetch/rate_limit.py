@@ -0,0 +1,59 @@
+# src/data_fetch/rate_limit.py
+import time
+import asyncio
+import threading
+from ..config import config
+
+# Share of the ccxt rate actually used. Exchanges count requests in sliding windows, so a
+# budget paced at exactly their limit trips it whenever timer jitter bunches two requests.
+RATE_LIMIT_HEADROOM = 0.9
+
+class TokenBucket:
+    """
+    Token bucket shared by every request to one exchange.
+
+    `acquire()` reserves a token synchronously and then sleeps for the time it takes
+    the bucket to cover the reservation. Because the reservation itself never awaits,
+    concurrent coroutines (and threads) are served in arrival order without a lock
+    bound to any particular event loop.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Takes `tokens` from the bucket and returns how long the caller must wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+def get_budget(exchange) -> TokenBucket:
+    """
+    Returns the process-wide budget for an exchange client. The rate comes from
+    FETCH_RATE_LIMITS if set, otherwise from the client's ccxt `rateLimit` (ms/request)
+    less RATE_LIMIT_HEADROOM.
+    """
+    with _budgets_lock:
+        bucket = _budgets.get(exchange.id)
+        if bucket is None:
+            rate = (config.FETCH_RATE_LIMITS.get(exchange.id)
+                    or RATE_LIMIT_HEADROOM * 1000.0 / max(float(exchange.rateLimit), 1.0))
+            bucket = _budgets[exchange.id] = TokenBucket(rate)
+        return bucket
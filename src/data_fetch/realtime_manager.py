@@ -1,113 +1,268 @@
 # src/data_fetch/realtime_manager.py
-import ccxt.pro
+import math
+import time
 import asyncio
 import logging
-import json
-import os
-from collections import deque
-from datetime import datetime, timezone
-from ..shared.constants import SYMBOLS 
+import argparse
+import multiprocessing
+from ..config import config
+from ..shared.constants import SYMBOLS, ALL_TIMEFRAMES, BASE_TIMEFRAME
+from ..shared.event_bus import EventBus, CandleClosed, FeatureUpdated, connect
+from ..shared.feature_store import FeatureStore, FEATURE_STORE_PATH
+from .exchange_pool import exchange_pool
+from .feature_engine import FeatureEngine
+from .microstructure import TradeCandles
+from .tick_recorder import TickRecorder
 
 # --- Configuration ---
-REALTIME_FEATURES_PATH = "/workspace/data/realtime_features.json"
 ORDER_BOOK_DEPTH = 50 
+IMBALANCE_BANDS = (5, 10, ORDER_BOOK_DEPTH)
 TAKER_TRADE_WINDOW_SECONDS = 60 
+TAKER_FLOW_WINDOWS = (10, TAKER_TRADE_WINDOW_SECONDS, 300)
+
+# Registered features computed per symbol (see feature_engine.py)
+FEATURE_SPECS = [
+    ("order_book_imbalance", {"bands": IMBALANCE_BANDS}),
+    ("taker_flow", {"windows": TAKER_FLOW_WINDOWS, "primary_window": TAKER_TRADE_WINDOW_SECONDS}),
+    "spread",
+    "microprice",
+    ("vwap", {"windows": (60, 300)}),
+    ("realized_volatility", {"windows": (60, 300)}),
+    ("trade_intensity", {"windows": (10, 60)}),
+]
+
+# Message age at processing time (local clock minus exchange timestamp), per symbol
+LAG_FEATURES = ["book_message_age_ms", "trades_message_age_ms"]
+
+# Fixed feature-store layout; changing it makes the writer replace the store file
+REALTIME_FEATURES = FeatureEngine(FEATURE_SPECS).names + LAG_FEATURES
+
+# Trade windows are moved forward this often, so they empty out in a quiet market
+# instead of holding their last values (and looking fresh on every book update)
+TRADE_CLOCK_SECONDS = 1.0
+
+# --- Event bus ---
+# Feature updates are pushed at most this often per symbol; candle closes immediately
+FEATURE_EVENT_SECONDS = 1.0
+
+# --- Sharding ---
+LAG_REPORT_SECONDS = 60
+SHARD_MONITOR_SECONDS = 5
 
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(name)s] %(levelname)s: %(message)s')
 logger = logging.getLogger("RealtimeManager")
 
-# --- Global State (In-memory) ---
-realtime_features = {symbol: {} for symbol in SYMBOLS}
+def message_age_ms(timestamp_ms) -> float:
+    """Age of an exchange-stamped message at processing time; NaN without a timestamp."""
+    return time.time() * 1000 - timestamp_ms if timestamp_ms else math.nan
+
+class MessageLag:
+    """Message ages per stream ("book", "trades"), aggregated between reports."""
+
+    def __init__(self):
+        self._stats = {}
+
+    def record(self, stream: str, age_ms: float):
+        if math.isnan(age_ms):
+            return
+        count, total, worst = self._stats.get(stream, (0, 0.0, -math.inf))
+        self._stats[stream] = (count + 1, total + age_ms, max(worst, age_ms))
+
+    def report(self) -> dict[str, tuple[int, float, float]]:
+        """(messages, mean age ms, max age ms) per stream since the last report."""
+        stats, self._stats = self._stats, {}
+        return {stream: (count, total / count, worst) for stream, (count, total, worst) in stats.items()}
+
+class SymbolEvents:
+    """Pushes a symbol's trade-built candle closes and throttled feature updates onto the bus."""
+
+    def __init__(self, bus: EventBus, symbol: str, engine: FeatureEngine, interval: float = FEATURE_EVENT_SECONDS):
+        self.bus = bus
+        self.symbol = symbol
+        self.engine = engine
+        self.interval = interval
+        self.candles = TradeCandles(ALL_TIMEFRAMES, BASE_TIMEFRAME)
+        self._last_features = 0.0
+
+    def on_trades(self, trades):
+        for trade in trades:
+            for timeframe, candle in self.candles.add(trade['timestamp'], trade['price'], trade['amount']):
+                self.bus.publish(CandleClosed(self.symbol, timeframe, *candle))
+        self.on_features()
+
+    def reset(self):
+        """Forgets the open candles after a stream error; trades may have been missed meanwhile."""
+        self.candles.reset()
+
+    def on_features(self):
+        now = time.monotonic()
+        if now - self._last_features >= self.interval:
+            self._last_features = now
+            features = {name: value for name, value in self.engine.values().items() if not math.isnan(value)}
+            self.bus.publish(FeatureUpdated(self.symbol, features))
 
 # --- Feature Calculation Logic ---
-async def order_book_loop(exchange, symbol):
-    """Continuously processes order book data to calculate imbalance."""
+async def order_book_loop(exchange, symbol, engine: FeatureEngine, store: FeatureStore, lag: MessageLag | None = None,
+                          recorder: TickRecorder | None = None, events: SymbolEvents | None = None):
+    """Continuously feeds order book updates to the symbol's book features and publishes them."""
     logger.info(f"Starting order book loop for {symbol}...")
     while True:
         try:
             orderbook = await exchange.watch_order_book(symbol + 'USDT', ORDER_BOOK_DEPTH)
-            bids = orderbook['bids']
-            asks = orderbook['asks']
-
-            if not bids or not asks:
-                continue
-
-            total_bid_volume = sum([price * size for price, size in bids])
-            total_ask_volume = sum([price * size for price, size in asks])
-            
-            total_volume = total_bid_volume + total_ask_volume
-            if total_volume > 0:
-                imbalance = (total_bid_volume - total_ask_volume) / total_volume
-            else:
-                imbalance = 0.0
-            
-            realtime_features[symbol]['order_book_imbalance'] = round(imbalance, 4)
-            realtime_features[symbol]['last_update_utc'] = datetime.now(timezone.utc).isoformat()
+            if engine.on_book(orderbook):
+                age = message_age_ms(orderbook.get('timestamp'))
+                if lag is not None:
+                    lag.record("book", age)
+                engine.publish(store, symbol, "book", book_message_age_ms=age)
+                if recorder is not None:
+                    recorder.record_book(symbol, orderbook)
+                if events is not None:
+                    events.on_features()
 
         except Exception as e:
             logger.error(f"Error in order book loop for {symbol}: {e}", exc_info=True)
             await asyncio.sleep(5) 
 
-async def trades_loop(exchange, symbol):
-    """Continuously processes public trades to calculate taker volume ratio."""
+async def trades_loop(exchange, symbol, engine: FeatureEngine, store: FeatureStore, lag: MessageLag | None = None,
+                      recorder: TickRecorder | None = None, events: SymbolEvents | None = None):
+    """Continuously feeds public trades to the symbol's trade features and publishes them."""
     logger.info(f"Starting trades loop for {symbol}...")
-    recent_trades = deque()
-
     while True:
         try:
             trades = await exchange.watch_trades(symbol + 'USDT')
-            now = datetime.now(timezone.utc)
-            
-            for trade in trades:
-                trade['timestamp_dt'] = now
-                recent_trades.append(trade)
-
-            while recent_trades and (now - recent_trades[0]['timestamp_dt']).total_seconds() > TAKER_TRADE_WINDOW_SECONDS:
-                recent_trades.popleft()
-
-            taker_buy_volume = sum(t['cost'] for t in recent_trades if t['side'] == 'buy')
-            taker_sell_volume = sum(t['cost'] for t in recent_trades if t['side'] == 'sell')
-
-            if taker_sell_volume > 0:
-                taker_ratio = taker_buy_volume / taker_sell_volume
-            else:
-                taker_ratio = taker_buy_volume 
-
-            realtime_features[symbol]['taker_buy_sell_ratio'] = round(taker_ratio, 4)
+            if engine.on_trades(trades):
+                age = message_age_ms(trades[-1]['timestamp'])
+                if lag is not None:
+                    lag.record("trades", age)
+                engine.publish(store, symbol, "trades", trades_message_age_ms=age)
+                if recorder is not None:
+                    recorder.record_trades(symbol, trades)
+                if events is not None:
+                    events.on_trades(trades)
 
         except Exception as e:
             logger.error(f"Error in trades loop for {symbol}: {e}", exc_info=True)
+            if events is not None:
+                events.reset()
             await asyncio.sleep(5)
 
-async def save_features_loop():
-    """Periodically saves the calculated features to a file."""
-    logger.info(f"Starting feature save loop. Output file: {REALTIME_FEATURES_PATH}")
+async def trade_clock_loop(symbol, engine: FeatureEngine, store: FeatureStore, interval: float = TRADE_CLOCK_SECONDS):
+    """Advances the symbol's trade windows between trades and republishes the trade features."""
     while True:
-        await asyncio.sleep(10) 
-        try:
-            os.makedirs(os.path.dirname(REALTIME_FEATURES_PATH), exist_ok=True)
-            with open(REALTIME_FEATURES_PATH, 'w') as f:
-                json.dump(realtime_features, f, indent=4)
-        except Exception as e:
-            logger.error(f"Failed to save features to file: {e}")
-
-async def main():
-    """Main function to initialize exchange and start all loops."""
-    exchange = ccxt.pro.bybit({'options': {'defaultType': 'swap'}})
-    
-    tasks = [save_features_loop()]
-    for symbol in SYMBOLS:
-        tasks.append(order_book_loop(exchange, symbol))
-        tasks.append(trades_loop(exchange, symbol))
-        
-    logger.info(f"Starting real-time feature manager for symbols: {SYMBOLS}")
-    await asyncio.gather(*tasks)
-    
-    await exchange.close()
+        await asyncio.sleep(interval)
+        now_ms = engine.trade_clock_ms()
+        if now_ms is not None:
+            engine.advance(now_ms)
+            engine.publish(store, symbol, "trades")
+
+async def lag_report_loop(lag: MessageLag, label: str, interval: float = LAG_REPORT_SECONDS):
+    """Periodically logs how old messages were when this process got to them."""
+    while True:
+        await asyncio.sleep(interval)
+        for stream, (count, mean, worst) in sorted(lag.report().items()):
+            logger.info(f"[{label}] {stream}: {count} messages, age mean {mean:.0f} ms, max {worst:.0f} ms")
+
+async def run_symbols(symbols: list[str], store: FeatureStore, label: str = "main", record_dir: str = config.TICK_RECORDER_DIR):
+    """
+    Runs the watch loops of `symbols` on one exchange connection in this event loop,
+    recording every book update and trade under `record_dir` when it is set and pushing
+    candle and feature events to the event bus broker when EVENT_BUS_SOCKET is set.
+    """
+    exchange = await exchange_pool.get('bybit', {'options': {'defaultType': 'swap'}})
+    lag = MessageLag()
+    recorder = TickRecorder(record_dir, depth=ORDER_BOOK_DEPTH).start() if record_dir else None
+    if recorder is not None:
+        logger.info(f"[{label}] Recording ticks to {record_dir}")
+
+    bus = EventBus() if config.EVENT_BUS_SOCKET else None
+
+    tasks = [lag_report_loop(lag, label)]
+    if bus is not None:
+        tasks.append(connect(bus))
+    for symbol in symbols:
+        engine = FeatureEngine(FEATURE_SPECS)
+        events = SymbolEvents(bus, symbol, engine) if bus is not None else None
+        tasks.append(order_book_loop(exchange, symbol, engine, store, lag, recorder, events))
+        tasks.append(trades_loop(exchange, symbol, engine, store, lag, recorder, events))
+        tasks.append(trade_clock_loop(symbol, engine, store))
+
+    logger.info(f"[{label}] Starting real-time feature manager for symbols: {symbols}")
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await exchange_pool.close_all()
+        if recorder is not None:
+            recorder.close()
+
+async def main(record_dir: str = config.TICK_RECORDER_DIR):
+    """Main function to initialize exchange and start all loops in this process."""
+    store = FeatureStore.create(FEATURE_STORE_PATH, SYMBOLS, REALTIME_FEATURES)
+    logger.info(f"Publishing features to {FEATURE_STORE_PATH}")
+    try:
+        await run_symbols(SYMBOLS, store, record_dir=record_dir)
+    finally:
+        store.close()
+
+def shard_symbols(symbols: list[str], shards: int) -> list[list[str]]:
+    """Splits symbols round-robin into at most `shards` non-empty groups."""
+    shards = max(1, min(shards, len(symbols)))
+    return [symbols[i::shards] for i in range(shards)]
+
+def run_shard(shard_id: int, symbols: list[str], store_path: str = FEATURE_STORE_PATH, record_dir: str = config.TICK_RECORDER_DIR):
+    """
+    Worker process entry point: its own exchange connection and event loop for a subset
+    of symbols, writing only those symbols' slots of the shared feature store.
+    """
+    store = FeatureStore(store_path, writable=True)
+    store.release(symbols)  # a previous worker for these symbols may have died mid-write
+    try:
+        asyncio.run(run_symbols(symbols, store, f"shard {shard_id}", record_dir))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+def run_sharded(shards: int, record_dir: str = config.TICK_RECORDER_DIR):
+    """Creates the shared store, then runs and supervises one worker process per shard."""
+    store = FeatureStore.create(FEATURE_STORE_PATH, SYMBOLS, REALTIME_FEATURES)
+    groups = shard_symbols(SYMBOLS, shards)
+    context = multiprocessing.get_context("spawn")
+    logger.info(f"Publishing features to {FEATURE_STORE_PATH} from {len(groups)} shards: {groups}")
+
+    def start(shard_id: int):
+        process = context.Process(target=run_shard, args=(shard_id, groups[shard_id], FEATURE_STORE_PATH, record_dir),
+                                  name=f"realtime-shard-{shard_id}", daemon=True)
+        process.start()
+        return process
+
+    workers = {}
+    try:
+        workers = {shard_id: start(shard_id) for shard_id in range(len(groups))}
+        while True:
+            time.sleep(SHARD_MONITOR_SECONDS)
+            for shard_id, process in workers.items():
+                if not process.is_alive():
+                    logger.error(f"Shard {shard_id} exited with code {process.exitcode}; restarting it.")
+                    workers[shard_id] = start(shard_id)
+    finally:
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join(timeout=10)
+        store.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream order books and trades into the realtime feature store.")
+    parser.add_argument("--shards", type=int, default=config.REALTIME_SHARDS,
+                        help="Worker processes to split symbols across (default: 1, in-process).")
+    parser.add_argument("--record", default=config.TICK_RECORDER_DIR, metavar="DIR",
+                        help="Record order books and trades to binary segments under DIR (default: TICK_RECORDER_DIR).")
+    args = parser.parse_args()
     try:
-        asyncio.run(main())
+        if args.shards > 1:
+            run_sharded(args.shards, args.record)
+        else:
+            asyncio.run(main(args.record))
     except KeyboardInterrupt:
         logger.info("Shutdown signal received. Exiting.")
\ No newline at end of file
@@ -0,0 +1,258 @@
+# src/data_fetch/replay_exchange.py
+"""
+Offline stand-in for ccxt / ccxt.pro exchanges that replays recorded fixtures.
+
+It exposes the methods this project uses (`fetch_ohlcv`, `watch_order_book`,
+`watch_trades`, `create_order`, `fetch_balance`, `load_markets`, `close`) with
+configurable latency, injected errors and a request rate limit, so the real fetch,
+fallback, realtime and trading code can be exercised without network.
+
+Fixture directory layout (symbols are keyed without separators, e.g. BTCUSDT):
+
+    ohlcv/{KEY}_{timeframe}.json     [[ts_ms, open, high, low, close, volume], ...]
+    order_books/{KEY}.jsonl          {"timestamp": ms, "bids": [[p, s], ...], "asks": [...]} per line
+    trades/{KEY}.jsonl               [{"timestamp": ms, "side": "buy", "price": p, "amount": a}, ...] per line
+
+Timeframes without a fixture are resampled on the fly from the 1m fixture.
+Setting EXCHANGE_REPLAY_DIR makes the shared exchange pool hand out replay clients.
+"""
+import os
+import copy
+import glob
+import json
+import time
+import random
+import asyncio
+import itertools
+from collections import deque
+import pandas as pd
+from ccxt.base.errors import NetworkError, RateLimitExceeded, BadSymbol
+from ..config import config
+
+TIMEFRAMES = {tf: tf for tf in ["1m", "3m", "5m", "10m", "15m", "30m", "1h", "2h", "4h", "6h", "12h", "1d", "1w"]}
+
+def symbol_key(symbol: str) -> str:
+    """Maps 'BTC/USDT', 'BTC/USDT:USDT' and 'BTCUSDT' to the same fixture key."""
+    return symbol.split(":")[0].replace("/", "")
+
+class ReplayExchange:
+    """Replays recorded market data through a ccxt-compatible async interface."""
+
+    def __init__(self, exchange_id: str = "replay", ohlcv: dict | None = None, order_books: dict | None = None,
+                 trades: dict | None = None, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 scripted_errors: list | None = None, rate_limit: float | None = None, speed: float | None = None,
+                 loop: bool = True, balance: dict | None = None, seed: int = 0):
+        """
+        Args:
+            ohlcv: {(key, timeframe): [[ts, o, h, l, c, v], ...]}
+            order_books / trades: {key: [snapshot or trade batch, ...]}
+            latency / jitter: seconds added to every call (jitter is uniform random on top).
+            error_rate: probability that a call raises NetworkError.
+            scripted_errors: exceptions raised by the next calls, in order.
+            rate_limit: requests per second allowed before RateLimitExceeded is raised.
+            speed: replay speed for streams relative to recorded time (None = as fast as possible).
+            loop: restart streams from the beginning when they run out.
+        """
+        self.id = exchange_id
+        self.has = {"fetchOHLCV": True, "watchOrderBook": True, "watchTrades": True, "createOrder": True}
+        self.timeframes = dict(TIMEFRAMES)
+        self.rateLimit = 1000.0 / rate_limit if rate_limit else 1
+        self.markets = {}
+        self.orders = []
+        self.calls = {}
+
+        self._ohlcv = {k: sorted(v) for k, v in (ohlcv or {}).items()}
+        self._order_books = order_books or {}
+        self._trades = trades or {}
+        self._resampled = {}
+        self._streams = {}
+        self._streamed_prices = {}
+        self._latency = latency
+        self._jitter = jitter
+        self._error_rate = error_rate
+        self._scripted_errors = deque(scripted_errors or [])
+        self._rate_limit = rate_limit
+        self._recent_requests = deque()
+        self._speed = speed
+        self._loop = loop
+        self._balance = balance or {"USDT": {"free": 10000.0, "used": 0.0, "total": 10000.0}}
+        self._random = random.Random(seed)
+        self._order_ids = itertools.count(1)
+
+    @classmethod
+    def from_directory(cls, path: str, exchange_id: str = "replay", **options):
+        """Loads fixtures from a directory laid out as described in the module docstring."""
+        ohlcv, order_books, trades = {}, {}, {}
+        for file in glob.glob(os.path.join(path, "ohlcv", "*.json")):
+            key, timeframe = os.path.basename(file)[:-len(".json")].rsplit("_", 1)
+            with open(file) as f:
+                ohlcv[(key, timeframe)] = json.load(f)
+        for target, folder in ((order_books, "order_books"), (trades, "trades")):
+            for file in glob.glob(os.path.join(path, folder, "*.jsonl")):
+                with open(file) as f:
+                    target[os.path.basename(file)[:-len(".jsonl")]] = [json.loads(line) for line in f if line.strip()]
+        return cls(exchange_id, ohlcv=ohlcv, order_books=order_books, trades=trades, **options)
+
+    # --- Simulated network behaviour ---
+    async def _request(self, method: str):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        if self._rate_limit:
+            now = time.monotonic()
+            while self._recent_requests and now - self._recent_requests[0] >= 1.0:
+                self._recent_requests.popleft()
+            if len(self._recent_requests) >= self._rate_limit:
+                raise RateLimitExceeded(f"{self.id} {method}: more than {self._rate_limit} requests/second")
+            self._recent_requests.append(now)
+
+        # Always yield to the loop, as a real network call would, so callers cannot spin.
+        delay = self._latency + (self._random.uniform(0, self._jitter) if self._jitter else 0.0)
+        await asyncio.sleep(delay)
+
+        if self._scripted_errors:
+            raise self._scripted_errors.popleft()
+        if self._error_rate and self._random.random() < self._error_rate:
+            raise NetworkError(f"{self.id} {method}: injected network error")
+
+    # --- ccxt REST surface ---
+    async def load_markets(self, reload: bool = False):
+        keys = {k for k, _ in self._ohlcv} | set(self._order_books) | set(self._trades)
+        self.markets = {key: {"id": key, "symbol": key} for key in keys}
+        return self.markets
+
+    def _candles(self, key: str, timeframe: str) -> list:
+        if (key, timeframe) in self._ohlcv:
+            return self._ohlcv[(key, timeframe)]
+        if (key, timeframe) not in self._resampled:
+            base = self._ohlcv.get((key, "1m"))
+            if base is None:
+                raise BadSymbol(f"{self.id} has no {timeframe} fixture for {key}")
+            from .resampler import resample_ohlcv
+            df = pd.DataFrame(base, columns=["timestamp", "open", "high", "low", "close", "volume"])
+            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+            bars = resample_ohlcv(df, timeframe)
+            bars["timestamp"] = bars["timestamp"].astype("datetime64[ms]").astype("int64")
+            self._resampled[(key, timeframe)] = bars.values.tolist()
+        return self._resampled[(key, timeframe)]
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = "1m", since: int | None = None, limit: int | None = None, params=None):
+        await self._request("fetch_ohlcv")
+        candles = self._candles(symbol_key(symbol), timeframe)
+        if since is not None:
+            candles = [c for c in candles if c[0] >= since]
+        return [list(c) for c in candles[:limit or 1000]]
+
+    def _last_price(self, key: str) -> float | None:
+        """Last trade price replayed so far, else the last recorded price."""
+        if key in self._streamed_prices:
+            return self._streamed_prices[key]
+        batches = self._trades.get(key)
+        if batches and batches[-1]:
+            return float(batches[-1][-1]["price"])
+        for (fixture_key, _), candles in self._ohlcv.items():
+            if fixture_key == key and candles:
+                return float(candles[-1][4])
+        return None
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float, price: float | None = None, params=None):
+        await self._request("create_order")
+        fill_price = price if price is not None else self._last_price(symbol_key(symbol))
+        order = {
+            "id": str(next(self._order_ids)), "symbol": symbol, "type": type, "side": side,
+            "amount": amount, "filled": amount, "price": fill_price, "average": fill_price,
+            "status": "closed", "timestamp": int(time.time() * 1000),
+        }
+        self.orders.append(order)
+        return order
+
+    async def fetch_balance(self, params=None):
+        await self._request("fetch_balance")
+        return copy.deepcopy(self._balance)
+
+    # --- ccxt.pro streaming surface ---
+    async def _next_event(self, stream: str, key: str, events: list):
+        """Returns the next recorded event of a stream, pacing by recorded time if `speed` is set."""
+        if not events:
+            raise BadSymbol(f"{self.id} has no {stream} fixture for {key}")
+        state = self._streams.setdefault((stream, key), {"index": 0, "cycle": 0, "last_ts": None})
+
+        if state["index"] >= len(events):
+            if not self._loop:
+                # A finished recording behaves like a silent market.
+                await asyncio.Event().wait()
+            state["index"], state["cycle"] = 0, state["cycle"] + 1
+
+        event = copy.deepcopy(events[state["index"]])
+        state["index"] += 1
+
+        # Shift timestamps on every replay cycle so time keeps moving forward.
+        first_ts = _event_timestamp(events[0])
+        span = _event_timestamp(events[-1]) - first_ts + 1
+        offset = state["cycle"] * span
+        _shift_timestamps(event, offset)
+
+        ts = _event_timestamp(event)
+        if self._speed and state["last_ts"] is not None and ts > state["last_ts"]:
+            await asyncio.sleep((ts - state["last_ts"]) / 1000.0 / self._speed)
+        state["last_ts"] = ts
+        return event
+
+    async def watch_order_book(self, symbol: str, limit: int | None = None, params=None):
+        await self._request("watch_order_book")
+        key = symbol_key(symbol)
+        snapshot = await self._next_event("order_book", key, self._order_books.get(key, []))
+        return {
+            "symbol": symbol,
+            "timestamp": snapshot["timestamp"],
+            "datetime": pd.Timestamp(snapshot["timestamp"], unit="ms").isoformat(),
+            "nonce": snapshot.get("nonce"),
+            "bids": snapshot["bids"][:limit] if limit else snapshot["bids"],
+            "asks": snapshot["asks"][:limit] if limit else snapshot["asks"],
+        }
+
+    async def watch_trades(self, symbol: str, since=None, limit=None, params=None):
+        await self._request("watch_trades")
+        key = symbol_key(symbol)
+        batch = await self._next_event("trades", key, self._trades.get(key, []))
+        for trade in batch:
+            trade.setdefault("symbol", symbol)
+            trade.setdefault("cost", trade["price"] * trade["amount"])
+        if batch:
+            self._streamed_prices[key] = float(batch[-1]["price"])
+        return batch
+
+    async def close(self):
+        self._streams.clear()
+
+def _event_timestamp(event) -> int:
+    if isinstance(event, list):
+        return int(event[-1]["timestamp"]) if event else 0
+    return int(event["timestamp"])
+
+def _shift_timestamps(event, offset: int):
+    if not offset:
+        return
+    for item in event if isinstance(event, list) else [event]:
+        item["timestamp"] = int(item["timestamp"]) + offset
+
+def replay_factory(fixtures_dir: str, **options):
+    """Returns an `(exchange_id, config) -> ReplayExchange` factory sharing one fixture directory."""
+    def create(exchange_id: str, exchange_config: dict | None = None):
+        return ReplayExchange.from_directory(fixtures_dir, exchange_id=exchange_id, **options)
+    return create
+
+def replay_factory_from_config():
+    """
+    Builds a replay factory from the EXCHANGE_REPLAY_* settings, or returns None when
+    EXCHANGE_REPLAY_DIR is unset (i.e. use real exchanges).
+    """
+    if not config.EXCHANGE_REPLAY_DIR:
+        return None
+    return replay_factory(
+        config.EXCHANGE_REPLAY_DIR,
+        latency=config.EXCHANGE_REPLAY_LATENCY,
+        jitter=config.EXCHANGE_REPLAY_JITTER,
+        error_rate=config.EXCHANGE_REPLAY_ERROR_RATE,
+        rate_limit=config.EXCHANGE_REPLAY_RATE_LIMIT,
+        speed=config.EXCHANGE_REPLAY_SPEED,
+    )
@@ -0,0 +1,117 @@
+# src/data_fetch/resampler.py
+"""
+Derives any fixed-length timeframe from base (1m) candles.
+
+`resample_ohlcv` is the vectorized core shared by both users:
+- `derive_timeframes` keeps stored timeframes in the candle store up to date by
+  resampling only the base tail written since the last derived candle.
+- `IncrementalResampler` does the same in memory for a live stream of closed
+  base candles, emitting each higher-timeframe candle as soon as it closes.
+"""
+import logging
+import numpy as np
+import pandas as pd
+from .candle_store import CANDLE_COLUMNS
+from ..shared.timeframes import floor_timestamp_ms, timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+def _timestamps_ms(df: pd.DataFrame) -> np.ndarray:
+    return pd.to_datetime(df["timestamp"]).to_numpy(dtype="datetime64[ms]").astype(np.int64)
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    Aggregates candles into `timeframe` buckets aligned to the epoch (weeks to Monday).
+    Buckets only contain the rows present, so a bucket with missing base candles is
+    still emitted, matching `DataFrame.resample(...).dropna()`.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=CANDLE_COLUMNS)
+
+    if not df["timestamp"].is_monotonic_increasing or df["timestamp"].duplicated().any():
+        df = df.drop_duplicates(subset="timestamp", keep="last").sort_values("timestamp")
+
+    buckets = floor_timestamp_ms(_timestamps_ms(df), timeframe)
+    # Indices where a new bucket begins; reduceat aggregates each run in one pass.
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(buckets[starts], unit="ms"),
+        "open": df["open"].to_numpy(dtype=np.float64)[starts],
+        "high": np.maximum.reduceat(df["high"].to_numpy(dtype=np.float64), starts),
+        "low": np.minimum.reduceat(df["low"].to_numpy(dtype=np.float64), starts),
+        "close": df["close"].to_numpy(dtype=np.float64)[ends],
+        "volume": np.add.reduceat(df["volume"].to_numpy(dtype=np.float64), starts),
+    })
+
+def derive_timeframes(store, symbol: str, timeframes: list[str], base_timeframe: str = "1m") -> dict[str, int]:
+    """
+    Brings each derived timeframe in `store` up to date from the base candles.
+
+    Every timeframe resumes at its last stored candle (which may have been partial and
+    is replaced), so only the base tail since then is read, once, for all timeframes.
+    Returns the number of candles written per timeframe.
+    """
+    resume_from = {tf: store.last_timestamp(symbol, tf) for tf in timeframes}
+    known = [ts for ts in resume_from.values() if ts is not None]
+    read_from = None if len(known) < len(timeframes) else min(known)
+
+    base = store.read(symbol, base_timeframe, start=read_from)
+    written = {}
+    for tf in timeframes:
+        start = resume_from[tf]
+        tail = base if start is None else base[base["timestamp"] >= start]
+        bars = resample_ohlcv(tail, tf)
+
+        if start is None and not bars.empty and bars["timestamp"].iloc[0] < tail["timestamp"].iloc[0]:
+            # The base history starts mid-bucket; don't store a truncated first candle.
+            bars = bars.iloc[1:]
+
+        written[tf] = store.append(symbol, tf, bars)
+    logger.info(f"🧪 {symbol}: derived {written} from {base_timeframe}.")
+    return written
+
+class IncrementalResampler:
+    """
+    Turns a stream of closed base candles into closed `timeframe` candles.
+
+    Only the base candles of the still-open bucket are kept, so memory is bounded by
+    one bucket. A bucket closes when its final base candle arrives or when a candle
+    from a later bucket does (covering gaps at the end of a bucket).
+    """
+
+    def __init__(self, timeframe: str, base_timeframe: str = "1m"):
+        self.timeframe = timeframe
+        self._tf_ms = timeframe_to_ms(timeframe)
+        self._base_ms = timeframe_to_ms(base_timeframe)
+        self._pending = pd.DataFrame(columns=CANDLE_COLUMNS)
+        self._open_bucket = None
+
+    def update(self, base_candles: pd.DataFrame) -> pd.DataFrame:
+        """Adds closed base candles and returns the `timeframe` candles they closed."""
+        if base_candles.empty:
+            return resample_ohlcv(base_candles, self.timeframe)
+
+        new = base_candles[CANDLE_COLUMNS]
+        if self._open_bucket is not None:
+            # Candles from buckets that were already emitted can't change them anymore.
+            new = new[_timestamps_ms(new) >= self._open_bucket]
+        rows = pd.concat([self._pending, new], ignore_index=True) if not self._pending.empty else new
+        bars = resample_ohlcv(rows, self.timeframe)
+        if bars.empty:
+            return bars
+
+        last_bucket = int(_timestamps_ms(bars)[-1])
+        last_base = int(_timestamps_ms(rows).max())
+        if last_base + self._base_ms >= last_bucket + self._tf_ms:
+            closed, self._pending, self._open_bucket = bars, pd.DataFrame(columns=CANDLE_COLUMNS), last_bucket + self._tf_ms
+        else:
+            closed = bars.iloc[:-1]
+            self._pending = rows[_timestamps_ms(rows) >= last_bucket].reset_index(drop=True)
+            self._open_bucket = last_bucket
+        return closed.reset_index(drop=True)
+
+    def partial(self) -> pd.DataFrame:
+        """Returns the in-progress candle of the open bucket (empty if none)."""
+        return resample_ohlcv(self._pending, self.timeframe)
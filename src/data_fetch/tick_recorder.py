@@ -0,0 +1,358 @@
+# src/data_fetch/tick_recorder.py
+"""
+Append-only binary recorder for the order books and trades the realtime manager sees.
+
+Layout: one directory per symbol holding rotated segments named after their first
+record time, `{start_ms:013d}.ticks`, each with a `.idx` time index next to it.
+
+    segment   8-byte header (magic, version), then records back to back (little endian)
+    trade     kind u8 = 1, ts i64, side u8 (0 buy, 1 sell), price f64, amount f64
+    book      kind u8 = 2 (delta) or 3 (snapshot), ts i64, n_bids u16, n_asks u16,
+              then (price f64, size f64) per bid, then per ask; a delta size of 0 removes the level
+    index     (ts i64, offset u64) pairs, one per keyframe
+
+Books are recorded as deltas of their top levels against the previous update. Every
+`keyframe_seconds` (and at the start of each segment) the full recorded book is written
+as a snapshot and indexed, so a reader can seek to any time without the earlier data.
+
+The event loop only copies the top levels and enqueues them; diffing, encoding and file
+I/O happen on a background thread that flushes buffered segments periodically. A reader
+never sees a torn record: a partially written trailing record is ignored.
+"""
+import os
+import time
+import queue
+import bisect
+import struct
+import logging
+import threading
+from array import array
+from itertools import chain
+from typing import Iterator, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"HBTK"
+VERSION = 1
+SEGMENT_HEADER = struct.Struct("<4sI")
+TRADE_RECORD = struct.Struct("<BqBdd")
+BOOK_HEADER = struct.Struct("<BqHH")
+INDEX_ENTRY = struct.Struct("<qQ")
+KIND_TRADE, KIND_BOOK_DELTA, KIND_BOOK_SNAPSHOT = 1, 2, 3
+
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+SEGMENT_SECONDS = 3600
+KEYFRAME_SECONDS = 60
+FLUSH_SECONDS = 1.0
+MAX_QUEUE = 100_000
+# Book and trade streams arrive with different latencies, so records are only roughly
+# time ordered; readers keep scanning this far past the end of a range.
+REORDER_TOLERANCE_MS = 10_000
+
+class Trade(NamedTuple):
+    timestamp: int
+    side: str
+    price: float
+    amount: float
+
+class BookUpdate(NamedTuple):
+    timestamp: int
+    bids: list[tuple[float, float]]   # best first for snapshots; changed levels for deltas
+    asks: list[tuple[float, float]]
+    snapshot: bool
+
+_STOP = object()
+
+def _copy_levels(levels, depth: int) -> list[tuple[float, float]]:
+    """Copies the top `depth` levels as (price, size) tuples; ccxt.pro updates its levels in place."""
+    top = levels[:depth]
+    if top and len(top[0]) != 2:
+        return [(level[0], level[1]) for level in top]
+    return list(map(tuple, top))
+
+def _pack_book(kind: int, timestamp: int, bids, asks) -> bytes:
+    values = array("d", chain.from_iterable(bids))
+    values.extend(chain.from_iterable(asks))
+    return BOOK_HEADER.pack(kind, timestamp, len(bids), len(asks)) + values.tobytes()
+
+def _diff(new: list, old: list, old_levels: dict) -> tuple[list, dict]:
+    """Changed and removed (size 0) levels between two books, plus the new price -> size map."""
+    if new == old:
+        return [], old_levels
+    levels = dict(new)
+    changes = list(levels.items() - old_levels.items())
+    changes += [(price, 0.0) for price in old_levels.keys() - levels.keys()]
+    return changes, levels
+
+class _SymbolStream:
+    """Writer-thread state for one symbol: open segment, last recorded book and buffers."""
+
+    def __init__(self, directory: str, recorder: "TickRecorder"):
+        self.directory = directory
+        self.recorder = recorder
+        self.bids = self.asks = None              # last recorded book, best first
+        self.bid_levels, self.ask_levels = {}, {}
+        self.buffer, self.index_buffer = bytearray(), bytearray()
+        self.file = self.index_file = None
+        self.offset = 0
+        self.segment_start = self.last_keyframe = None
+
+    def _open_segment(self, timestamp: int):
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        start = timestamp
+        while os.path.exists(os.path.join(self.directory, f"{start:013d}.ticks")):
+            start += 1
+        base = os.path.join(self.directory, f"{start:013d}")
+        self.file = open(f"{base}.ticks", "xb")
+        self.index_file = open(f"{base}.idx", "xb")
+        self.buffer += SEGMENT_HEADER.pack(MAGIC, VERSION)
+        self.offset = SEGMENT_HEADER.size
+        self.segment_start, self.last_keyframe = start, None
+
+    def _append(self, record: bytes):
+        self.buffer += record
+        self.offset += len(record)
+
+    def _before_record(self, timestamp: int):
+        recorder = self.recorder
+        if (self.file is None or self.offset >= recorder.segment_bytes
+                or timestamp - self.segment_start >= recorder.segment_ms):
+            self._open_segment(timestamp)
+        if self.last_keyframe is None or timestamp - self.last_keyframe >= recorder.keyframe_ms:
+            self.index_buffer += INDEX_ENTRY.pack(timestamp, self.offset)
+            if self.bids is not None:
+                self._append(_pack_book(KIND_BOOK_SNAPSHOT, timestamp, self.bids, self.asks))
+            self.last_keyframe = timestamp
+
+    def add_book(self, timestamp: int, bids: list, asks: list):
+        self._before_record(timestamp)
+        if self.bids is None:
+            self._append(_pack_book(KIND_BOOK_SNAPSHOT, timestamp, bids, asks))
+            self.bids, self.asks = bids, asks
+            self.bid_levels, self.ask_levels = dict(bids), dict(asks)
+            return
+        bid_changes, self.bid_levels = _diff(bids, self.bids, self.bid_levels)
+        ask_changes, self.ask_levels = _diff(asks, self.asks, self.ask_levels)
+        self.bids, self.asks = bids, asks
+        if bid_changes or ask_changes:
+            self._append(_pack_book(KIND_BOOK_DELTA, timestamp, bid_changes, ask_changes))
+
+    def add_trade(self, timestamp: int, side: str, price: float, amount: float):
+        self._before_record(timestamp)
+        self._append(TRADE_RECORD.pack(KIND_TRADE, timestamp, side != "buy", price, amount))
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer.clear()
+        if self.index_buffer:
+            self.index_file.write(self.index_buffer)
+            self.index_file.flush()
+            self.index_buffer.clear()
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.index_file.close()
+            self.file = self.index_file = None
+
+class TickRecorder:
+    """
+    Records order-book updates and trades per symbol; see the module docstring. Call
+    `start()` once, `record_book` / `record_trades` from the event loop and `close()`
+    to flush everything on shutdown.
+    """
+
+    def __init__(self, root: str, depth: int = 50, segment_bytes: int = SEGMENT_MAX_BYTES,
+                 segment_seconds: int = SEGMENT_SECONDS, keyframe_seconds: int = KEYFRAME_SECONDS,
+                 flush_seconds: float = FLUSH_SECONDS, max_queue: int = MAX_QUEUE):
+        self.root = root
+        self.depth = depth
+        self.segment_bytes = segment_bytes
+        self.segment_ms = segment_seconds * 1000
+        self.keyframe_ms = keyframe_seconds * 1000
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self.max_queue = max_queue
+        self._queue = queue.SimpleQueue()
+        self._streams: dict[str, _SymbolStream] = {}
+        self._thread = threading.Thread(target=self._run, name="tick-recorder", daemon=True)
+
+    def start(self) -> "TickRecorder":
+        self._thread.start()
+        return self
+
+    # --- Event loop side: copy and enqueue only ---
+    def _put(self, item):
+        if self._queue.qsize() < self.max_queue:
+            self._queue.put(item)
+        else:
+            self.dropped += 1
+            if self.dropped % 10_000 == 1:
+                logger.warning(f"Tick recorder queue full, {self.dropped} records dropped so far.")
+
+    def record_book(self, symbol: str, orderbook):
+        """Queues the top `depth` levels of a (possibly live-mutated) order book."""
+        timestamp = orderbook.get("timestamp") or int(time.time() * 1000)
+        self._put((symbol, timestamp, _copy_levels(orderbook["bids"], self.depth), _copy_levels(orderbook["asks"], self.depth)))
+
+    def record_trades(self, symbol: str, trades):
+        """Queues a batch of ccxt trades."""
+        self._put((symbol, [(t["timestamp"], t["side"], t["price"], t["amount"]) for t in trades]))
+
+    # --- Writer thread ---
+    def _stream(self, symbol: str) -> _SymbolStream:
+        stream = self._streams.get(symbol)
+        if stream is None:
+            stream = self._streams[symbol] = _SymbolStream(os.path.join(self.root, symbol), self)
+        return stream
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                try:
+                    if len(item) == 4:
+                        self._stream(item[0]).add_book(*item[1:])
+                    else:
+                        stream = self._stream(item[0])
+                        for trade in item[1]:
+                            stream.add_trade(*trade)
+                except Exception as e:
+                    logger.error(f"Tick recorder failed to write a record for {item[0]}: {e}", exc_info=True)
+            if time.monotonic() - last_flush >= self.flush_seconds:
+                self.flush()
+                last_flush = time.monotonic()
+        for stream in self._streams.values():
+            stream.close()
+
+    def flush(self):
+        for symbol, stream in self._streams.items():
+            try:
+                stream.flush()
+            except OSError as e:
+                logger.error(f"Tick recorder failed to flush {symbol}: {e}")
+
+    def close(self):
+        """Writes out everything queued so far and closes the segments."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+class TickReader:
+    """Streams recorded ticks back in recording order."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def symbols(self) -> list[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def segments(self, symbol: str) -> list[tuple[int, str]]:
+        """(start ms, path) of each segment of a symbol, oldest first."""
+        directory = os.path.join(self.root, symbol)
+        if not os.path.isdir(directory):
+            return []
+        return sorted((int(name[:-6]), os.path.join(directory, name))
+                      for name in os.listdir(directory) if name.endswith(".ticks"))
+
+    @staticmethod
+    def _seek_offset(path: str, start_ms: int) -> int:
+        """Offset of the last keyframe at or before `start_ms`, from the segment's index."""
+        try:
+            with open(path[:-6] + ".idx", "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return SEGMENT_HEADER.size
+        entries = [INDEX_ENTRY.unpack_from(data, i) for i in range(0, len(data) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size)]
+        position = bisect.bisect_right([ts for ts, _ in entries], start_ms) - 1
+        return entries[position][1] if position >= 0 else SEGMENT_HEADER.size
+
+    @staticmethod
+    def _read_records(path: str, offset: int):
+        """Decodes records from `offset` to the last complete record of a segment."""
+        with open(path, "rb") as f:
+            magic, version = SEGMENT_HEADER.unpack(f.read(SEGMENT_HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} tick segment.")
+            f.seek(offset)
+            data = f.read()
+        position, size = 0, len(data)
+        while position < size:
+            kind = data[position]
+            if kind == KIND_TRADE:
+                if position + TRADE_RECORD.size > size:
+                    return
+                _, ts, sell, price, amount = TRADE_RECORD.unpack_from(data, position)
+                position += TRADE_RECORD.size
+                yield Trade(ts, "sell" if sell else "buy", price, amount)
+            else:
+                if position + BOOK_HEADER.size > size:
+                    return
+                _, ts, n_bids, n_asks = BOOK_HEADER.unpack_from(data, position)
+                start = position + BOOK_HEADER.size
+                end = start + 16 * (n_bids + n_asks)
+                if end > size:
+                    return
+                values = array("d", data[start:end])
+                levels = list(zip(values[0::2], values[1::2]))
+                position = end
+                yield BookUpdate(ts, levels[:n_bids], levels[n_bids:], kind == KIND_BOOK_SNAPSHOT)
+
+    def iter_range(self, symbol: str, start_ms: int | None = None, end_ms: int | None = None) -> Iterator[Trade | BookUpdate]:
+        """
+        Yields a symbol's trades and book updates with `start_ms <= timestamp < end_ms`.
+        When the range starts after the book was first recorded, the first book update
+        is a snapshot of the book as of `start_ms`, so consumers can apply the following
+        deltas without reading anything earlier.
+        """
+        segments = self.segments(symbol)
+        first = 0
+        if start_ms is not None:
+            starts = [start for start, _ in segments]
+            first = max(bisect.bisect_right(starts, start_ms) - 1, 0)
+
+        bids, asks = {}, {}
+        pending_snapshot = start_ms is not None
+        for i, (segment_start, path) in enumerate(segments[first:]):
+            if end_ms is not None and segment_start >= end_ms:
+                return
+            offset = self._seek_offset(path, start_ms) if i == 0 and start_ms is not None else SEGMENT_HEADER.size
+            for record in self._read_records(path, offset):
+                ts = record.timestamp
+                if pending_snapshot:
+                    if ts < start_ms:
+                        if isinstance(record, BookUpdate):
+                            # Fold history before the range into the book state
+                            if record.snapshot:
+                                bids, asks = dict(record.bids), dict(record.asks)
+                            else:
+                                _apply_levels(bids, record.bids)
+                                _apply_levels(asks, record.asks)
+                        continue
+                    pending_snapshot = False
+                    if bids or asks:
+                        yield BookUpdate(start_ms, sorted(bids.items(), reverse=True), sorted(asks.items()), True)
+                if end_ms is not None and ts >= end_ms:
+                    if ts >= end_ms + REORDER_TOLERANCE_MS:
+                        return
+                    continue
+                yield record
+
+def _apply_levels(levels: dict, changes):
+    for price, size in changes:
+        if size:
+            levels[price] = size
+        else:
+            levels.pop(price, None)
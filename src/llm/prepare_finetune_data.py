@@ -7,12 +7,12 @@ import argparse
 
 # --- Local & Shared Imports ---
 from src.shared.constants import SYMBOLS, ALL_TIMEFRAMES
+from src.data_fetch.candle_store import candle_store
 from src.utils.indicators import compute_indicators
 # CORRECTED: Import shared logic from the new data_utils module
 from src.llm.data_utils import generate_analysis_and_target, save_finetune_data
 
 # --- Configuration ---
-HISTORY_DATA_PATH = "/workspace/data/history"
 FINETUNE_OUTPUT_PATH = "/workspace/data/finetuning"
 os.makedirs(FINETUNE_OUTPUT_PATH, exist_ok=True)
 
@@ -29,16 +29,12 @@ def create_finetune_dataset(days: int):
 
     for symbol in SYMBOLS:
         for tf in ALL_TIMEFRAMES:
-            path = os.path.join(HISTORY_DATA_PATH, f"{symbol}USDT_{tf}.csv") # Use os.path.join for safety
-            if not os.path.exists(path):
-                logging.warning(f"File not found, skipping: {path}")
-                continue
-
             try:
-                df = pd.read_csv(path)
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-                df_filtered = df[df['timestamp'] >= start_date].copy()
+                # Only the partitions covering the requested window are read.
+                df_filtered = candle_store.read(symbol, tf, start=start_date)
+                if df_filtered.empty:
+                    logging.warning(f"No stored candles, skipping: {symbol}-{tf}")
+                    continue
 
                 if len(df_filtered) < 50:
                     logging.warning(f"Insufficient data for {symbol}-{tf} in the last {days} days. Skipping.")
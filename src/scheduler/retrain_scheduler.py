@@ -1,12 +1,17 @@
 # src/scheduler/retrain_scheduler.py
 import os
+import asyncio
 import logging
 import time
+import threading
 import subprocess
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from src.telegram.send_alert import process_and_send_alerts
+from src.data_fetch.fetch_futures_data import main as refresh_history
+from src.config import config
+from src.shared.event_bus import EventBus, PredictionMade, connect
 
 # --- Logging Setup ---
 LOG_PATH = "/workspace/logs/scheduler.log"
@@ -20,8 +25,14 @@ logger = logging.getLogger("Scheduler")
 
 # --- Job Functions ---
 def model_retrain_job():
-    """Job to retrain the predictive models by running the script."""
+    """Job to refresh candle history and retrain the predictive models by running the script."""
     logger.info("🔁 Kicking off scheduled model retraining job...")
+    try:
+        # Incremental backfill over pooled exchange clients, closed again when it returns.
+        asyncio.run(refresh_history())
+    except Exception as e:
+        logger.error(f"⚠️ History refresh failed, retraining on existing data: {e}", exc_info=True)
+
     try:
         result = subprocess.run(
             ["python", "-m", "scripts.train_model"],
@@ -38,14 +49,33 @@ def model_retrain_job():
     except Exception as e:
         logger.error(f"❌ An unexpected error occurred in the retraining job: {e}", exc_info=True)
 
+# Serializes the polling job and event-triggered runs so a prediction is never sent twice
+_alert_lock = threading.Lock()
+
 def alert_sending_job():
     """Job to check for and send new alerts."""
     logger.info("📨 Kicking off scheduled alert sending job...")
+    with _alert_lock:
+        try:
+            process_and_send_alerts()
+            logger.info("✅ Alert sending job completed successfully.")
+        except Exception as e:
+            logger.error(f"❌ Alert sending job failed: {e}", exc_info=True)
+
+async def alert_event_listener():
+    """Runs the alert job as soon as a prediction is pushed on the event bus, instead of on the next poll."""
+    bus = EventBus()
+    link = asyncio.create_task(connect(bus))
     try:
-        process_and_send_alerts()
-        logger.info("✅ Alert sending job completed successfully.")
-    except Exception as e:
-        logger.error(f"❌ Alert sending job failed: {e}", exc_info=True)
+        # Holds are never stored, so they have no alert; stored predictions are published
+        # once their row is committed, so the alert pass finds them
+        with bus.subscribe(PredictionMade, where=lambda event: event.signal != 'hold') as predictions:
+            async for event in predictions:
+                predictions.drain()  # one pass over the DB covers everything already queued
+                logger.info(f"🔔 Prediction pushed for {event.symbol} {event.timeframe}; sending alerts now.")
+                await asyncio.to_thread(alert_sending_job)
+    finally:
+        link.cancel()
 
 # --- Main Scheduler Logic ---
 def main():
@@ -59,6 +89,10 @@ def main():
     scheduler.add_job(model_retrain_job, 'interval', minutes=retrain_minutes, id='retrain_job')
     scheduler.add_job(alert_sending_job, 'interval', minutes=5, id='alert_job')
 
+    if config.EVENT_BUS_SOCKET:
+        # The interval job stays as a fallback for predictions made while the bus is down
+        threading.Thread(target=lambda: asyncio.run(alert_event_listener()), name="alert-events", daemon=True).start()
+
     try:
         scheduler.start()
         logger.info(f"✅ Scheduler started. Retraining every {retrain_minutes} minutes. Press Ctrl+C to exit.")
@@ -7,10 +7,12 @@ to avoid duplication across different scripts.
 SYMBOLS = ["BTC", "ETH", "SOL", "DOGE", "XRP", "ADA", "WIF", "1000PEPE"]
 
 # --- Timeframes ---
-# Timeframes to fetch directly from the exchange
-NATIVE_TIMEFRAMES = ["1m", "5m", "15m", "30m", "1h", "1d"]
-# All timeframes to be used in the model, including simulated ones
+# The only timeframe fetched from the exchange; all others are resampled from it
+BASE_TIMEFRAME = "1m"
+# All timeframes to be used in the model
 ALL_TIMEFRAMES = ["1m", "5m", "10m", "15m", "30m", "1h", "1d"]
+# Timeframes derived locally from BASE_TIMEFRAME candles
+DERIVED_TIMEFRAMES = [tf for tf in ALL_TIMEFRAMES if tf != BASE_TIMEFRAME]
 
 # --- Alerting Categories ---
 # Coins and timeframes for short-term perpetual contract signals (e.g., Long/Short)
@@ -0,0 +1,222 @@
+# src/shared/event_bus.py
+"""
+Typed push events (candle closed, features updated, prediction made, order filled) on an
+asyncio pub/sub bus, so consumers react when something happens instead of polling.
+
+Within a process, `EventBus.publish` hands an event to every matching subscription's
+bounded queue without awaiting; a slow subscriber loses its oldest events rather than
+holding up the publisher. Across local processes, a broker (`python -m src.shared.event_bus`)
+serves a Unix socket and each process links its own bus to it with `connect`. Events
+travel as JSON lines and are relayed to every other linked process. Delivery is
+best-effort: events published while a link is down are not replayed.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field, asdict
+from ..config import config
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+RECONNECT_SECONDS = 2.0
+MAX_LINE_BYTES = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+# --- Events ---
+EVENT_TYPES: dict[str, type] = {}
+
+def _event(cls):
+    """Makes `cls` a frozen dataclass and registers it for decoding by name."""
+    cls = dataclass(frozen=True)(cls)
+    EVENT_TYPES[cls.__name__] = cls
+    return cls
+
+@_event
+class CandleClosed:
+    symbol: str
+    timeframe: str
+    timestamp: int  # candle open time, ms
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    # Exchange-final kline (candle stream) rather than a candle built from trades, which
+    # can close before the exchange has finalised its own candle
+    final: bool = False
+
+@_event
+class FeatureUpdated:
+    symbol: str
+    features: dict
+    timestamp_ns: int = field(default_factory=time.time_ns)
+
+@_event
+class PredictionMade:
+    symbol: str
+    timeframe: str
+    signal: str
+    confidence: float | None = None
+    price: float | None = None
+    timestamp_ns: int = field(default_factory=time.time_ns)
+
+@_event
+class OrderFilled:
+    symbol: str
+    side: str
+    price: float
+    amount: float
+    order_id: str | None = None
+    timestamp_ns: int = field(default_factory=time.time_ns)
+
+def encode(event) -> bytes:
+    return json.dumps({"type": type(event).__name__, "data": asdict(event)}).encode() + b"\n"
+
+def decode(line: bytes):
+    message = json.loads(line)
+    return EVENT_TYPES[message["type"]](**message["data"])
+
+# --- In-process bus ---
+class Subscription:
+    """A bounded queue of the events matching `types` (all if empty) and `where`."""
+
+    def __init__(self, bus: "EventBus", types: tuple[type, ...], where=None,
+                 maxsize: int = SUBSCRIBER_QUEUE_SIZE, origin=None):
+        self.bus = bus
+        self.types = types
+        self.where = where
+        self.origin = origin
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize)
+
+    def matches(self, event) -> bool:
+        return (not self.types or isinstance(event, self.types)) and (self.where is None or self.where(event))
+
+    def _offer(self, event):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: float | None = None):
+        """Next event; raises asyncio.TimeoutError after `timeout` seconds."""
+        if timeout is None:
+            return await self._queue.get()
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def drain(self) -> list:
+        """Removes and returns everything already queued."""
+        events = []
+        while not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._queue.get()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class EventBus:
+    """Asyncio pub/sub for the events above; use it from its event loop's thread."""
+
+    def __init__(self):
+        self._subscriptions: list[Subscription] = []
+
+    def subscribe(self, *types: type, where=None, maxsize: int = SUBSCRIBER_QUEUE_SIZE, origin=None) -> Subscription:
+        """
+        Subscribes to events of the given types (all if none) that satisfy `where`.
+        Events published with the same `origin` are not delivered back to it.
+        """
+        subscription = Subscription(self, types, where, maxsize, origin)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def publish(self, event, origin=None) -> int:
+        """Queues `event` for every matching subscription; returns how many got it."""
+        delivered = 0
+        for subscription in self._subscriptions:
+            if subscription.origin is not None and subscription.origin is origin:
+                continue
+            if subscription.matches(event):
+                subscription._offer(event)
+                delivered += 1
+        return delivered
+
+# --- Unix socket bridge ---
+async def _link(bus: EventBus, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Relays events both ways over one connection until it closes."""
+    token = object()
+    outgoing = bus.subscribe(origin=token)
+
+    async def forward():
+        async for event in outgoing:
+            writer.write(encode(event))
+            await writer.drain()
+
+    forwarder = asyncio.create_task(forward())
+    try:
+        async for line in reader:
+            try:
+                bus.publish(decode(line), origin=token)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Dropping malformed event bus message: {e}")
+    finally:
+        forwarder.cancel()
+        outgoing.close()
+        writer.close()
+
+async def serve(bus: EventBus, path: str = config.EVENT_BUS_SOCKET) -> asyncio.AbstractServer:
+    """Starts the broker: every connection is linked to `bus`, so events reach all other connections."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if os.path.exists(path):
+        os.unlink(path)  # left behind by a previous broker
+    return await asyncio.start_unix_server(lambda r, w: _link(bus, r, w), path, limit=MAX_LINE_BYTES)
+
+async def connect(bus: EventBus, path: str = config.EVENT_BUS_SOCKET, reconnect_seconds: float = RECONNECT_SECONDS):
+    """Keeps `bus` linked to the broker at `path`, reconnecting while it is down. Run it as a task."""
+    warned = False
+    while True:
+        try:
+            reader, writer = await asyncio.open_unix_connection(path, limit=MAX_LINE_BYTES)
+        except OSError as e:
+            if not warned:
+                logger.warning(f"Event bus broker unavailable at {path} ({e}); retrying every {reconnect_seconds}s.")
+                warned = True
+        else:
+            logger.info(f"Linked to event bus broker at {path}.")
+            warned = False
+            try:
+                await _link(bus, reader, writer)
+            except Exception as e:  # e.g. an oversized line or a truncated read; relink either way
+                logger.warning(f"Event bus link dropped: {e!r}")
+        await asyncio.sleep(reconnect_seconds)
+
+async def main():
+    """Runs the broker until interrupted."""
+    server = await serve(EventBus())
+    logger.info(f"Event bus broker listening on {config.EVENT_BUS_SOCKET}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(name)s] %(levelname)s: %(message)s')
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Event bus broker stopped.")
@@ -0,0 +1,182 @@
+# src/shared/feature_store.py
+"""
+Fixed-layout realtime feature store in a memory-mapped file.
+
+Layout (little endian):
+
+    header   64 bytes   magic, version, n_symbols, n_features, slot_size, retired
+    names    32 bytes each, symbols then features (utf-8, NUL padded)
+    slots    one per symbol, 64-byte aligned: seq u64, updated_ns i64, values f64[n_features]
+
+Each slot is guarded by a seqlock: the single writer of a symbol makes `seq` odd,
+writes the values, then makes it even again. Readers copy the slot and retry if
+`seq` was odd or changed meanwhile, so they never see a torn update and never
+parse anything. Missing values are NaN.
+
+The writer creates the file; readers (and writers of other symbols, e.g. sharded
+workers owning a subset of the slots) open it by path and find symbols and features
+in the header. When the writer starts with a different layout it replaces the file
+and flags the old one as retired, which makes open readers remap.
+"""
+import os
+import mmap
+import time
+import struct
+import logging
+import numpy as np
+
+FEATURE_STORE_PATH = "/workspace/data/realtime_features.bin"
+
+MAGIC = b"HBFS"
+VERSION = 1
+HEADER = struct.Struct("<4sIIIII")
+HEADER_SIZE = 64
+NAME_SIZE = 32
+SLOT_ALIGN = 64
+RETIRED_OFFSET = struct.calcsize("<4sIIII")
+MAX_READ_RETRIES = 10000
+
+logger = logging.getLogger(__name__)
+
+def _align(n: int, alignment: int) -> int:
+    return (n + alignment - 1) // alignment * alignment
+
+class FeatureStore:
+    """Shared realtime feature slots; see the module docstring for the layout."""
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        self._map()
+
+    @classmethod
+    def create(cls, path: str, symbols: list[str], features: list[str]) -> "FeatureStore":
+        """
+        Opens the store for writing, reusing an existing file with the same layout
+        (values are kept) or atomically replacing it with a fresh one.
+        """
+        try:
+            existing = cls(path, writable=True)
+            if existing.symbols == list(symbols) and existing.features == list(features):
+                existing.release()
+                return existing
+            existing.retire()
+            existing.close()
+        except (FileNotFoundError, ValueError):
+            pass
+
+        for name in list(symbols) + list(features):
+            if len(name.encode()) > NAME_SIZE:
+                raise ValueError(f"Feature store name too long: {name}")
+
+        slot_size = _align(16 + 8 * len(features), SLOT_ALIGN)
+        slots_offset = _align(HEADER_SIZE + NAME_SIZE * (len(symbols) + len(features)), SLOT_ALIGN)
+        buffer = bytearray(slots_offset + slot_size * len(symbols))
+        HEADER.pack_into(buffer, 0, MAGIC, VERSION, len(symbols), len(features), slot_size, 0)
+        for i, name in enumerate(list(symbols) + list(features)):
+            encoded = name.encode()
+            buffer[HEADER_SIZE + i * NAME_SIZE:HEADER_SIZE + i * NAME_SIZE + len(encoded)] = encoded
+        values = np.ndarray((len(symbols), len(features)), dtype=np.float64, buffer=buffer,
+                            offset=slots_offset + 16, strides=(slot_size, 8))
+        values[:] = np.nan
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer)
+        os.replace(tmp_path, path)
+        return cls(path, writable=True)
+
+    def _map(self):
+        with open(self.path, "r+b" if self.writable else "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ)
+
+        magic, version, n_symbols, n_features, slot_size, _ = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} feature store.")
+
+        def name(i: int) -> str:
+            start = HEADER_SIZE + i * NAME_SIZE
+            return bytes(self._mmap[start:start + NAME_SIZE]).rstrip(b"\0").decode()
+
+        self.symbols = [name(i) for i in range(n_symbols)]
+        self.features = [name(n_symbols + i) for i in range(n_features)]
+        self._symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self._feature_index = {f: i for i, f in enumerate(self.features)}
+
+        offset = _align(HEADER_SIZE + NAME_SIZE * (n_symbols + n_features), SLOT_ALIGN)
+        self._seq = np.ndarray((n_symbols,), dtype=np.uint64, buffer=self._mmap, offset=offset, strides=(slot_size,))
+        self._updated_ns = np.ndarray((n_symbols,), dtype=np.int64, buffer=self._mmap, offset=offset + 8, strides=(slot_size,))
+        self._values = np.ndarray((n_symbols, n_features), dtype=np.float64, buffer=self._mmap,
+                                  offset=offset + 16, strides=(slot_size, 8))
+
+    def release(self, symbols: list[str] | None = None):
+        """
+        Clears seqlocks left odd by a writer that died mid-update, for the given symbols
+        (all by default). Only call it for slots no other live writer owns.
+        """
+        if symbols is None:
+            indices = np.arange(len(self.symbols))
+        else:
+            indices = np.array([self._symbol_index[s] for s in symbols], dtype=np.intp)
+        odd = indices[self._seq[indices] % 2 == 1]
+        self._seq[odd] += 1
+
+    def retire(self):
+        """Flags this file as replaced so readers remap the new one."""
+        struct.pack_into("<I", self._mmap, RETIRED_OFFSET, 1)
+
+    def _remap_if_retired(self):
+        if struct.unpack_from("<I", self._mmap, RETIRED_OFFSET)[0]:
+            logger.info(f"Feature store layout changed, remapping {self.path}.")
+            self.close()
+            self._map()
+
+    # --- Writer ---
+    def write(self, symbol: str, features: dict[str, float]):
+        """Publishes feature values for a symbol; features not given keep their value."""
+        i = self._symbol_index[symbol]
+        indices = [self._feature_index[name] for name in features]
+        seq = self._seq
+        seq[i] += 1
+        self._values[i, indices] = list(features.values())
+        self._updated_ns[i] = time.time_ns()
+        seq[i] += 1
+
+    # --- Readers ---
+    def _read_slot(self, i: int) -> tuple[np.ndarray, int]:
+        seq, values, updated_ns = self._seq, self._values, self._updated_ns
+        for _ in range(MAX_READ_RETRIES):
+            before = int(seq[i])
+            if before % 2 == 0:
+                row, ts = values[i].copy(), int(updated_ns[i])
+                if int(seq[i]) == before:
+                    return row, ts
+            time.sleep(0)
+        raise TimeoutError(f"Feature slot for {self.symbols[i]} stayed locked; is its writer stuck?")
+
+    def read(self, symbol: str) -> dict[str, float]:
+        """A consistent snapshot of a symbol's features; unset features are omitted."""
+        if not self.writable:
+            self._remap_if_retired()
+        row, _ = self._read_slot(self._symbol_index[symbol])
+        return {name: float(v) for name, v in zip(self.features, row) if not np.isnan(v)}
+
+    def updated_ns(self, symbol: str) -> int:
+        """Wall-clock time (ns) of the symbol's last update, 0 if never written."""
+        if not self.writable:
+            self._remap_if_retired()
+        return self._read_slot(self._symbol_index[symbol])[1]
+
+    def age_seconds(self, symbol: str) -> float | None:
+        updated = self.updated_ns(symbol)
+        return (time.time_ns() - updated) / 1e9 if updated else None
+
+    def read_all(self) -> dict[str, dict[str, float]]:
+        return {symbol: self.read(symbol) for symbol in self.symbols}
+
+    def close(self):
+        # Drop the numpy views first; an mmap with exported buffers cannot be closed.
+        self._seq = self._updated_ns = self._values = None
+        self._mmap.close()
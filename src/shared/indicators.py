@@ -0,0 +1,16 @@
+# src/shared/indicators.py
+"""
+Technical-analysis features shared by model training and live inference, so a model
+is always given the columns, in the order, it was trained on.
+"""
+import pandas as pd
+from ta import add_all_ta_features
+
+# Fewest candles the `ta` indicators can be computed on
+MIN_INDICATOR_CANDLES = 28
+
+def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns a copy of OHLCV candles with every `ta` indicator added as a column."""
+    return add_all_ta_features(
+        df.copy(), open="open", high="high", low="low", close="close", volume="volume", fillna=True
+    )
@@ -0,0 +1,41 @@
+# src/shared/timeframes.py
+"""
+Helpers for converting ccxt-style timeframe strings (e.g. '1m', '4h', '1d')
+into durations, so every module agrees on candle lengths.
+"""
+
+_UNIT_SECONDS = {
+    's': 1,
+    'm': 60,
+    'h': 60 * 60,
+    'd': 24 * 60 * 60,
+    'w': 7 * 24 * 60 * 60,
+    'M': 30 * 24 * 60 * 60,
+    'y': 365 * 24 * 60 * 60,
+}
+
+def timeframe_to_seconds(timeframe: str) -> int:
+    """Returns the length of one candle in seconds (same rules as ccxt.parse_timeframe)."""
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if unit not in _UNIT_SECONDS or not amount.isdigit() or int(amount) <= 0:
+        raise ValueError(f"Unsupported timeframe: {timeframe!r}")
+    return int(amount) * _UNIT_SECONDS[unit]
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """Returns the length of one candle in milliseconds."""
+    return timeframe_to_seconds(timeframe) * 1000
+
+# Weekly candles open on Monday 00:00 UTC; the Unix epoch was a Thursday.
+_WEEK_ORIGIN_MS = 4 * 24 * 60 * 60 * 1000
+
+def floor_timestamp_ms(timestamp_ms, timeframe: str):
+    """
+    Returns the open time of the candle containing `timestamp_ms`. Works on plain ints
+    and on NumPy int64 arrays alike. Month/year candles have no fixed length and are
+    not supported.
+    """
+    if timeframe[-1] in ('M', 'y'):
+        raise ValueError(f"Calendar timeframe {timeframe!r} cannot be aligned arithmetically")
+    tf_ms = timeframe_to_ms(timeframe)
+    origin = _WEEK_ORIGIN_MS if timeframe[-1] == 'w' else 0
+    return (timestamp_ms - origin) // tf_ms * tf_ms + origin
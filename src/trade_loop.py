@@ -1,108 +1,390 @@
 # src/trade_loop.py
+import os
 import asyncio
-import pandas as pd
-from datetime import datetime, timedelta, timezone
+import logging
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from src.logger import logger
 from src.config import config
+from src.core.candle_cache import CandleCache
+from src.core.candle_scheduler import Boundary, CandleScheduler, now_ms
 from src.core.db_manager import DBManager
-from src.core.model_validator import load_model
+from src.core.model_registry import ModelRegistry
 from src.core.order_executor import OrderExecutor
-from src.core.signal_parser import SignalParser
-from src.data_fetch.data_source import fetch_ohlcv_data
+from src.core.signal_parser import Prediction, SignalParser, generate_signals
+from src.core.tracing import span, tracer
+from src.core.write_behind import WriteBehind
+from src.data_fetch.candle_store import candle_store
+from src.data_fetch.candle_stream import CandleStream
+from src.data_fetch.exchange_pool import exchange_pool
+from src.shared.constants import BASE_TIMEFRAME
+from src.shared.event_bus import EventBus, CandleClosed, OrderFilled, PredictionMade, connect
+from src.shared.feature_store import FeatureStore, FEATURE_STORE_PATH
+from src.shared.indicators import MIN_INDICATOR_CANDLES, add_indicators
+from src.shared.timeframes import timeframe_to_ms
+
+# Candles kept per pair for inference (120 x 1h = the former 5-day fetch)
+LOOKBACK_CANDLES = 120
+# Log the per-stage latency histograms every this many cycles
+LATENCY_REPORT_CYCLES = 60
+SMOKE_TEST_CANDLES = 20
+
+
+def parse_trading_pairs(spec: str, models_dir: str = config.MODELS_DIR) -> list[tuple[str, str]]:
+    """
+    Parses TRADING_PAIRS ("BTC:1h,ETH:15m") into (symbol, timeframe) pairs, validating
+    each timeframe. "all" lists every pair with a trained model in `models_dir`.
+    """
+    if spec.strip().lower() == "all":
+        return ModelRegistry(models_dir).discover()
+    pairs = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        symbol, sep, timeframe = item.partition(":")
+        if not sep or not symbol or not timeframe:
+            raise ValueError(f"Invalid trading pair {item!r}; expected SYMBOL:TIMEFRAME")
+        timeframe_to_ms(timeframe)  # raises on unsupported timeframes
+        pair = (symbol.strip().upper().removesuffix("/USDT"), timeframe.strip())
+        if pair not in pairs:
+            pairs.append(pair)
+    return pairs
+
+@dataclass
+class PairState:
+    """Candles and position state of one traded (symbol, timeframe) pair; its model lives in the registry."""
+    symbol: str  # base currency, e.g. 'BTC'
+    timeframe: str
+    trade_amount: float
+    candles: CandleCache
+    in_position: bool = False
+
+    @property
+    def market(self) -> str:
+        return f"{self.symbol}/USDT"
+
+    @property
+    def name(self) -> str:
+        return f"{self.symbol}-{self.timeframe}"
 
 class TradeLoop:
-    def __init__(self):
+    """
+    Trades every configured (symbol, timeframe) pair from one event loop. Pairs keep
+    their own model and position; the database writer, order executor, exchange pool,
+    feature store and event bus are shared. A `CandleScheduler` wakes the loop on every
+    candle close of any traded timeframe; pairs closing on the same boundary are handled
+    as one group: their new candles are fetched concurrently and their models run in a
+    single worker-thread hop. Models come from a `ModelRegistry`, which loads them on
+    first use and keeps only as many in memory as MODEL_CACHE_MB allows. Retrained
+    models are loaded and smoke-tested in the background and swapped in between cycles.
+    """
+
+    def __init__(self, pairs: list[tuple[str, str]] | None = None):
         self.is_running = False
-        self.model = load_model(config.MODEL_PATH, config.BACKUP_MODEL_PATH)
-        self.db_manager = DBManager(
-            host=config.DB_HOST,
-            port=config.DB_PORT,
-            dbname=config.DB_NAME,
-            user=config.DB_USER,
-            password=config.DB_PASS
+        # Per-pair models are indexed up front and only loaded (and verified) when first used
+        self.models = ModelRegistry(config.MODELS_DIR)
+        self.models.discover()
+        self.pairs = self._load_pairs(pairs if pairs is not None else parse_trading_pairs(config.TRADING_PAIRS))
+        # Trades and predictions are queued and written to PostgreSQL in the background
+        self.writer = WriteBehind(self._connect_db, on_commit=self._on_committed)
+        self._writer_task = None
+        # With EXCHANGE_REPLAY_DIR set, orders go to the same offline replay as market data.
+        replay_exchange = exchange_pool.factory('bybit', {}) if exchange_pool.factory else None
+        self.order_executor = OrderExecutor('bybit', config.BYBIT_API_KEY, config.BYBIT_API_SECRET, exchange=replay_exchange)
+        self.feature_store = None
+        # Candle closes arrive on the event bus; predictions and fills are pushed back onto it
+        self.event_bus = EventBus()
+        self._bus_link = None
+        self._candle_stream = None
+        self._candle_events = None
+        self._model_watch = None
+
+    @staticmethod
+    def _connect_db() -> DBManager:
+        db_manager = DBManager(
+            db_name=config.DB_NAME,
+            db_user=config.DB_USER,
+            db_pass=config.DB_PASS,
+            db_host=config.DB_HOST,
+            db_port=config.DB_PORT
         )
-        self.db_manager.ensure_tables_exist()
-        self.order_executor = OrderExecutor(config.BYBIT_API_KEY, config.BYBIT_API_SECRET)
-        self.signal_parser = SignalParser(self.model)
-        # This will be set by _synchronize_position_state
-        self.in_position = False
+        db_manager.ensure_tables_exist()
+        return db_manager
+
+    def _load_pairs(self, pairs) -> dict[tuple[str, str], PairState]:
+        """Sets up the pairs that have a model; the others are skipped with an error."""
+        legacy = (config.SYMBOL.split('/')[0], config.TIMEFRAME)
+        if legacy in pairs and legacy not in self.models:
+            # The single-pair deployment keeps its model at MODEL_PATH (or BACKUP_MODEL_PATH).
+            # BACKUP_MODEL_PATH is the operator's: only read, as a last-resort rollback target.
+            path = next((p for p in (config.MODEL_PATH, config.BACKUP_MODEL_PATH) if os.path.exists(p)), None)
+            if path is not None:
+                fallback = config.BACKUP_MODEL_PATH if path != config.BACKUP_MODEL_PATH else None
+                self.models.register(*legacy, path, fallback_path=fallback)
+        states = {}
+        for symbol, timeframe in pairs:
+            if (symbol, timeframe) not in self.models:
+                logger.error(f"Skipping {symbol}-{timeframe}: no model in {config.MODELS_DIR}")
+                continue
+            states[(symbol, timeframe)] = PairState(
+                symbol, timeframe, config.TRADE_AMOUNTS.get(symbol, config.TRADE_AMOUNT),
+                CandleCache(symbol, timeframe, LOOKBACK_CANDLES)
+            )
+        if not states:
+            raise RuntimeError("No tradable pairs: no model found for TRADING_PAIRS.")
+        logger.info(f"Trading {len(states)} pair(s): {', '.join(state.name for state in states.values())}")
+        return states
 
     def _synchronize_position_state(self):
         """
         RECOMMENDATION: Check the exchange for any open positions upon starting.
         This prevents state desynchronization if the bot restarts.
         """
+        for pair in self.pairs.values():
+            try:
+                logger.info(f"Synchronizing position state for {pair.name}...")
+                # In a real implementation, you would:
+                # 1. Fetch open positions from the exchange via self.order_executor
+                #    positions = self.order_executor.get_positions()
+                # 2. Check if a position for pair.market exists.
+                #    open_position = next((p for p in positions if p['symbol'] == pair.market), None)
+                # 3. If it exists and its size is > 0, set pair.in_position to True.
+                #    Several timeframes of one symbol share the exchange position, so split it by
+                #    each pair's trade_amount.
+                # For now, we assume we start with no position.
+                pair.in_position = False
+            except Exception as e:
+                logger.error(f"Failed to synchronize position state for {pair.name}: {e}. Defaulting to no position.")
+                pair.in_position = False
+        logger.info("Starting with no assumed positions.")
+
+    def _log_realtime_features(self, symbols):
+        """
+        Logs the latest realtime features of `symbols` from the shared store at DEBUG level.
+        The models do not use them, so this runs after a cycle, outside its latency trace.
+        """
+        if not config.ENABLE_REALTIME_FEATURES or not logger.isEnabledFor(logging.DEBUG):
+            return
+        for symbol in symbols:
+            try:
+                if self.feature_store is None:
+                    self.feature_store = FeatureStore(FEATURE_STORE_PATH)
+                features = self.feature_store.read(symbol)
+                age = self.feature_store.age_seconds(symbol)
+            except (FileNotFoundError, ValueError, KeyError, TimeoutError) as e:
+                logger.debug(f"Realtime features unavailable for {symbol}: {e}")
+                continue
+            if features:
+                logger.debug(f"Realtime features for {symbol} ({age:.1f}s old): {features}")
+
+    async def _start_candle_stream(self):
+        """Streams the pairs' candles over one websocket, so closed candles arrive without a REST fetch."""
+        if not config.ENABLE_CANDLE_STREAM:
+            return
         try:
-            logger.info(f"Synchronizing position state for {config.SYMBOL}...")
-            # In a real implementation, you would:
-            # 1. Fetch open positions from the exchange via self.order_executor
-            #    positions = self.order_executor.get_positions()
-            # 2. Check if a position for config.SYMBOL exists.
-            #    open_position = next((p for p in positions if p['symbol'] == config.SYMBOL), None)
-            # 3. If it exists and its size is > 0, set self.in_position to True.
-            #    if open_position and float(open_position['size']) > 0:
-            #        self.in_position = True
-            #        logger.info(f"Found existing position for {config.SYMBOL}. State set to IN_POSITION.")
-            #    else:
-            #        self.in_position = False
-            # For now, we assume we start with no position.
-            self.in_position = False
-            logger.info("Starting with no assumed position.")
+            exchange = await exchange_pool.get('bybit', {'options': {'defaultType': 'swap'}})
         except Exception as e:
-            logger.error(f"Failed to synchronize position state: {e}. Defaulting to no position.")
-            self.in_position = False
+            logger.warning(f"Candle stream unavailable ({e}); fetching closed candles over REST.")
+            return
+        if not CandleStream.supported(exchange):
+            logger.info(f"{exchange.id} cannot stream candles; fetching closed candles over REST.")
+            return
+        # One base-timeframe subscription per symbol; higher timeframes are resampled from it
+        stream = CandleStream(exchange, list(self.pairs), self._on_streamed_candle, base_timeframe=BASE_TIMEFRAME)
+        self._candle_stream = asyncio.create_task(stream.run())
+
+    def _on_streamed_candle(self, symbol: str, timeframe: str, candle: list):
+        pair = self.pairs.get((symbol, timeframe))
+        if pair is not None:
+            pair.candles.push(candle)
+        self.event_bus.publish(CandleClosed(symbol, timeframe, *candle[:6], final=True))
+
+    def _on_committed(self, records: list[dict]):
+        """Announces stored predictions once their rows are in the database, so alerts find them."""
+        for record in records:
+            if record["table"] == "predictions":
+                self.event_bus.publish(PredictionMade(
+                    record["symbol"], record["timeframe"], record["signal"], record["confidence"], price=record.get("price")
+                ))
+
+    def _start_event_bus(self):
+        """Links to the event bus broker; streamed candle closes wake the loop as soon as they happen."""
+        if config.EVENT_BUS_SOCKET:
+            self._bus_link = asyncio.create_task(connect(self.event_bus))
+        if self._candle_stream is None:
+            return  # trade-built closes from the bus keep the settle delay, so the scheduler's timer decides
+        self._candle_events = self.event_bus.subscribe(
+            CandleClosed, where=lambda event: event.final and (event.symbol, event.timeframe) in self.pairs
+        )
 
-    async def wait_for_next_candle(self):
+    async def wait_for_boundary(self, scheduler: CandleScheduler) -> Boundary:
         """
-        CORRECTED: Calculates the time until the next candle closes and sleeps.
-        This ensures the bot runs in sync with the market's timeframe.
+        Sleeps until the scheduler's next candle close is due (close + settle delay). A
+        final candle-closed event (an exchange kline from the candle stream) for one of the
+        closing timeframes ends the wait early once every closing pair has its closed candle
+        cached. Candles built from trades keep the settle delay, since the exchange may not
+        have finalised its candle when the first trade of the next one arrives.
         """
-        now = datetime.now(timezone.utc)
-        # For '1h' timeframe
-        next_hour = (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
-        wait_seconds = (next_hour - now).total_seconds()
-        logger.info(f"Next check in {wait_seconds / 60:.2f} minutes at {next_hour.isoformat()}")
-        await asyncio.sleep(wait_seconds)
+        close_ms, closing = scheduler.peek()
+        wait_seconds = max(scheduler.due_ms() - now_ms(), 0) / 1000
+        at = datetime.fromtimestamp(close_ms / 1000, timezone.utc)
+        logger.info(f"Next check in {wait_seconds / 60:.2f} minutes at {at.isoformat()} ({', '.join(closing)})")
+        if self._candle_events is None:
+            return await scheduler.wait()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait_seconds
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await self._candle_events.get(timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            # older candles, and other timeframes, were already acted on
+            if event.timeframe in closing and event.timestamp >= close_ms - timeframe_to_ms(event.timeframe):
+                if not all(
+                    pair.candles.is_current(close_ms) for pair in self.pairs.values() if pair.timeframe in closing
+                ):
+                    continue  # wait for the rest of the group's candles (at most until the settle delay)
+                logger.info(f"{event.timeframe} candle closed for {event.symbol} (close {event.close}); running now.")
+                return scheduler.pop(max(now_ms(), close_ms), settle=False)
+        return await scheduler.wait()
+
+    def _warm_candles(self):
+        """Fills every pair's candle cache from local history (blocking Parquet reads)."""
+        now = now_ms()
+        for pair in self.pairs.values():
+            pair.candles.warm(candle_store, now)
+
+    async def _execute(self, pair: PairState, signal: str):
+        if signal == 'buy' and not pair.in_position:
+            side = 'buy'
+        elif signal == 'sell' and pair.in_position:
+            side = 'sell'
+        else:
+            logger.info(f"Hold signal received for {pair.name}. No action taken.")
+            return
+        logger.info(f"{side.capitalize()} signal received for {pair.name}. Executing trade.")
+        with span("order"):  # includes the executor's retries
+            order = await self.order_executor.create_order(pair.market, 'market', side, pair.trade_amount)
+        with span("enqueue"):  # the write itself is traced as "db_write" by the flush
+            self.writer.log_trade(pair.market, side, order['price'], pair.trade_amount, 'filled')
+        self.event_bus.publish(OrderFilled(pair.market, side, order['price'], pair.trade_amount, order.get('id')))
+        pair.in_position = side == 'buy'
+
+    def _predict(self, ready) -> list[Prediction]:
+        """Predicts on snapshots of the pairs' candles (taken on the event loop); runs in a worker thread."""
+        predictions = [Prediction('hold')] * len(ready)
+        requests, indices = [], []
+        for i, (pair, market_data) in enumerate(ready):
+            try:
+                with span("features"):
+                    features = add_indicators(market_data)  # the pipeline the models were trained on
+                requests.append((SignalParser(self.models.get(pair.symbol, pair.timeframe)), features))
+                indices.append(i)
+            except Exception as e:
+                logger.error(f"Cannot predict for {pair.name}, holding: {e}")
+        with span("predict"):
+            for i, prediction in zip(indices, generate_signals(requests)):
+                predictions[i] = prediction
+            return predictions
+
+    @staticmethod
+    def _smoke_test(model, market_data):
+        """Predicts on a pair's recent candles; raises if the model fails or returns nonsense."""
+        features = add_indicators(market_data).drop(columns=['timestamp']).iloc[-SMOKE_TEST_CANDLES:]
+        labels = np.asarray(model.predict(features))
+        if labels.shape != (len(features),) or not np.isin(labels, (-1, 0, 1)).all():
+            raise ValueError(f"smoke prediction returned {labels!r}")
+        if hasattr(model, "predict_proba"):
+            probabilities = np.asarray(model.predict_proba(features), dtype=float)
+            if len(probabilities) != len(features) or not np.isfinite(probabilities).all():
+                raise ValueError("smoke prediction returned invalid probabilities")
+
+    async def _reload_models(self) -> list[tuple[str, str]]:
+        """Stages the traded pairs' retrained models that pass a smoke test; returns the staged pairs."""
+        # Frames are snapshotted here, on the event loop, since the cache changes as candles arrive.
+        # Pairs without enough candles cannot be smoke-tested; their changes wait for the next check.
+        frames = {key: pair.candles.frame() for key, pair in self.pairs.items()
+                  if len(pair.candles) >= MIN_INDICATOR_CANDLES}
+        return await asyncio.to_thread(
+            self.models.reload_changed, list(frames), lambda key, model: self._smoke_test(model, frames[key])
+        )
+
+    async def _watch_models(self):
+        """Stages retrained models of the traded pairs; `run` swaps them in between cycles."""
+        while True:
+            await asyncio.sleep(config.MODEL_RELOAD_SECONDS)
+            try:
+                await self._reload_models()
+            except Exception as e:
+                logger.error(f"Checking for retrained models failed: {e}", exc_info=True)
+
+    async def run_group(self, pairs: list[PairState]):
+        """Fetches, predicts and trades one group of pairs whose candles closed together."""
+        logger.info(f"Refreshing candles for {', '.join(pair.name for pair in pairs)}...")
+        now = now_ms()
+        refreshed = await asyncio.gather(
+            *(pair.candles.refresh(now, config.FETCH_HEDGE_DELAY_SECONDS) for pair in pairs), return_exceptions=True
+        )
+        ready = []
+        for pair, current in zip(pairs, refreshed):
+            if isinstance(current, Exception):
+                logger.error(f"Refreshing {pair.name} candles failed: {current}")
+            elif not current:
+                logger.warning(f"No up-to-date candles for {pair.name}; skipping this candle.")
+            else:
+                ready.append(pair)
+        if not ready:
+            return
+
+        with span("features"):
+            ready = [(pair, pair.candles.frame()) for pair in ready]
+        # Indicators and all of the group's models run in one hop off the event loop, one call per model
+        predictions = await asyncio.to_thread(self._predict, ready)
+        signals = [prediction.signal for prediction in predictions]
+        for (pair, market_data), (signal, probability) in zip(ready, predictions):
+            confidence = probability * 100 if probability is not None else None
+            logger.info(f"Signal for {pair.name}: {signal.upper()}"
+                        + (f" ({confidence:.1f}%)" if confidence is not None else ""))
+            price = float(market_data['close'].iloc[-1])
+            if signal != 'hold':  # stored predictions become Telegram alerts; published once committed
+                with span("enqueue"):  # the write itself is traced as "db_write" by the flush
+                    self.writer.log_prediction(pair.symbol, pair.timeframe, signal, confidence, price=price)
+            else:
+                self.event_bus.publish(PredictionMade(pair.symbol, pair.timeframe, signal, confidence, price=price))
+
+        results = await asyncio.gather(
+            *(self._execute(pair, signal) for (pair, _), signal in zip(ready, signals)), return_exceptions=True
+        )
+        for (pair, _), result in zip(ready, results):
+            if isinstance(result, Exception):
+                logger.error(f"Order for {pair.name} failed: {result}", exc_info=result)
 
     async def run(self):
         self.is_running = True
         self._synchronize_position_state() # Check for existing positions on startup
+        await self._start_candle_stream()
+        self._start_event_bus()
+        await asyncio.to_thread(self._warm_candles)
+        self._writer_task = asyncio.create_task(self.writer.run())
+        if config.MODEL_RELOAD_SECONDS > 0:
+            self._model_watch = asyncio.create_task(self._watch_models())
         logger.info("Trading bot started. Press Ctrl+C to stop.")
+        scheduler = CandleScheduler([timeframe for _, timeframe in self.pairs], config.CANDLE_SETTLE_SECONDS)
 
+        # Act on the current candles once at startup, then on every candle close
+        due, boundary = list(self.pairs.values()), None
         while self.is_running:
             try:
-                logger.info(f"Fetching market data for {config.SYMBOL}...")
-                market_data = fetch_ohlcv_data(
-                    symbol=config.SYMBOL.split('/')[0],
-                    timeframe=config.TIMEFRAME,
-                    since=datetime.utcnow() - timedelta(days=5)
-                )
-
-                if market_data is None or market_data.empty:
-                    logger.warning("Could not fetch market data. Retrying in 60 seconds.")
-                    await asyncio.sleep(60)
-                    continue
-
-                signal = self.signal_parser.generate_signal(market_data)
-
-                if signal == 'buy' and not self.in_position:
-                    logger.info("Buy signal received. Executing trade.")
-                    order = await self.order_executor.create_order(
-                        config.SYMBOL, 'market', 'buy', config.TRADE_AMOUNT
-                    )
-                    self.db_manager.log_trade(config.SYMBOL, 'buy', order['price'], config.TRADE_AMOUNT, 'filled')
-                    self.in_position = True
-                elif signal == 'sell' and self.in_position:
-                    logger.info("Sell signal received. Executing trade.")
-                    order = await self.order_executor.create_order(
-                        config.SYMBOL, 'market', 'sell', config.TRADE_AMOUNT
-                    )
-                    self.db_manager.log_trade(config.SYMBOL, 'sell', order['price'], config.TRADE_AMOUNT, 'filled')
-                    self.in_position = False
-                else:
-                    logger.info(f"Hold signal received for {config.SYMBOL}. No action taken.")
-
-                await self.wait_for_next_candle() # Use the synchronized wait
+                # Traced from the candle close (when there is one) to the last order ack
+                self.models.promote()  # retrained models validated since the last cycle
+                label = ",".join(boundary.timeframes) if boundary else "startup"
+                with tracer.cycle(label, origin=boundary.close_ms / 1000 if boundary else None):
+                    await self.run_group(due)
+                self._log_realtime_features(dict.fromkeys(pair.symbol for pair in due))
+                if tracer.cycles % LATENCY_REPORT_CYCLES == 0:
+                    tracer.report()
+                boundary = await self.wait_for_boundary(scheduler)
+                due = [pair for pair in self.pairs.values() if pair.timeframe in boundary.timeframes]
 
             except asyncio.CancelledError:
                 self.is_running = False
@@ -115,8 +397,16 @@ class TradeLoop:
 
     async def stop(self):
         logger.info("Stopping trade loop and closing connections...")
+        for task in (self._bus_link, self._candle_stream, self._model_watch):
+            if task is not None:
+                task.cancel()
         await self.order_executor.close_connection()
-        self.db_manager.close()
+        await exchange_pool.close_all()
+        if self.feature_store is not None:
+            self.feature_store.close()
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+        await self.writer.close()
         logger.info("Bot has been shut down gracefully.")
 
 
@@ -0,0 +1,62 @@
+# tests/core/test_candle_cache.py
+import pytest
+import pandas as pd
+from unittest.mock import AsyncMock
+import src.core.candle_cache as candle_cache
+from src.core.candle_cache import CandleCache
+from src.data_fetch.candle_store import CandleStore
+
+HOUR_MS = 3_600_000
+
+def candles(start_hour, count):
+    hours = range(start_hour, start_hour + count)
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime([h * HOUR_MS for h in hours], unit="ms"),
+        "open": [float(h) for h in hours], "high": [h + 1.0 for h in hours],
+        "low": [h - 1.0 for h in hours], "close": [h + 0.5 for h in hours], "volume": [1.0] * count,
+    })
+
+@pytest.mark.asyncio
+async def test_cache_warms_from_store_and_fetches_only_new_candles(tmp_path, monkeypatch):
+    """Tests that the cache loads local history, then fetches just the closed candles it lacks."""
+    store = CandleStore(str(tmp_path))
+    store.append("BTC", "1h", candles(1000, 200))
+    cache = CandleCache("BTC", "1h", size=120)
+    now = 1203 * HOUR_MS + 2_000  # candles 1200..1202 closed since the store was written
+
+    assert cache.warm(store, now) == 120
+    assert cache.last_timestamp_ms == 1199 * HOUR_MS and not cache.is_current(now)
+
+    # The exchange also returns the candle that has just opened; it must not be cached
+    fetch = AsyncMock(return_value=candles(1200, 4))
+    monkeypatch.setattr(candle_cache, "fetch_ohlcv_data", fetch)
+    assert await cache.refresh(now)
+    assert fetch.await_args.kwargs["limit"] == 5
+    assert fetch.await_args.kwargs["since"].timestamp() * 1000 == 1200 * HOUR_MS
+
+    frame = cache.frame()
+    assert len(frame) == 120
+    assert frame["timestamp"].iloc[-1] == pd.Timestamp(1202 * HOUR_MS, unit="ms")
+    assert frame["close"].iloc[-1] == 1202.5
+    assert list(frame.columns) == ["timestamp", "open", "high", "low", "close", "volume"]
+
+    # Already current: no network round trip
+    assert await cache.refresh(now + 60_000)
+    assert fetch.await_count == 1
+
+@pytest.mark.asyncio
+async def test_cache_survives_failed_fetch_and_catches_up(monkeypatch):
+    """Tests that a failed refresh keeps the buffer and the next one fills every missed candle."""
+    cache = CandleCache("ETH", "1h", size=10)
+    fetch = AsyncMock(return_value=candles(90, 11))
+    monkeypatch.setattr(candle_cache, "fetch_ohlcv_data", fetch)
+    assert await cache.refresh(100 * HOUR_MS + 1)  # cold start fetches the whole window
+    assert fetch.await_args.kwargs["limit"] == 11 and len(cache) == 10
+
+    fetch.return_value = None
+    assert not await cache.refresh(101 * HOUR_MS + 1)
+    assert cache.last_timestamp_ms == 99 * HOUR_MS
+
+    fetch.return_value = candles(100, 3)
+    assert await cache.refresh(102 * HOUR_MS + 1)
+    assert cache.frame()["open"].tolist() == [float(h) for h in range(92, 102)]
@@ -0,0 +1,43 @@
+# tests/core/test_candle_scheduler.py
+import pytest
+from src.core.candle_scheduler import CandleScheduler, next_close
+
+MINUTE_MS = 60_000
+HOUR_MS = 60 * MINUTE_MS
+
+def test_next_close_for_any_timeframe():
+    """Tests that closes are epoch-aligned for minute, hour, day and week candles."""
+    assert next_close("1m", 10 * HOUR_MS + 1) == 10 * HOUR_MS + MINUTE_MS
+    assert next_close("15m", 10 * HOUR_MS) == 10 * HOUR_MS + 15 * MINUTE_MS
+    assert next_close("4h", 10 * HOUR_MS + 1) == 12 * HOUR_MS
+    assert next_close("1d", 10 * HOUR_MS) == 24 * HOUR_MS
+    assert next_close("1w", 0) == 4 * 24 * HOUR_MS  # weeks open on Monday; the epoch was a Thursday
+    with pytest.raises(ValueError):
+        next_close("1M", 0)
+
+def test_scheduler_groups_timeframes_and_applies_settle_delay():
+    """Tests that timeframes closing together fire once, only after the settle delay, without drift."""
+    scheduler = CandleScheduler(["1h", "1m", "15m"], settle_seconds=2, start_ms=11 * HOUR_MS - 30_000)
+    assert scheduler.peek() == (11 * HOUR_MS, ["1h", "1m", "15m"])
+    assert scheduler.due_ms() == 11 * HOUR_MS + 2_000
+
+    assert scheduler.pop(11 * HOUR_MS + 1_999) is None
+    boundary = scheduler.pop(11 * HOUR_MS + 2_000)
+    assert (boundary.close_ms, boundary.timeframes, boundary.missed) == (11 * HOUR_MS, ["1h", "1m", "15m"], {})
+
+    # A slow cycle finishing 50s later still lands on the next minute boundary
+    assert scheduler.peek() == (11 * HOUR_MS + MINUTE_MS, ["1m"])
+    assert scheduler.pop(11 * HOUR_MS + 50_000) is None
+    assert scheduler.pop(11 * HOUR_MS + MINUTE_MS + 2_500).timeframes == ["1m"]
+
+def test_scheduler_reports_missed_boundaries_after_stall():
+    """Tests that a stall skips to the latest close of each timeframe and reports what was missed."""
+    scheduler = CandleScheduler(["1m", "15m"], settle_seconds=2, start_ms=10 * HOUR_MS + 1)
+    boundary = scheduler.pop(10 * HOUR_MS + 17 * MINUTE_MS + 10_000)
+    assert boundary.timeframes == ["1m", "15m"]
+    assert boundary.close_ms == 10 * HOUR_MS + 17 * MINUTE_MS
+    assert boundary.missed == {"1m": 16}
+    assert scheduler.peek() == (10 * HOUR_MS + 18 * MINUTE_MS, ["1m"])
+
+    # An event-driven wake ignores the settle delay
+    assert scheduler.pop(10 * HOUR_MS + 18 * MINUTE_MS, settle=False).timeframes == ["1m"]
@@ -57,6 +57,20 @@ def test_log_trade(mock_psycopg2_connect, db_creds):
     assert "INSERT INTO trades" in mock_cursor.execute.call_args.args[0]
     assert mock_cursor.execute.call_args.args[1] == ("BTC/USDT", "buy", 50000.0, 0.01, "filled")
 
+@patch('src.core.db_manager.execute_values')
+def test_write_batch_uses_one_transaction(mock_execute_values, mock_psycopg2_connect, db_creds):
+    """Tests that batched trades and predictions are inserted together and committed once."""
+    db_manager = DBManager(*db_creds)
+    trades = [("2024-01-01T00:00:00+00:00", "BTC/USDT", "buy", 50000.0, 0.01, "filled")]
+    predictions = [("2024-01-01T00:00:00+00:00", "BTC", "1h", "buy", 0.0)]
+
+    db_manager.write_batch(trades, predictions)
+
+    assert mock_execute_values.call_count == 2
+    assert "INSERT INTO trades" in mock_execute_values.call_args_list[0].args[1]
+    assert mock_execute_values.call_args_list[1].args[2] == predictions
+    db_manager.conn.commit.assert_called_once()
+
 def test_connection_failure_raises_exception(db_creds):
     """Tests that a connection error during initialization raises an exception."""
     # Arrange
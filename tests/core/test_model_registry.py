@@ -0,0 +1,170 @@
+# tests/core/test_model_registry.py
+import os
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from src.core.model_registry import ModelIntegrityError, ModelRegistry, model_filename, write_checksum
+from src.core.native_model import NativeModel, export_native
+
+def save(tmp_path, symbol, timeframe, payload, checksum=True):
+    path = str(tmp_path / model_filename(symbol, timeframe, ".pkl"))
+    joblib.dump(payload, path)
+    if checksum:
+        write_checksum(path)
+    return path
+
+def reject_negative_versions(key, model):
+    if model["version"] < 0:
+        raise ValueError("bad model")
+
+def test_registry_discovers_and_loads_lazily(tmp_path):
+    """Tests that discovery indexes model files without loading them, and get() loads each once."""
+    save(tmp_path, "BTC", "1h", {"name": "btc"})
+    save(tmp_path, "ETH", "5m", {"name": "eth"})
+    (tmp_path / "notes.txt").touch()
+    registry = ModelRegistry(str(tmp_path))
+
+    assert registry.discover() == [("BTC", "1h"), ("ETH", "5m")]
+    assert ("ETH", "5m") in registry and registry.loads == 0
+
+    assert registry.get("ETH", "5m") == {"name": "eth"}
+    assert registry.get("ETH", "5m") is registry.get("ETH", "5m")
+    assert registry.loads == 1 and not registry.is_loaded("BTC", "1h")
+    with pytest.raises(KeyError):
+        registry.get("SOL", "1h")
+
+def test_registry_rejects_tampered_model(tmp_path):
+    """Tests that a model not matching its checksum sidecar is refused, and a missing sidecar only when required."""
+    path = save(tmp_path, "BTC", "1h", {"name": "btc"})
+    joblib.dump({"name": "tampered"}, path)
+    save(tmp_path, "ETH", "1h", {"name": "eth"}, checksum=False)
+    registry = ModelRegistry(str(tmp_path))
+    registry.discover()
+
+    with pytest.raises(ModelIntegrityError):
+        registry.get("BTC", "1h")
+    assert registry.get("ETH", "1h") == {"name": "eth"}
+
+    strict = ModelRegistry(str(tmp_path), require_checksum=True)
+    strict.discover()
+    with pytest.raises(ModelIntegrityError):
+        strict.get("ETH", "1h")
+
+def test_registry_evicts_least_recently_used(tmp_path):
+    """Tests that loaded models stay within the byte budget, evicting the least recently used first."""
+    for symbol in ("BTC", "ETH", "SOL"):
+        save(tmp_path, symbol, "1h", b"x" * 10_000)
+    registry = ModelRegistry(str(tmp_path))
+    registry.discover()
+    size = registry._entries[("BTC", "1h")].size
+    registry.max_bytes = 2 * size
+
+    registry.get("BTC", "1h")
+    registry.get("ETH", "1h")
+    registry.get("BTC", "1h")  # ETH is now the least recently used
+    registry.get("SOL", "1h")
+
+    assert registry.is_loaded("BTC", "1h") and registry.is_loaded("SOL", "1h")
+    assert not registry.is_loaded("ETH", "1h")
+    assert registry.evictions == 1 and registry.loaded_bytes == 2 * size
+    registry.get("ETH", "1h")
+    assert registry.loads == 4
+
+def test_registry_hot_reloads_validated_models_and_rolls_back_bad_ones(tmp_path):
+    """Tests that a retrained model is staged, then swapped in, and a failing one falls back to the backup."""
+    path = save(tmp_path, "BTC", "1h", {"version": 1})
+    registry = ModelRegistry(str(tmp_path))
+    registry.discover()
+    assert registry.get("BTC", "1h") == {"version": 1} and registry.changed() == []
+
+    def validate(key, model):
+        if model["version"] < 0:
+            raise ValueError("bad model")
+
+    save(tmp_path, "BTC", "1h", {"version": 2})
+    os.utime(path, ns=(1, 1))  # mtime resolution must not hide the rewrite
+    assert registry.reload_changed(validate=validate) == [("BTC", "1h")]
+    assert registry.get("BTC", "1h") == {"version": 1}  # not swapped until promoted
+    assert registry.promote() == [("BTC", "1h")]
+    assert registry.get("BTC", "1h") == {"version": 2} and registry.changed() == []
+
+    save(tmp_path, "BTC", "1h", {"version": -1})
+    os.utime(path, ns=(2, 2))
+    assert registry.reload_changed(validate=validate) == []
+    assert registry.promote() == [] and registry.rollbacks == 1
+    assert registry.get("BTC", "1h") == {"version": 2} and registry.changed() == []
+    registry.evict("BTC", "1h")
+    assert registry.get("BTC", "1h") == {"version": 2}  # reloaded from the last validated backup
+
+def test_first_rejected_retrain_falls_back_to_the_startup_model(tmp_path):
+    """Tests that the model first loaded is snapshotted, so a bad first retrain still has a rollback target."""
+    path = save(tmp_path, "BTC", "1h", {"version": 1})
+    registry = ModelRegistry(str(tmp_path))
+    registry.discover()
+    registry.get("BTC", "1h")
+
+    save(tmp_path, "BTC", "1h", {"version": -1})
+    os.utime(path, ns=(1, 1))
+    assert registry.reload_changed(validate=reject_negative_versions) == []
+    registry.evict("BTC", "1h")
+    assert registry.get("BTC", "1h") == {"version": 1}
+
+def test_fallback_model_is_read_only_and_used_without_a_backup(tmp_path):
+    """Tests that a fallback passed to register() is never written, and is rolled back to only without a backup."""
+    path, fallback = save(tmp_path, "BTC", "1h", {"version": 2}), str(tmp_path / "backup_model.pkl")
+    joblib.dump({"version": 1}, fallback)
+    registry = ModelRegistry(str(tmp_path))
+    registry.register("BTC", "1h", path, fallback_path=fallback)
+
+    save(tmp_path, "BTC", "1h", {"version": -1})  # rejected before the pair ever loaded
+    os.utime(path, ns=(1, 1))
+    assert registry.reload_changed(validate=reject_negative_versions) == []
+    assert registry.get("BTC", "1h") == {"version": 1}
+
+    save(tmp_path, "BTC", "1h", {"version": 3})
+    os.utime(path, ns=(2, 2))
+    assert registry.reload_changed(validate=reject_negative_versions) == [("BTC", "1h")]
+    registry.promote()
+    save(tmp_path, "BTC", "1h", {"version": -1})
+    os.utime(path, ns=(3, 3))
+    assert registry.reload_changed(validate=reject_negative_versions) == []
+    registry.evict("BTC", "1h")
+    assert registry.get("BTC", "1h") == {"version": 3}  # from the registry's own backup
+    assert joblib.load(fallback) == {"version": 1} and not os.path.exists(fallback + ".sha256")
+
+def test_registry_prefers_native_models(tmp_path):
+    """Tests that a native booster with its manifest is preferred over a pickle and predicts like the wrapper."""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, 3)), columns=["open", "close", "volume"])
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=3, n_jobs=1).fit(X, (X["close"] > 0).astype(int))
+    save(tmp_path, "BTC", "1h", {"stale": "pickle"})
+    path = str(tmp_path / model_filename("BTC", "1h"))
+    export_native(model, path, list(X.columns))
+    write_checksum(path)
+    registry = ModelRegistry(str(tmp_path))
+
+    assert registry.discover() == [("BTC", "1h")]
+    native = registry.get("BTC", "1h")
+    assert isinstance(native, NativeModel)
+    shuffled = X[["volume", "open", "close"]].assign(timestamp=0)  # selected by the manifest's feature order
+    np.testing.assert_allclose(native.predict_proba(shuffled), model.predict_proba(X), atol=1e-6)
+    assert (native.predict(X) == model.predict(X)).all()
+
+def test_registry_rejects_manifest_not_matching_the_model(tmp_path):
+    """Tests that the checksum covers the manifest, so a model paired with another export's manifest is refused."""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(100, 2)), columns=["open", "close"])
+    model = xgb.XGBClassifier(n_estimators=5, max_depth=2, n_jobs=1).fit(X, (X["close"] > 0).astype(int))
+    path = str(tmp_path / model_filename("BTC", "1h"))
+    export_native(model, path, ["open", "close"])
+    write_checksum(path)
+    export_native(model, path, ["close", "open"])  # retraining has rewritten the manifest, not yet the sidecar
+    registry = ModelRegistry(str(tmp_path))
+    registry.discover()
+
+    with pytest.raises(ModelIntegrityError):
+        registry.get("BTC", "1h")
+    write_checksum(path)
+    assert registry.get("BTC", "1h").features == ["close", "open"]
@@ -2,7 +2,7 @@
 import pytest
 import pickle
 from pathlib import Path
-from src.core.model_validator import load_model
+from src.core.model_validator import get_checksum, get_file_checksum, load_model
 
 @pytest.fixture
 def dummy_models(tmp_path: Path):
@@ -52,4 +52,10 @@ def test_load_model_fails_if_no_models_exist(dummy_models):
 def test_load_model_fails_on_corrupt_primary_and_no_backup(dummy_models):
     """Tests that a FileNotFoundError is raised if the primary is corrupt and no backup exists."""
     with pytest.raises(FileNotFoundError): # Will bubble up after logging the pickle error
-        load_model(dummy_models["corrupt"])
\ No newline at end of file
+        load_model(dummy_models["corrupt"])
+def test_file_and_in_memory_checksums_agree(dummy_models):
+    """Tests that checksumming files, also several in order, matches checksumming their bytes."""
+    primary, backup = dummy_models["primary"], dummy_models["backup"]
+    assert get_file_checksum(primary) == get_checksum(primary.read_bytes())
+    assert get_file_checksum(primary, backup) == get_checksum(primary.read_bytes(), backup.read_bytes())
+    assert get_file_checksum(primary, "non_existent.json") is None
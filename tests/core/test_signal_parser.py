@@ -2,7 +2,8 @@
 import pytest
 import pandas as pd
 from unittest.mock import MagicMock
-from src.core.signal_parser import SignalParser
+import numpy as np
+from src.core.signal_parser import Prediction, SignalParser, generate_signals
 
 @pytest.fixture
 def mock_model():
@@ -89,4 +90,25 @@ def test_hold_signal_on_prediction_error(mock_model, sample_market_data):
     signal = parser.generate_signal(sample_market_data)
     
     # Assert
-    assert signal == 'hold'
\ No newline at end of file
+    assert signal == 'hold'
+
+def test_generate_signals_predicts_once_per_model(sample_market_data):
+    """Tests that requests sharing a model are predicted in one call and results keep request order."""
+    shared, other = MagicMock(), MagicMock()
+    shared.predict.side_effect = lambda X: np.array([1, -1])
+    shared.predict_proba.side_effect = lambda X: np.array([[0.2, 0.8], [0.6, 0.4]])
+    other.predict.side_effect = lambda X: np.array([0])
+    del other.predict_proba  # models without probabilities still work
+    shared_parser, other_parser = SignalParser(shared), SignalParser(other)
+
+    predictions = generate_signals([
+        (shared_parser, sample_market_data),
+        (other_parser, sample_market_data),
+        (SignalParser(shared), sample_market_data.iloc[:1]),
+        (shared_parser, pd.DataFrame()),
+    ])
+
+    assert predictions == [Prediction('buy', 0.8), Prediction('hold', None), Prediction('sell', 0.6), Prediction('hold')]
+    shared.predict.assert_called_once()
+    assert len(shared.predict.call_args.args[0]) == 2
+    assert 'timestamp' not in shared.predict.call_args.args[0].columns
@@ -0,0 +1,47 @@
+# tests/core/test_tracing.py
+import time
+import asyncio
+import logging
+import pytest
+from src.core.tracing import Histogram, Tracer, span, tracer as shared_tracer
+
+def test_histogram_percentiles_over_rolling_window():
+    """Tests that percentiles only cover the most recent `window` samples."""
+    histogram = Histogram(window=100)
+    for value in range(200):
+        histogram.add(value / 1000)
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["p50"] == pytest.approx(0.150)
+    assert summary["p99"] == pytest.approx(0.199) and summary["max"] == pytest.approx(0.199)
+
+@pytest.mark.asyncio
+async def test_cycle_collects_spans_from_tasks_and_threads(caplog):
+    """Tests that spans in gathered tasks and worker threads land in the cycle, and slow cycles are logged."""
+    tracer = Tracer(slow_seconds=0.5)
+
+    async def fetch():
+        with span("fetch"):
+            await asyncio.sleep(0.02)
+
+    def predict():
+        with span("predict"):
+            time.sleep(0.01)
+
+    with caplog.at_level(logging.WARNING):
+        with tracer.cycle("1m", origin=time.time() - 1.0) as trace:
+            await asyncio.gather(fetch(), fetch())
+            await asyncio.to_thread(predict)
+
+    stages = trace.stages()
+    assert stages["wake"] == pytest.approx(1.0, abs=0.1)
+    assert 0.02 <= stages["fetch"] < 0.5  # the two concurrent fetches overlap
+    assert stages["predict"] >= 0.01
+    assert trace.total >= 1.03
+    assert set(tracer.histograms) == {"wake", "fetch", "predict", "total"}
+    assert "Slow cycle 1m" in caplog.text
+
+    # Outside a cycle, spans go straight to the shared tracer's histograms
+    with span("db_write_test"):
+        pass
+    assert len(shared_tracer.histograms.pop("db_write_test")) == 1
@@ -0,0 +1,85 @@
+# tests/core/test_write_behind.py
+import asyncio
+import threading
+import pytest
+from unittest.mock import MagicMock
+from src.core.write_behind import WriteBehind
+
+@pytest.mark.asyncio
+async def test_records_are_written_in_batches_without_blocking(tmp_path):
+    """Tests that queued trades and predictions reach the database in one batch from the worker."""
+    db = MagicMock()
+    writer = WriteBehind(lambda: db, str(tmp_path / "journal.jsonl"), flush_interval=0.01)
+    writer.log_trade("BTC/USDT", "buy", 100.0, 0.5, "filled", timestamp="2024-01-01T00:00:00+00:00")
+    writer.log_prediction("BTC", "1h", "buy")
+    db.write_batch.assert_not_called()  # logging itself never touches the database
+
+    task = asyncio.create_task(writer.run())
+    for _ in range(100):
+        if db.write_batch.called:
+            break
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await writer.close()
+
+    trades, predictions = db.write_batch.call_args.args
+    assert trades == [("2024-01-01T00:00:00+00:00", "BTC/USDT", "buy", 100.0, 0.5, "filled")]
+    assert [p[1:] for p in predictions] == [("BTC", "1h", "buy", 0.0)]
+    db.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_database_outage_spills_to_journal_and_replays_on_restart(tmp_path):
+    """Tests that records are journaled while the database is down and replayed in order on the next start."""
+    journal = tmp_path / "journal.jsonl"
+
+    def unavailable():
+        raise ConnectionError("database is down")
+
+    down = WriteBehind(unavailable, str(journal))
+    down.log_trade("BTC/USDT", "buy", 100.0, 1.0, "filled")
+    assert not down._flush(down._take())
+    down.log_trade("BTC/USDT", "sell", 110.0, 1.0, "filled")
+    await down.close()  # journaled without another connection attempt
+    assert len(journal.read_text().splitlines()) == 2
+
+    db = MagicMock()
+    restarted = WriteBehind(lambda: db, str(journal), flush_interval=0.01)
+    task = asyncio.create_task(restarted.run())
+    for _ in range(100):
+        if not journal.exists():
+            break
+        await asyncio.sleep(0.01)
+    task.cancel()
+
+    assert not journal.exists()
+    trades, predictions = db.write_batch.call_args.args
+    assert [t[2] for t in trades] == ["buy", "sell"] and predictions == []
+
+@pytest.mark.asyncio
+async def test_close_waits_for_the_flush_in_flight_and_reports_commits(tmp_path):
+    """Tests that closing after cancelling run neither overlaps nor repeats its flush, and commits are reported."""
+    release, started = threading.Event(), threading.Event()
+    db = MagicMock()
+
+    def slow_write(trades, predictions):
+        started.set()
+        release.wait(5)
+
+    db.write_batch.side_effect = slow_write
+    committed = []
+    writer = WriteBehind(lambda: db, str(tmp_path / "journal.jsonl"), flush_interval=0.01, on_commit=committed.extend)
+    writer.log_prediction("BTC", "1h", "buy", 75.0, price=100.0)
+    task = asyncio.create_task(writer.run())
+    while not started.is_set():
+        await asyncio.sleep(0.01)
+    task.cancel()
+    writer.log_prediction("ETH", "1h", "sell", 60.0)
+
+    closing = asyncio.create_task(writer.close())
+    await asyncio.sleep(0.05)
+    assert db.write_batch.call_count == 1  # the second batch waits for the first
+    release.set()
+    await closing
+
+    assert db.write_batch.call_count == 2
+    assert [(r["symbol"], r["price"]) for r in committed] == [("BTC", 100.0), ("ETH", None)]
@@ -0,0 +1,68 @@
+# tests/test_candle_store.py
+import pytest
+import pandas as pd
+from datetime import datetime
+from src.data_fetch.candle_store import CandleStore
+
+def make_candles(start: str, periods: int, freq: str = "1min", close: float = 100.0) -> pd.DataFrame:
+    """Builds a simple OHLCV frame with a constant close price."""
+    timestamps = pd.date_range(start, periods=periods, freq=freq)
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 10.0,
+    })
+
+@pytest.fixture
+def store(tmp_path):
+    return CandleStore(str(tmp_path))
+
+def test_append_partitions_by_month(store):
+    """Tests that candles spanning a month boundary are split into two partitions."""
+    store.append("BTC", "1h", make_candles("2024-01-31 20:00", 10, freq="1h"))
+
+    partitions = store.partitions("BTC", "1h")
+    assert [p.rsplit("/", 1)[-1] for p in partitions] == ["2024-01.parquet", "2024-02.parquet"]
+    assert len(store.read("BTC", "1h")) == 10
+
+def test_append_deduplicates_with_newest_winning(store):
+    """Tests that re-appending an existing timestamp replaces the stored candle."""
+    store.append("BTC", "1m", make_candles("2024-01-01", 5, close=100.0))
+    store.append("BTC", "1m", make_candles("2024-01-01 00:04", 3, close=200.0))
+
+    df = store.read("BTC", "1m")
+    assert len(df) == 7
+    assert df["timestamp"].is_monotonic_increasing
+    assert df["close"].tolist() == [100.0] * 4 + [200.0] * 3
+
+def test_read_time_range_and_columns(store):
+    """Tests that range queries are half-open and honour column pruning."""
+    store.append("ETH", "1m", make_candles("2024-01-01", 60))
+
+    df = store.read("ETH", "1m", start=datetime(2024, 1, 1, 0, 10), end=datetime(2024, 1, 1, 0, 20), columns=["close"])
+    assert len(df) == 10
+    assert list(df.columns) == ["timestamp", "close"]
+    assert df["timestamp"].iloc[0] == pd.Timestamp("2024-01-01 00:10")
+
+def test_last_timestamp_and_tail(store):
+    """Tests the metadata-only last timestamp and a tail that spans partitions."""
+    assert store.last_timestamp("SOL", "1h") is None
+    store.append("SOL", "1h", make_candles("2024-01-31 20:00", 10, freq="1h"))
+
+    assert store.last_timestamp("SOL", "1h") == pd.Timestamp("2024-02-01 05:00")
+    tail = store.tail("SOL", "1h", 8)
+    assert len(tail) == 8
+    assert tail["timestamp"].iloc[0] == pd.Timestamp("2024-01-31 22:00")
+
+def test_read_missing_pair_returns_empty_frame(store):
+    """Tests that unknown pairs read back as an empty, correctly-typed frame."""
+    df = store.read("DOGE", "5m")
+    assert df.empty
+    assert "close" in df.columns
+
+def test_import_csv(store, tmp_path):
+    """Tests migrating a legacy history CSV into the store."""
+    csv_path = tmp_path / "BTCUSDT_1h.csv"
+    make_candles("2024-03-01", 24, freq="1h").to_csv(csv_path, index=False)
+
+    assert store.import_csv(str(csv_path), "BTC", "1h") == 24
+    assert len(store.read("BTC", "1h")) == 24
@@ -0,0 +1,120 @@
+# tests/test_candle_stream.py
+import asyncio
+import ccxt.pro
+import pytest
+from src.data_fetch.candle_stream import CandleStream
+
+MINUTE_MS = 60_000
+
+def candle(minute, close=1.0):
+    return [minute * MINUTE_MS, 1.0, 2.0, 0.5, close, 10.0]
+
+class FakeStreamExchange:
+    """Replays scripted watch_ohlcv_for_symbols updates; an Exception in the script simulates a disconnect."""
+    id = "fake"
+    rateLimit = 1
+
+    def __init__(self, updates, rest_candles=()):
+        self.has = {"watchOHLCVForSymbols": True, "watchOHLCV": True}
+        self.updates = list(updates)
+        self.rest_candles = list(rest_candles)
+        self.subscriptions = []
+        self.rest_calls = []
+
+    async def watch_ohlcv_for_symbols(self, subscriptions):
+        self.subscriptions.append(subscriptions)
+        if not self.updates:
+            await asyncio.Event().wait()
+        update = self.updates.pop(0)
+        if isinstance(update, Exception):
+            raise update
+        return update
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.rest_calls.append((symbol, timeframe, since))
+        return [c for c in self.rest_candles if c[0] >= since]
+
+async def run_until_idle(stream, exchange):
+    task = asyncio.create_task(stream.run())
+    for _ in range(200):
+        if not exchange.updates:
+            break
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+@pytest.mark.asyncio
+async def test_stream_emits_candles_once_the_next_one_opens():
+    """Tests that all pairs share one subscription and a candle is emitted when its successor arrives."""
+    exchange = FakeStreamExchange([
+        {"BTC/USDT:USDT": {"1m": [candle(1, close=1.0)]}},
+        {"BTC/USDT:USDT": {"1m": [candle(1, close=1.5)]}, "ETH/USDT:USDT": {"5m": [candle(5)]}},
+        {"BTC/USDT:USDT": {"1m": [candle(2)]}},
+    ])
+    closed = []
+    stream = CandleStream(exchange, [("BTC", "1m"), ("ETH", "5m")], lambda *args: closed.append(args))
+    await run_until_idle(stream, exchange)
+
+    assert exchange.subscriptions[0] == [["BTC/USDT", "1m"], ["ETH/USDT", "5m"]]
+    assert closed == [("BTC", "1m", candle(1, close=1.5))]  # the last update of the candle
+    assert exchange.rest_calls == []
+
+@pytest.mark.asyncio
+async def test_stream_backfills_over_rest_after_reconnect():
+    """Tests that candles missed while disconnected are fetched over REST and emitted in order, once."""
+    exchange = FakeStreamExchange(
+        [
+            {"BTC/USDT": {"1m": [candle(1)]}},
+            {"BTC/USDT": {"1m": [candle(2)]}},
+            ConnectionError("socket closed"),
+            {"BTC/USDT": {"1m": [candle(5)]}},
+            {"BTC/USDT": {"1m": [candle(6)]}},
+        ],
+        rest_candles=[candle(m, close=m) for m in range(1, 6)],
+    )
+    closed = []
+    stream = CandleStream(exchange, [("BTC", "1m")], lambda *args: closed.append(args[2]), reconnect_seconds=0)
+    await run_until_idle(stream, exchange)
+
+    assert [c[0] // MINUTE_MS for c in closed] == [1, 2, 3, 4, 5]
+    assert closed[1] == candle(2, close=2)  # final values from REST, not the stale streamed update
+    assert exchange.rest_calls == [("BTC/USDT", "1m", 2 * MINUTE_MS)]
+    assert stream.backfilled == 3
+
+@pytest.mark.asyncio
+async def test_stream_derives_higher_timeframes_from_base_candles():
+    """Tests that only 1m is streamed and 5m candles are resampled from it, skipping the partial first one."""
+    exchange = FakeStreamExchange([{"BTC/USDT": {"1m": [candle(m, close=m)]}} for m in range(3, 12)])
+    closed = []
+    stream = CandleStream(exchange, [("BTC", "5m")], lambda *args: closed.append(args), base_timeframe="1m")
+    await run_until_idle(stream, exchange)
+
+    assert exchange.subscriptions[0] == [["BTC/USDT", "1m"]]
+    assert closed == [("BTC", "5m", [5 * MINUTE_MS, 1.0, 2.0, 0.5, 9.0, 50.0])]
+
+@pytest.mark.asyncio
+async def test_stream_emits_confirmed_candles_without_waiting_for_the_next_one():
+    """Tests that a push the exchange marks final is emitted at once, and not again when its successor opens."""
+    exchange = FakeStreamExchange([
+        {"BTC/USDT": {"1m": [candle(1) + [False]]}},
+        {"BTC/USDT": {"1m": [candle(1, close=1.5) + [True]]}},
+        {"BTC/USDT": {"1m": [candle(2) + [False]]}},
+    ])
+    closed = []
+    stream = CandleStream(exchange, [("BTC", "1m")], lambda *args: closed.append(args[2]))
+    await run_until_idle(stream, exchange)
+
+    assert closed == [candle(1, close=1.5)]
+    assert stream.closed == 1
+
+def test_bybit_klines_keep_their_confirm_flag():
+    """Tests that ccxt's bybit kline parser keeps `confirm` once a stream wraps the client."""
+    exchange = ccxt.pro.bybit()
+    kline = {"start": 60_000, "open": "1", "high": "2", "low": "0.5", "close": "1.5", "volume": "10", "confirm": True}
+    assert len(exchange.parse_ws_ohlcv(kline, {"inverse": False})) == 6
+
+    CandleStream(exchange, [("BTC", "1m")], lambda *args: None)
+    CandleStream(exchange, [("ETH", "1m")], lambda *args: None)  # wrapped once only
+    assert exchange.parse_ws_ohlcv(kline, {"inverse": False}) == [60_000, 1.0, 2.0, 0.5, 1.5, 10.0, True]
+    assert len(exchange.parse_ws_ohlcv({**kline, "confirm": None}, {"inverse": False})) == 6
@@ -0,0 +1,114 @@
+# tests/test_data_quality.py
+import pandas as pd
+import pytest
+from src.data_fetch.candle_store import CandleStore
+from src.data_fetch.data_quality import scan_candles
+
+def make_candles(timestamps, close=100.0, volume=1.0) -> pd.DataFrame:
+    """Builds candles at the given timestamps with constant values."""
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(timestamps),
+        "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": volume,
+    })
+
+@pytest.fixture
+def store(tmp_path):
+    return CandleStore(str(tmp_path))
+
+def test_scan_finds_ranges_and_anomalies():
+    """Tests that a batch scan reports ranges, duplicates, ordering and bad rows."""
+    df = make_candles(["2024-01-01 00:00:00", "2024-01-01 00:01:00", "2024-01-01 00:01:00",
+                       "2024-01-01 00:05:00", "2024-01-01 00:04:00", "2024-01-01 00:06:30"])
+    df.loc[3, "volume"] = 0.0
+    df.loc[4, "high"] = 50.0  # high below open/close
+
+    scan = scan_candles(df, "1m")
+
+    assert scan["duplicates"] == 1
+    assert scan["out_of_order"] == 1
+    assert len(scan["ranges"]) == 3
+    assert scan["zero_volume"] == [pd.Timestamp("2024-01-01 00:05").value // 10**6]
+    assert scan["invalid_ohlc"] == [pd.Timestamp("2024-01-01 00:04").value // 10**6]
+    assert len(scan["misaligned"]) == 1
+
+def test_index_merges_appends_incrementally(store):
+    """Tests that adjacent appended batches join into one continuous range."""
+    store.append("BTC", "1m", make_candles(pd.date_range("2024-01-01 00:00", periods=5, freq="1min")))
+    store.append("BTC", "1m", make_candles(pd.date_range("2024-01-01 00:05", periods=5, freq="1min")))
+
+    assert store.coverage.ranges("BTC", "1m") == [(pd.Timestamp("2024-01-01 00:00"), pd.Timestamp("2024-01-01 00:09"))]
+
+def test_gaps_within_window(store):
+    """Tests that gaps are reported inside ranges and at the edges of the window."""
+    store.append("BTC", "1m", make_candles(pd.date_range("2024-01-01 00:02", periods=3, freq="1min")))
+    store.append("BTC", "1m", make_candles(pd.date_range("2024-01-01 00:08", periods=2, freq="1min")))
+
+    gaps = store.gaps("BTC", "1m", start=pd.Timestamp("2024-01-01 00:00"), end=pd.Timestamp("2024-01-01 00:09"))
+
+    assert gaps == [
+        (pd.Timestamp("2024-01-01 00:00"), pd.Timestamp("2024-01-01 00:01")),
+        (pd.Timestamp("2024-01-01 00:05"), pd.Timestamp("2024-01-01 00:07")),
+    ]
+
+def test_confirmed_gap_is_not_reported_again(store):
+    """Tests that a gap the exchange cannot fill is excluded from later gap queries."""
+    store.append("ETH", "1h", make_candles(["2024-01-01 00:00", "2024-01-01 03:00"]))
+    store.coverage.confirm_gap("ETH", "1h", pd.Timestamp("2024-01-01 01:00"), pd.Timestamp("2024-01-01 02:00"))
+
+    assert store.gaps("ETH", "1h") == []
+
+def test_windows_split_around_invalid_rows(store):
+    """Tests that clean windows exclude invalid rows and honour the minimum length."""
+    df = make_candles(pd.date_range("2024-01-01", periods=10, freq="1min"))
+    df.loc[6, "low"] = -1.0
+    store.append("SOL", "1m", df)
+
+    assert store.windows("SOL", "1m", min_candles=3) == [
+        (pd.Timestamp("2024-01-01 00:00"), pd.Timestamp("2024-01-01 00:05")),
+        (pd.Timestamp("2024-01-01 00:07"), pd.Timestamp("2024-01-01 00:09")),
+    ]
+    assert len(store.windows("SOL", "1m", min_candles=4)) == 1
+
+def test_rewritten_row_clears_its_anomaly(store):
+    """Tests that re-appending a corrected candle removes its earlier anomaly."""
+    bad = make_candles(["2024-01-01 00:00", "2024-01-01 00:01"])
+    bad.loc[1, "high"] = 10.0
+    store.append("XRP", "1m", bad)
+    assert len(store.windows("XRP", "1m")) == 1
+
+    store.append("XRP", "1m", make_candles(["2024-01-01 00:01"]))
+    assert store.windows("XRP", "1m") == [(pd.Timestamp("2024-01-01 00:00"), pd.Timestamp("2024-01-01 00:01"))]
+
+def test_index_is_built_for_existing_data(store, tmp_path):
+    """Tests that a store written before the index existed is scanned once on demand."""
+    store.append("ADA", "1m", make_candles(pd.date_range("2024-01-01", periods=3, freq="1min")))
+    (tmp_path / "_coverage.json").unlink()
+
+    fresh = CandleStore(str(tmp_path))
+    assert fresh.gaps("ADA", "1m", start=pd.Timestamp("2024-01-01"), end=pd.Timestamp("2024-01-01 00:04")) == [
+        (pd.Timestamp("2024-01-01 00:03"), pd.Timestamp("2024-01-01 00:04")),
+    ]
+
+def test_concurrent_writers_merge_their_coverage(tmp_path):
+    """Tests that two stores on one directory (e.g. two processes) keep each other's coverage."""
+    first, second = CandleStore(str(tmp_path)), CandleStore(str(tmp_path))
+    assert not first.coverage.has("BTC", "1m") and not second.coverage.has("ETH", "1m")  # both cached it empty
+    first.append("BTC", "1m", make_candles(pd.date_range("2024-01-01", periods=3, freq="1min")))
+    second.append("ETH", "1m", make_candles(pd.date_range("2024-01-01", periods=3, freq="1min")))
+
+    fresh = CandleStore(str(tmp_path))
+    assert fresh.coverage.has("BTC", "1m") and fresh.coverage.has("ETH", "1m")
+    assert first.coverage.has("ETH", "1m")  # reloaded once the other writer saved
+
+def test_failed_write_leaves_coverage_untouched(store, monkeypatch):
+    """Tests that candles whose partition write failed are still reported as a gap."""
+    def fail(path, df):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write_partition", fail)
+    with pytest.raises(OSError):
+        store.append("BTC", "1m", make_candles(pd.date_range("2024-01-01", periods=3, freq="1min")))
+    assert not store.coverage.has("BTC", "1m")
+    assert store.gaps("BTC", "1m", "2024-01-01 00:00", "2024-01-01 00:02") == [
+        (pd.Timestamp("2024-01-01 00:00"), pd.Timestamp("2024-01-01 00:02"))
+    ]
@@ -1,9 +1,10 @@
 # tests/test_data_source.py
+import asyncio
 import pytest
 import pandas as pd
 from unittest.mock import patch, MagicMock
 # CORRECTED: Standardized import path to include 'src'
-from src.data_fetch.data_source import fetch_ohlcv_data
+from src.data_fetch.data_source import fetch_ohlcv_data, ExchangeLatencyStats
 from datetime import datetime
 
 @patch('src.data_fetch.data_source.ccxt.bybit')
@@ -28,4 +29,68 @@ def test_fetch_ohlcv_data_success(mock_bybit):
     assert isinstance(df, pd.DataFrame)
     assert len(df) == 2
     assert 'close' in df.columns
-    mock_exchange_instance.fetch_ohlcv.assert_called_once()
\ No newline at end of file
+    mock_exchange_instance.fetch_ohlcv.assert_called_once()
+
+
+class FakeExchange:
+    """Minimal async exchange returning fixed candles after a delay."""
+    def __init__(self, name, delay, data):
+        self.id = name
+        self.rateLimit = 1
+        self.has = {"fetchOHLCV": True}
+        self.timeframes = {"1h": "1h"}
+        self.delay = delay
+        self.data = data
+        self.cancelled = False
+
+    async def fetch_ohlcv(self, symbol, timeframe, since, limit=None):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.data
+
+@pytest.fixture
+def fake_exchanges():
+    """Patches the exchange pool with a slow bybit and a fast binance."""
+    candles = [[1672531200000, 16500, 16600, 16400, 16550, 100]]
+    exchanges = {
+        "bybit": FakeExchange("bybit", 0.5, candles),
+        "binance": FakeExchange("binance", 0.01, candles),
+        "okx": FakeExchange("okx", 0.01, []),
+        "kucoin": FakeExchange("kucoin", 0.01, []),
+    }
+
+    async def get(ex_name, config=None):
+        return exchanges[ex_name]
+
+    with patch('src.data_fetch.data_source.exchange_pool.get', side_effect=get), \
+         patch('src.data_fetch.data_source.latency_stats', ExchangeLatencyStats()):
+        yield exchanges
+
+@pytest.mark.asyncio
+async def test_hedged_fetch_uses_first_valid_answer(fake_exchanges):
+    """Tests that a slow primary is hedged by the next exchange and then cancelled."""
+    started = asyncio.get_running_loop().time()
+    df = await fetch_ohlcv_data("BTC", "1h", since=datetime(2023, 1, 1), hedge_delay=0.05)
+
+    assert len(df) == 1
+    assert asyncio.get_running_loop().time() - started < 0.4
+    assert fake_exchanges["bybit"].cancelled
+
+@pytest.mark.asyncio
+async def test_latency_stats_reorder_exchanges(fake_exchanges):
+    """Tests that a hedge loser is measured and drops behind the winner."""
+    from src.data_fetch import data_source
+    await fetch_ohlcv_data("BTC", "1h", since=datetime(2023, 1, 1), hedge_delay=0.05)
+
+    assert data_source.latency_stats.ordered(["bybit", "binance"]) == ["binance", "bybit"]
+
+def test_latency_stats_penalise_failures():
+    """Tests that failures push an exchange to the back of the order."""
+    stats = ExchangeLatencyStats(failure_penalty=5.0)
+    stats.record("bybit", 0.1, ok=False)
+    stats.record("binance", 0.3)
+
+    assert stats.ordered(["bybit", "binance", "okx"]) == ["binance", "okx", "bybit"]
@@ -0,0 +1,91 @@
+# tests/test_event_bus.py
+import asyncio
+import pytest
+from src.shared.event_bus import (
+    EventBus, CandleClosed, FeatureUpdated, OrderFilled, PredictionMade, connect, decode, encode, serve
+)
+
+CANDLE = CandleClosed("BTC", "1h", 1704067200000, 42000.0, 42100.0, 41900.0, 42050.0, 12.5)
+
+def test_events_round_trip_as_json_lines():
+    """Tests that every event type survives encoding for the socket bridge."""
+    events = [CANDLE, FeatureUpdated("BTC", {"spread": 0.5}), PredictionMade("ETH", "1h", "buy", 81.0),
+              OrderFilled("BTC/USDT", "sell", 42000.0, 0.01, "abc")]
+    for event in events:
+        line = encode(event)
+        assert line.endswith(b"\n") and decode(line) == event
+
+@pytest.mark.asyncio
+async def test_subscriptions_filter_and_drop_oldest():
+    """Tests type/predicate filtering and that a full subscriber loses its oldest events."""
+    bus = EventBus()
+    hourly = bus.subscribe(CandleClosed, where=lambda e: e.timeframe == "1h")
+    everything = bus.subscribe(maxsize=2)
+
+    assert bus.publish(CANDLE) == 2
+    assert bus.publish(PredictionMade("BTC", "1h", "hold")) == 1
+    assert bus.publish(OrderFilled("BTC/USDT", "buy", 1.0, 1.0)) == 1
+
+    assert await hourly.get(timeout=1) == CANDLE
+    assert [type(e) for e in everything.drain()] == [PredictionMade, OrderFilled]
+    assert everything.dropped == 1
+
+    hourly.close()
+    assert bus.publish(CANDLE) == 1
+
+@pytest.mark.asyncio
+async def test_broker_relays_between_processes(tmp_path):
+    """Tests that events published on one linked bus reach the others, without echoing back."""
+    path = str(tmp_path / "bus.sock")
+    server = await serve(EventBus(), path)
+    producer, consumer = EventBus(), EventBus()
+    links = [asyncio.create_task(connect(bus, path)) for bus in (producer, consumer)]
+    own = producer.subscribe()
+    received = consumer.subscribe(CandleClosed)
+    try:
+        for _ in range(100):  # wait until both links are up
+            producer.publish(CANDLE)
+            try:
+                assert await received.get(timeout=0.05) == CANDLE
+                break
+            except asyncio.TimeoutError:
+                continue
+        else:
+            pytest.fail("event never crossed the broker")
+
+        own.drain()
+        consumer.publish(PredictionMade("BTC", "1h", "buy"))
+        await asyncio.sleep(0.1)
+        assert [type(e) for e in own.drain()] == [PredictionMade]
+    finally:
+        for link in links:
+            link.cancel()
+        server.close()
+        await server.wait_closed()
+
+@pytest.mark.asyncio
+async def test_link_survives_an_oversized_line(tmp_path, monkeypatch):
+    """Tests that connect() relinks after a read error instead of ending the link task."""
+    monkeypatch.setattr("src.shared.event_bus.MAX_LINE_BYTES", 512)
+    connections = []
+
+    async def broker(reader, writer):
+        connections.append(writer)
+        if len(connections) == 1:
+            writer.write(b"x" * 4096 + b"\n")  # longer than the reader's limit
+        else:
+            writer.write(encode(CANDLE))
+        await writer.drain()
+
+    path = str(tmp_path / "bus.sock")
+    server = await asyncio.start_unix_server(broker, path)
+    bus = EventBus()
+    received = bus.subscribe(CandleClosed)
+    link = asyncio.create_task(connect(bus, path, reconnect_seconds=0.01))
+    try:
+        assert await received.get(timeout=2) == CANDLE
+        assert len(connections) == 2 and not link.done()
+    finally:
+        link.cancel()
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,50 @@
+# tests/test_exchange_pool.py
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from src.data_fetch.exchange_pool import ExchangePool
+
+@pytest.fixture
+def mock_bybit():
+    """Patches the ccxt.pro bybit class with a factory of async mock clients."""
+    with patch('src.data_fetch.exchange_pool.ccxt_pro') as mock_ccxt_pro:
+        mock_ccxt_pro.bybit = MagicMock(side_effect=lambda config: AsyncMock())
+        yield mock_ccxt_pro.bybit
+
+@pytest.mark.asyncio
+async def test_pool_reuses_client_for_same_config(mock_bybit):
+    """Tests that repeated lookups share one client and load markets only once."""
+    pool = ExchangePool()
+    first = await pool.get("bybit", {"enableRateLimit": True})
+    second = await pool.get("bybit", {"enableRateLimit": True})
+
+    assert first is second
+    assert mock_bybit.call_count == 1
+    first.load_markets.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_pool_keys_on_config(mock_bybit):
+    """Tests that different configs get separate clients."""
+    pool = ExchangePool()
+    spot = await pool.get("bybit", {"options": {"defaultType": "spot"}})
+    swap = await pool.get("bybit", {"options": {"defaultType": "swap"}})
+
+    assert spot is not swap
+
+@pytest.mark.asyncio
+async def test_close_all_closes_and_forgets_clients(mock_bybit):
+    """Tests that close_all closes every client and the next get opens a new one."""
+    pool = ExchangePool()
+    client = await pool.get("bybit")
+    await pool.close_all()
+
+    client.close.assert_awaited_once()
+    assert await pool.get("bybit") is not client
+
+def test_client_from_previous_loop_is_replaced(mock_bybit):
+    """Tests that a client bound to a finished event loop is not reused."""
+    pool = ExchangePool()
+    first = asyncio.run(pool.get("bybit"))
+    second = asyncio.run(pool.get("bybit"))
+
+    assert first is not second
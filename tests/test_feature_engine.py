@@ -0,0 +1,90 @@
+# tests/test_feature_engine.py
+import math
+import random
+import pytest
+from src.data_fetch.feature_engine import FEATURES, Feature, FeatureEngine, register_feature
+from src.shared.feature_store import FeatureStore
+
+BOOK = {"bids": [[99.0, 3.0], [98.0, 1.0]], "asks": [[101.0, 1.0], [102.0, 2.0]]}
+
+def trade(ts, price, amount=1.0, side="buy"):
+    return {"timestamp": ts, "side": side, "price": price, "amount": amount}
+
+def test_top_of_book_features():
+    """Tests spread and microprice from the best levels of a book update."""
+    engine = FeatureEngine(["spread", "microprice"])
+    assert engine.on_book(BOOK)
+
+    values = engine.values()
+    assert values["spread"] == 2.0
+    assert values["spread_bps"] == pytest.approx(2.0 / 100.0 * 1e4)
+    assert values["microprice"] == pytest.approx((99.0 * 1.0 + 101.0 * 3.0) / 4.0)
+    assert values["microprice_offset_bps"] > 0  # heavier bid pushes the microprice up
+
+    assert not engine.on_book({"bids": [], "asks": [[101.0, 1.0]]})
+
+def test_trade_features_match_brute_force():
+    """Tests rolling VWAP, realized volatility and intensity against full recomputes."""
+    rng = random.Random(7)
+    engine = FeatureEngine([("vwap", {"windows": (60,)}), ("realized_volatility", {"windows": (60,)}),
+                            ("trade_intensity", {"windows": (10,)})])
+    trades, now, price = [], 0, 100.0
+    for _ in range(3000):
+        now += rng.choice([0, 10, 500, 5000])
+        price *= math.exp(rng.gauss(0, 0.001))
+        trades.append(trade(now, price, rng.uniform(0.1, 2.0)))
+    for i in range(0, len(trades), 7):
+        engine.on_trades(trades[i:i + 7])
+
+    recent = [t for t in trades if t["timestamp"] > now - 60_000]
+    vwap = sum(t["price"] * t["amount"] for t in recent) / sum(t["amount"] for t in recent)
+    returns = [math.log(b["price"] / a["price"]) for a, b in zip(trades, trades[1:]) if b["timestamp"] > now - 60_000]
+    values = engine.values()
+    assert values["vwap_60s"] == pytest.approx(vwap)
+    assert values["vwap_deviation_bps_60s"] == pytest.approx((price - vwap) / vwap * 1e4)
+    assert values["realized_volatility_60s"] == pytest.approx(math.sqrt(sum(r * r for r in returns)))
+    assert values["trade_intensity_10s"] == sum(t["timestamp"] > now - 10_000 for t in trades) / 10
+
+def test_engine_publishes_each_event_kind(tmp_path):
+    """Tests that book and trade events publish only their own features to the store."""
+    engine = FeatureEngine([("order_book_imbalance", {"bands": (1, 2)}), "spread", ("taker_flow", {"windows": (60,)})])
+    store = FeatureStore.create(str(tmp_path / "features.bin"), ["BTC"], engine.names)
+
+    engine.on_book(BOOK)
+    engine.publish(store, "BTC", "book")
+    assert set(store.read("BTC")) == {"order_book_imbalance", "order_book_imbalance_1", "order_book_imbalance_2",
+                                      "spread", "spread_bps"}
+
+    engine.on_trades([trade(1_000, 100.0, side="buy"), trade(2_000, 100.0, 0.5, side="sell")])
+    engine.publish(store, "BTC", "trades")
+    assert store.read("BTC")["taker_buy_sell_ratio"] == pytest.approx(2.0)
+    store.close()
+
+def test_registry_rejects_unknown_and_duplicates():
+    """Tests registering a custom feature and the errors for bad specs."""
+    @register_feature("test_last_price")
+    class LastPrice(Feature):
+        names = ("last_price",)
+        price = math.nan
+
+        def on_trade(self, timestamp_ms, side, price, amount, cost):
+            self.price = price
+
+        def values(self):
+            return {"last_price": self.price}
+
+    try:
+        engine = FeatureEngine(["test_last_price", "spread"])
+        engine.on_book(BOOK)
+        assert set(engine.values("book")) == {"spread", "spread_bps"}
+        engine.on_trades([trade(0, 42.0)])
+        assert engine.values("trades") == {"last_price": 42.0}
+
+        with pytest.raises(ValueError):
+            register_feature("test_last_price")(LastPrice)
+        with pytest.raises(ValueError):
+            FeatureEngine(["no_such_feature"])
+        with pytest.raises(ValueError):
+            FeatureEngine(["spread", "spread"])
+    finally:
+        FEATURES.pop("test_last_price", None)
@@ -0,0 +1,67 @@
+# tests/test_feature_store.py
+import math
+import multiprocessing
+import pytest
+from src.shared import feature_store as feature_store_module
+from src.shared.feature_store import FeatureStore
+
+FEATURES = ["imbalance", "taker_ratio", "spread"]
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "features.bin")
+
+def _write_from_other_process(path):
+    store = FeatureStore(path, writable=True)
+    for i in range(1000):
+        store.write("ETH", {"imbalance": float(i), "taker_ratio": float(-i)})
+    store.close()
+
+def test_reader_sees_partial_updates(path):
+    """Tests that readers get written features and omit features never set."""
+    writer = FeatureStore.create(path, ["BTC", "ETH"], FEATURES)
+    writer.write("BTC", {"imbalance": 0.25})
+    writer.write("BTC", {"taker_ratio": 1.5})
+
+    reader = FeatureStore(path)
+    assert reader.read("BTC") == {"imbalance": 0.25, "taker_ratio": 1.5}
+    assert reader.read("ETH") == {}
+    assert reader.age_seconds("BTC") >= 0
+    assert reader.age_seconds("ETH") is None
+
+def test_updates_from_another_process_are_consistent(path):
+    """Tests that a reader never observes a half-written slot from a writer process."""
+    FeatureStore.create(path, ["ETH"], FEATURES).close()
+    reader = FeatureStore(path)
+
+    process = multiprocessing.get_context("spawn").Process(target=_write_from_other_process, args=(path,))
+    process.start()
+    while process.is_alive():
+        values = reader.read("ETH")
+        if values:
+            assert values["imbalance"] == -values["taker_ratio"]
+    process.join()
+    assert reader.read("ETH") == {"imbalance": 999.0, "taker_ratio": -999.0}
+
+def test_same_layout_keeps_values_and_new_layout_remaps_readers(path):
+    """Tests that a writer restart keeps values, while a layout change remaps readers."""
+    FeatureStore.create(path, ["BTC"], FEATURES).write("BTC", {"spread": 0.5})
+    reader = FeatureStore(path)
+    assert FeatureStore.create(path, ["BTC"], FEATURES).read("BTC") == {"spread": 0.5}
+
+    FeatureStore.create(path, ["BTC", "SOL"], FEATURES + ["vwap"]).write("SOL", {"vwap": 42.0})
+    assert reader.read("SOL") == {"vwap": 42.0}
+    assert reader.features[-1] == "vwap"
+
+def test_locked_slot_times_out(path, monkeypatch):
+    """Tests that a slot left mid-write by a dead writer is reported, not read torn."""
+    writer = FeatureStore.create(path, ["BTC"], FEATURES)
+    writer._seq[0] += 1  # simulate a writer that died between the two increments
+    monkeypatch.setattr(feature_store_module, "MAX_READ_RETRIES", 5)
+
+    with pytest.raises(TimeoutError):
+        FeatureStore(path).read("BTC")
+
+    restarted = FeatureStore.create(path, ["BTC"], FEATURES)
+    assert restarted.read("BTC") == {}
+    assert math.isnan(restarted._values[0, 0])
@@ -0,0 +1,81 @@
+# tests/test_fetch_scheduler.py
+import time
+import asyncio
+import pytest
+from types import SimpleNamespace
+from src.data_fetch.fetch_scheduler import FetchScheduler
+from src.data_fetch.rate_limit import RATE_LIMIT_HEADROOM, TokenBucket, get_budget
+
+@pytest.mark.asyncio
+async def test_short_timeframes_run_first():
+    """Tests that jobs are started in ascending timeframe order."""
+    started = []
+
+    def job(symbol, timeframe):
+        async def run():
+            started.append(f"{symbol}-{timeframe}")
+            return 1
+        return run
+
+    scheduler = FetchScheduler(max_concurrency=1)
+    for symbol, tf in [("BTC", "1d"), ("BTC", "1h"), ("ETH", "1m"), ("BTC", "5m")]:
+        scheduler.submit(symbol, tf, job(symbol, tf))
+    results = await scheduler.run()
+
+    assert started == ["ETH-1m", "BTC-5m", "BTC-1h", "BTC-1d"]
+    assert sum(r.candles for r in results) == 4
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_is_respected():
+    """Tests that no more than max_concurrency jobs are in flight at once."""
+    in_flight, peak = 0, 0
+
+    async def job():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return 0
+
+    scheduler = FetchScheduler(max_concurrency=3)
+    for i in range(10):
+        scheduler.submit("BTC", "1m", job)
+    await scheduler.run()
+
+    assert peak == 3
+
+@pytest.mark.asyncio
+async def test_failed_job_is_reported_not_raised():
+    """Tests that a failing job is recorded with its error and others still run."""
+    async def broken():
+        raise RuntimeError("rate limited")
+
+    async def ok():
+        return 5
+
+    scheduler = FetchScheduler(max_concurrency=2)
+    scheduler.submit("BTC", "1m", broken)
+    scheduler.submit("ETH", "1m", ok)
+    results = {r.symbol: r for r in await scheduler.run()}
+
+    assert isinstance(results["BTC"].error, RuntimeError)
+    assert results["ETH"].candles == 5
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_requests():
+    """Tests that a bucket spaces out acquisitions beyond its burst capacity."""
+    bucket = TokenBucket(rate=100.0, capacity=1)
+    started = time.monotonic()
+    await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+
+    # The first token is free; five more take ~50ms at 100/s.
+    assert time.monotonic() - started >= 0.045
+
+def test_budget_is_shared_per_exchange_id():
+    """Tests that clients of the same exchange share one budget derived from rateLimit, less the headroom."""
+    first = get_budget(SimpleNamespace(id="test-ex", rateLimit=50))
+    second = get_budget(SimpleNamespace(id="test-ex", rateLimit=10))
+
+    assert first is second
+    assert first.rate == pytest.approx(20.0 * RATE_LIMIT_HEADROOM)
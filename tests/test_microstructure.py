@@ -0,0 +1,147 @@
+# tests/test_microstructure.py
+import random
+import pytest
+from ccxt.async_support.base.ws.order_book import OrderBook
+import src.data_fetch.microstructure as microstructure
+from src.data_fetch.microstructure import OrderBookImbalance, RollingTakerFlow, TradeCandles
+
+def brute_force(bids, asks, band):
+    """Reference imbalance computed from sorted levels."""
+    bid = sum(p * s for p, s in sorted(bids, reverse=True)[:band])
+    ask = sum(p * s for p, s in sorted(asks)[:band])
+    return (bid - ask) / (bid + ask) if bid + ask else 0.0
+
+def random_deltas(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        side = rng.choice(["bids", "asks"])
+        offset = rng.randint(1, 80) * 0.5
+        price = 100.0 - offset if side == "bids" else 100.0 + offset
+        yield side, price, 0.0 if rng.random() < 0.3 else round(rng.uniform(0.1, 3.0), 3)
+
+def test_deltas_match_full_recompute():
+    """Tests that incrementally maintained bands equal a full re-sum after many deltas."""
+    book = OrderBookImbalance((5, 10, 50))
+    levels = {"bids": {}, "asks": {}}
+    for side, price, size in random_deltas(3000):
+        book.apply_delta(side, price, size)
+        if size:
+            levels[side][price] = size
+        else:
+            levels[side].pop(price, None)
+
+    for band in (5, 10, 50):
+        expected = brute_force(levels["bids"].items(), levels["asks"].items(), band)
+        assert book.imbalance(band) == pytest.approx(expected, abs=1e-9)
+
+def test_snapshot_bands_in_one_pass():
+    """Tests snapshot bands, including books shallower than the widest band."""
+    bids = [[99.0, 1.0], [98.0, 2.0], [97.0, 1.0]]
+    asks = [[101.0, 1.0], [102.0, 1.0]]
+    book = OrderBookImbalance((2, 50))
+    book.apply_snapshot(bids, asks)
+
+    assert book.notional(2) == (99.0 + 196.0, 101.0 + 102.0)
+    assert book.notional(50) == (99.0 + 196.0 + 97.0, 101.0 + 102.0)
+    assert book.imbalance(50) == pytest.approx(brute_force(bids, asks, 50))
+
+def test_track_mirrors_ccxt_order_book():
+    """Tests that a tracked ccxt.pro book stays in sync through deltas, resets and trimming."""
+    orderbook = OrderBook({"bids": [[99.5, 1.0], [99.0, 2.0]], "asks": [[100.5, 1.0]]}, depth=20)
+    book = OrderBookImbalance((5, 20))
+    assert book.track(orderbook)
+
+    for side, price, size in random_deltas(2000, seed=1):
+        orderbook[side].storeArray([price, size])
+        if random.Random(price).random() < 0.05:
+            orderbook.limit()
+        for band in (5, 20):
+            assert book.imbalance(band) == pytest.approx(brute_force(orderbook["bids"], orderbook["asks"], band), abs=1e-9)
+
+    orderbook.reset({"bids": [[90.0, 1.0]], "asks": [[110.0, 3.0]]})
+    assert book.imbalance(5) == pytest.approx(brute_force([[90.0, 1.0]], [[110.0, 3.0]], 5))
+
+def test_plain_books_are_not_tracked():
+    """Tests that plain list snapshots are refused and untrack restores ccxt methods."""
+    book = OrderBookImbalance()
+    assert not book.track({"bids": [[1.0, 1.0]], "asks": [[2.0, 1.0]]})
+
+    orderbook = OrderBook({"bids": [[99.0, 1.0]], "asks": [[101.0, 1.0]]})
+    book.track(orderbook)
+    book.untrack()
+    assert "storeArray" not in orderbook["bids"].__dict__
+
+def test_books_are_not_tracked_without_known_ccxt_internals(monkeypatch):
+    """Tests that a ccxt whose book sides fail the import-time probe falls back to snapshots."""
+    assert microstructure._CcxtOrderBookSide is not None  # the pinned ccxt passes the probe
+    monkeypatch.setattr(microstructure, "_CcxtOrderBookSide", None)
+    orderbook = OrderBook({"bids": [[99.0, 1.0]], "asks": [[101.0, 1.0]]})
+    book = OrderBookImbalance()
+
+    assert not book.track(orderbook)
+    assert "storeArray" not in orderbook["bids"].__dict__
+
+def test_taker_flow_windows_use_exchange_time():
+    """Tests that each window only counts trades within its span of exchange time."""
+    flow = RollingTakerFlow((10, 60))
+    flow.append(0, "buy", 100.0)
+    flow.append(30_000, "sell", 50.0)
+    flow.append(55_000, "buy", 20.0)
+
+    assert flow.volumes(60) == (120.0, 50.0)
+    assert flow.volumes(10) == (20.0, 0.0)
+    assert flow.ratio(10) == 20.0
+
+    flow.append(70_000, "sell", 10.0)
+    assert flow.volumes(60) == (20.0, 60.0)
+    assert flow.count(10) == 1
+
+def test_taker_flow_matches_brute_force_while_growing():
+    """Tests running sums against a full re-sum through ring growth and bursts."""
+    rng = random.Random(3)
+    flow = RollingTakerFlow((10, 60, 300), capacity=8)
+    trades, now = [], 0
+    for _ in range(5000):
+        now += rng.choice([0, 1, 5, 50, 2000])
+        trade = {"timestamp": now, "side": rng.choice(["buy", "sell"]), "price": 10.0, "amount": rng.uniform(0.1, 2.0)}
+        trades.append(trade)
+        flow.update([trade])
+
+    for seconds in (10, 60, 300):
+        recent = [t for t in trades if t["timestamp"] > now - seconds * 1000]
+        buy = sum(t["price"] * t["amount"] for t in recent if t["side"] == "buy")
+        sell = sum(t["price"] * t["amount"] for t in recent if t["side"] == "sell")
+        assert flow.volumes(seconds) == pytest.approx((buy, sell))
+
+def test_taker_flow_advance_empties_quiet_windows():
+    """Tests that advancing time without trades evicts everything and resets the sums."""
+    flow = RollingTakerFlow((10,))
+    flow.update([{"timestamp": 1_000, "side": "buy", "cost": 5.0}])
+    flow.advance(20_000)
+
+    assert flow.volumes(10) == (0.0, 0.0)
+    assert flow.ratio(10) == 0.0
+
+def test_trade_candles_close_on_later_buckets():
+    """Tests base and folded candles: OHLCV, emission on the next bucket and late trades."""
+    candles = TradeCandles(("1m", "5m"))
+    assert candles.add(0, 10.0, 1.0) == []
+    candles.add(30_000, 12.0, 1.0)
+    candles.add(45_000, 9.0, 2.0)
+    candles.add(90_000, 11.0, 1.0)  # closes the first minute
+    candles.add(50_000, 99.0, 1.0)  # late trade for a closed minute: ignored
+
+    closed = candles.add(300_000, 13.0, 1.0)
+    assert closed == [("1m", [60_000, 11.0, 11.0, 11.0, 11.0, 1.0]), ("5m", [0, 10.0, 12.0, 9.0, 11.0, 5.0])]
+
+def test_trade_candles_skip_partial_candles():
+    """Tests that candles opened before the first trade seen (at startup or after a reset) are not emitted."""
+    candles = TradeCandles(("1m", "5m"))
+    candles.add(30_000, 10.0, 1.0)  # joined mid-minute
+    assert candles.add(60_000, 11.0, 1.0) == []
+    assert candles.add(300_000, 12.0, 1.0) == [("1m", [60_000, 11.0, 11.0, 11.0, 11.0, 1.0])]
+
+    candles.reset()  # e.g. after a stream error
+    candles.add(330_000, 13.0, 1.0)
+    assert candles.add(360_000, 14.0, 1.0) == []
+    assert candles.add(420_000, 15.0, 1.0) == [("1m", [360_000, 14.0, 14.0, 14.0, 14.0, 1.0])]
@@ -1,5 +1,7 @@
 # tests/test_pipeline.py
 import os
+import asyncio
+import tempfile
 import unittest
 from unittest.mock import patch
 import pandas as pd
@@ -8,6 +10,7 @@ import pandas as pd
 from src.data_fetch.fetch_futures_data import main as fetch_data_main 
 from src.telegram.send_alert import send_test_alert
 from src.shared.constants import SYMBOLS
+from src.data_fetch.candle_store import CandleStore
 
 class TestBotPipeline(unittest.TestCase):
     @patch('src.telegram.send_alert.requests.post')
@@ -17,26 +20,28 @@ class TestBotPipeline(unittest.TestCase):
         send_test_alert()
         self.assertTrue(mock_post.called)
         
-    @patch('src.data_fetch.data_source.fetch_ohlcv_data')
-    @patch('pandas.DataFrame.to_csv') # Mock the file writing
-    def test_data_fetch_pipeline(self, mock_to_csv, mock_fetch_ohlcv):
-        """Test the data fetching pipeline calls the CSV writing function correctly."""
-        # Arrange: Mock the data fetching call to return some dummy data
-        mock_fetch_ohlcv.return_value = pd.DataFrame({
-            'timestamp': [1672531200000], 'open': [60000], 'high': [61000], 
-            'low': [59000], 'close': [60500], 'volume': [100]
-        })
-        
-        # Act: Run the main data fetching process
-        fetch_data_main()
-        
-        # Assert: Verify that to_csv was called for the expected files
-        self.assertGreater(mock_to_csv.call_count, 0)
-        
-        # Check if one of the calls was for a specific, expected file path
-        first_call_path = mock_to_csv.call_args_list[0].args[0]
-        self.assertIn("/workspace/data/history/", first_call_path) # CORRECTED PATH
-        self.assertIn("BTCUSDT_1m.csv", first_call_path)
+    @patch('src.data_fetch.fetch_futures_data.exchange_pool.close_all')
+    @patch('src.data_fetch.fetch_futures_data.fetch_ohlcv_pages')
+    def test_data_fetch_pipeline(self, mock_fetch_pages, mock_close_all):
+        """Test the data fetching pipeline stores fetched candles in the candle store."""
+        # Arrange: Mock the paged fetch to yield one page of dummy data
+        async def one_page(symbol, timeframe, since, until=None):
+            yield pd.DataFrame({
+                'timestamp': pd.to_datetime([1672531200000], unit='ms'), 'open': [60000], 'high': [61000],
+                'low': [59000], 'close': [60500], 'volume': [100]
+            })
+        mock_fetch_pages.side_effect = one_page
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = CandleStore(tmp_dir)
+            with patch('src.data_fetch.fetch_futures_data.candle_store', store):
+                # Act: Run the main data fetching process
+                asyncio.run(fetch_data_main())
+
+            # Assert: Verify that candles were stored for the expected pair
+            self.assertGreater(mock_fetch_pages.call_count, 0)
+            self.assertEqual(len(store.read("BTC", "1m")), 1)
+            self.assertTrue(mock_close_all.called)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,87 @@
+# tests/test_realtime_manager.py
+import os
+import time
+import asyncio
+import multiprocessing
+import pytest
+from src.data_fetch import realtime_manager
+from src.data_fetch.feature_engine import FeatureEngine
+from src.data_fetch.replay_exchange import ReplayExchange
+from src.data_fetch.tick_recorder import BookUpdate, TickReader, TickRecorder, Trade
+from src.shared.feature_store import FeatureStore
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "replay")
+
+def test_shard_symbols_round_robin():
+    """Tests that symbols are split into non-empty groups, never more than symbols."""
+    symbols = ["BTC", "ETH", "SOL", "DOGE", "XRP"]
+    assert realtime_manager.shard_symbols(symbols, 2) == [["BTC", "SOL", "XRP"], ["ETH", "DOGE"]]
+    assert realtime_manager.shard_symbols(symbols[:2], 4) == [["BTC"], ["ETH"]]
+
+def test_shard_worker_writes_shared_store(tmp_path, monkeypatch):
+    """Tests that a spawned shard streams replayed data into its slots of the shared store."""
+    monkeypatch.setenv("EXCHANGE_REPLAY_DIR", FIXTURES_DIR)
+    path = str(tmp_path / "features.bin")
+    store = FeatureStore.create(path, ["BTC", "ETH"], realtime_manager.REALTIME_FEATURES)
+
+    worker = multiprocessing.get_context("spawn").Process(target=realtime_manager.run_shard, args=(0, ["BTC"], path))
+    worker.start()
+    try:
+        deadline = time.time() + 60
+        while not {"microprice", "vwap_60s", "book_message_age_ms"} <= set(store.read("BTC")):
+            assert time.time() < deadline and worker.is_alive()
+            time.sleep(0.1)
+    finally:
+        worker.terminate()
+        worker.join()
+    assert store.read("ETH") == {}
+    store.close()
+
+def test_message_lag_reports_and_resets():
+    """Tests per-stream message age aggregation between reports, ignoring unstamped messages."""
+    lag = realtime_manager.MessageLag()
+    lag.record("book", 10.0)
+    lag.record("book", 30.0)
+    lag.record("trades", float("nan"))
+
+    assert lag.report() == {"book": (2, 20.0, 30.0)}
+    assert lag.report() == {}
+
+@pytest.mark.asyncio
+async def test_loops_record_replayed_ticks(tmp_path):
+    """Tests that the realtime loops hand every book update and trade to the tick recorder."""
+    replay = ReplayExchange.from_directory(FIXTURES_DIR)
+    store = FeatureStore.create(str(tmp_path / "features.bin"), ["BTC"], realtime_manager.REALTIME_FEATURES)
+    engine = FeatureEngine(realtime_manager.FEATURE_SPECS)
+    recorder = TickRecorder(str(tmp_path / "ticks")).start()
+
+    loops = asyncio.gather(realtime_manager.order_book_loop(replay, "BTC", engine, store, recorder=recorder),
+                           realtime_manager.trades_loop(replay, "BTC", engine, store, recorder=recorder))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(loops, timeout=0.05)
+    recorder.close()
+
+    records = list(TickReader(str(tmp_path / "ticks")).iter_range("BTC"))
+    calls = replay.calls["watch_trades"]  # the last call may have been cancelled mid-way
+    assert 2 * (calls - 1) <= sum(isinstance(r, Trade) for r in records) <= 2 * calls
+    assert sum(isinstance(r, BookUpdate) for r in records) > 1
+    store.close()
+
+@pytest.mark.asyncio
+async def test_trade_clock_empties_windows_in_a_quiet_market(tmp_path):
+    """Tests that trade features decay without new trades, keyed on the exchange clock of the last trade."""
+    store = FeatureStore.create(str(tmp_path / "features.bin"), ["BTC"], realtime_manager.REALTIME_FEATURES)
+    engine = FeatureEngine(realtime_manager.FEATURE_SPECS)
+    engine.on_trades([{"timestamp": 1_000, "side": "buy", "price": 100.0, "amount": 1.0}])
+    engine.publish(store, "BTC", "trades")
+    assert store.read("BTC")["trade_intensity_10s"] == 0.1
+
+    engine._last_trade_at -= 30  # thirty quiet seconds since that trade arrived
+    clock = asyncio.ensure_future(realtime_manager.trade_clock_loop("BTC", engine, store, interval=0.01))
+    await asyncio.sleep(0.05)
+    clock.cancel()
+
+    values = store.read("BTC")
+    assert values["trade_intensity_10s"] == 0
+    assert values["trade_intensity_60s"] == pytest.approx(1 / 60) and values["vwap_60s"] == 100.0
+    store.close()
@@ -0,0 +1,101 @@
+# tests/test_replay_exchange.py
+import os
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from ccxt.base.errors import NetworkError, RateLimitExceeded
+from src.data_fetch import realtime_manager
+from src.data_fetch.data_source import fetch_ohlcv_data
+from src.data_fetch.exchange_pool import ExchangePool
+from src.data_fetch.feature_engine import FeatureEngine
+from src.data_fetch.replay_exchange import ReplayExchange
+from src.shared.feature_store import FeatureStore
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "replay")
+START_MS = 1704067200000  # first fixture candle, 2024-01-01 00:00 UTC
+
+@pytest.fixture
+def replay():
+    return ReplayExchange.from_directory(FIXTURES_DIR)
+
+@pytest.mark.asyncio
+async def test_fetch_ohlcv_honours_since_and_limit(replay):
+    """Tests that recorded candles are served from `since` onwards, up to `limit`."""
+    candles = await replay.fetch_ohlcv("BTC/USDT", "1m", since=START_MS + 5 * 60000, limit=3)
+
+    assert [c[0] for c in candles] == [START_MS + i * 60000 for i in (5, 6, 7)]
+
+@pytest.mark.asyncio
+async def test_missing_timeframes_are_resampled_from_1m(replay):
+    """Tests that a timeframe without its own fixture is derived from the 1m candles."""
+    one_minute = await replay.fetch_ohlcv("BTCUSDT", "1m")
+    ten_minute = await replay.fetch_ohlcv("BTCUSDT", "10m")
+
+    assert len(ten_minute) == 3
+    assert ten_minute[0][5] == pytest.approx(sum(c[5] for c in one_minute[:10]))
+
+@pytest.mark.asyncio
+async def test_rate_limit_and_scripted_errors():
+    """Tests that the request budget and scripted failures raise ccxt errors."""
+    limited = ReplayExchange.from_directory(FIXTURES_DIR, rate_limit=2)
+    await limited.fetch_ohlcv("BTCUSDT", "1m")
+    await limited.fetch_ohlcv("BTCUSDT", "1m")
+    with pytest.raises(RateLimitExceeded):
+        await limited.fetch_ohlcv("BTCUSDT", "1m")
+
+    flaky = ReplayExchange.from_directory(FIXTURES_DIR, scripted_errors=[NetworkError("down")])
+    with pytest.raises(NetworkError):
+        await flaky.fetch_ohlcv("BTCUSDT", "1m")
+    assert await flaky.fetch_ohlcv("BTCUSDT", "1m")
+
+@pytest.mark.asyncio
+async def test_streams_loop_with_advancing_timestamps(replay):
+    """Tests that order-book replay restarts after the recording with later timestamps."""
+    books = [await replay.watch_order_book("BTCUSDT", 2) for _ in range(4)]
+
+    timestamps = [book["timestamp"] for book in books]
+    assert timestamps == sorted(timestamps) and len(set(timestamps)) == 4
+    assert len(books[0]["bids"]) == 2
+
+    trades = await replay.watch_trades("BTCUSDT")
+    trades[0]["price"] = -1
+    assert (await replay.watch_trades("BTCUSDT"))[0]["price"] > 0
+
+@pytest.mark.asyncio
+async def test_create_order_fills_at_last_price(replay):
+    """Tests that market orders fill immediately at the last replayed trade price."""
+    order = await replay.create_order("BTC/USDT", "market", "buy", 0.1)
+    assert order["status"] == "closed"
+    assert order["price"] == 42002.5  # nothing streamed yet: end of the recording
+
+    await replay.watch_trades("BTCUSDT")
+    order = await replay.create_order("BTC/USDT", "market", "sell", 0.1)
+    assert order["price"] == 42000.5
+    assert len(replay.orders) == 2
+
+@pytest.mark.asyncio
+async def test_fetch_ohlcv_data_falls_back_through_replay():
+    """Tests the real fallback path: a failing exchange is skipped for the next one."""
+    def factory(exchange_id, exchange_config):
+        return ReplayExchange.from_directory(FIXTURES_DIR, exchange_id, error_rate=1.0 if exchange_id == "bybit" else 0.0)
+
+    pool = ExchangePool(factory=factory)
+    with patch("src.data_fetch.data_source.exchange_pool", pool), \
+         patch("src.data_fetch.data_source.EXCHANGES", ["bybit", "binance"]):
+        df = await fetch_ohlcv_data("BTC", "1m", since=datetime(2024, 1, 1), limit=10)
+        await pool.close_all()
+
+    assert len(df) == 10
+
+@pytest.mark.asyncio
+async def test_realtime_order_book_loop_runs_on_replay(replay, tmp_path):
+    """Tests that the realtime order book loop publishes book features from replayed books."""
+    store = FeatureStore.create(str(tmp_path / "features.bin"), ["BTC"], realtime_manager.REALTIME_FEATURES)
+    engine = FeatureEngine(realtime_manager.FEATURE_SPECS)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(realtime_manager.order_book_loop(replay, "BTC", engine, store), timeout=0.05)
+
+    features = store.read("BTC")
+    assert "order_book_imbalance" in features and "microprice" in features
+    assert replay.calls["watch_order_book"] > 1
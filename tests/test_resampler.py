@@ -0,0 +1,81 @@
+# tests/test_resampler.py
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_fetch.candle_store import CandleStore
+from src.data_fetch.resampler import resample_ohlcv, derive_timeframes, IncrementalResampler
+
+def make_1m(start: str, periods: int) -> pd.DataFrame:
+    """Builds 1m candles whose values encode their minute index."""
+    idx = np.arange(periods, dtype=float)
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=periods, freq="1min"),
+        "open": idx, "high": idx + 0.5, "low": idx - 0.5, "close": idx + 0.25, "volume": 1.0,
+    })
+
+def test_resample_matches_pandas_resample():
+    """Tests that the vectorized resampler agrees with DataFrame.resample."""
+    df = make_1m("2024-01-01 00:03", 95)
+    expected = df.set_index("timestamp").resample("10min").agg({
+        "open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"
+    }).dropna().reset_index()
+
+    result = resample_ohlcv(df, "10m")
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+
+def test_weekly_buckets_open_on_monday():
+    """Tests that weekly candles are aligned to Monday 00:00 UTC."""
+    df = make_1m("2024-01-03", 3)  # a Wednesday
+    assert resample_ohlcv(df, "1w")["timestamp"].iloc[0] == pd.Timestamp("2024-01-01")
+
+def test_derive_timeframes_only_appends_new_tail(tmp_path):
+    """Tests that derivation resumes at the last derived candle and replaces it."""
+    store = CandleStore(str(tmp_path))
+    store.append("BTC", "1m", make_1m("2024-01-01 00:00", 25))
+    derive_timeframes(store, "BTC", ["10m"])
+    assert store.read("BTC", "10m")["volume"].tolist() == [10.0, 10.0, 5.0]
+
+    store.append("BTC", "1m", make_1m("2024-01-01 00:25", 10))
+    derive_timeframes(store, "BTC", ["10m"])
+
+    derived = store.read("BTC", "10m")
+    assert derived["volume"].tolist() == [10.0, 10.0, 10.0, 5.0]
+    assert derived["close"].iloc[2] == 4.25  # minute 29 is index 4 of the second batch
+
+def test_derive_skips_truncated_leading_bucket(tmp_path):
+    """Tests that history starting mid-bucket does not produce a partial first candle."""
+    store = CandleStore(str(tmp_path))
+    store.append("ETH", "1m", make_1m("2024-01-01 00:07", 13))
+    derive_timeframes(store, "ETH", ["10m"])
+
+    assert store.read("ETH", "10m")["timestamp"].tolist() == [pd.Timestamp("2024-01-01 00:10")]
+
+def test_incremental_resampler_emits_on_close():
+    """Tests that a bar is emitted exactly when its last base candle arrives."""
+    resampler = IncrementalResampler("5m")
+    df = make_1m("2024-01-01", 12)
+
+    assert resampler.update(df.iloc[:4]).empty
+    closed = resampler.update(df.iloc[4:5])
+    assert closed["timestamp"].tolist() == [pd.Timestamp("2024-01-01 00:00")]
+    assert closed["volume"].iloc[0] == 5.0
+
+    closed = resampler.update(df.iloc[5:12])
+    assert closed["timestamp"].tolist() == [pd.Timestamp("2024-01-01 00:05")]
+    assert resampler.partial()["volume"].iloc[0] == 2.0
+
+def test_incremental_resampler_closes_bucket_on_gap():
+    """Tests that a later bucket's candle closes a bucket missing its final candle."""
+    resampler = IncrementalResampler("5m")
+    df = make_1m("2024-01-01", 10)
+
+    resampler.update(df.iloc[:3])
+    closed = resampler.update(df.iloc[6:7])
+    assert closed["volume"].tolist() == [3.0]
+
+@pytest.mark.parametrize("timeframe", ["1M", "1y"])
+def test_calendar_timeframes_are_rejected(timeframe):
+    """Tests that variable-length timeframes are refused."""
+    with pytest.raises(ValueError):
+        resample_ohlcv(make_1m("2024-01-01", 2), timeframe)
@@ -0,0 +1,128 @@
+# tests/test_trade_loop.py
+import os
+import pytest
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from unittest.mock import AsyncMock, MagicMock
+import src.core.candle_cache as candle_cache
+import src.trade_loop as trade_loop
+from src.core.candle_cache import CandleCache
+from src.core.candle_scheduler import now_ms
+from src.core.model_registry import ModelRegistry, model_filename, write_checksum
+from src.core.native_model import export_native
+from src.trade_loop import PairState, TradeLoop, parse_trading_pairs
+from src.shared.event_bus import EventBus, OrderFilled, PredictionMade
+from src.shared.indicators import add_indicators
+
+def hourly_candles(count: int, seed: int = 0) -> pd.DataFrame:
+    """`count` hourly candles ending with the last closed one; the last close is 100."""
+    last_closed = (now_ms() // 3_600_000 - 1) * 3_600_000
+    close = 100.0 + np.random.default_rng(seed).normal(size=count).cumsum()
+    close += 100.0 - close[-1]
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(last_closed - 3_600_000 * np.arange(count)[::-1], unit="ms"),
+        "open": close - 0.5, "high": close + 1.0, "low": close - 1.0, "close": close, "volume": np.full(count, 5.0),
+    })
+
+def test_parse_trading_pairs(tmp_path):
+    """Tests that TRADING_PAIRS is parsed, de-duplicated and that "all" lists trained models."""
+    assert parse_trading_pairs("BTC:1h, eth/usdt:15m,BTC:1h") == [("BTC", "1h"), ("ETH", "15m")]
+    with pytest.raises(ValueError):
+        parse_trading_pairs("BTC")
+    with pytest.raises(ValueError):
+        parse_trading_pairs("BTC:1x")
+
+    for name in ("BTCUSDT_1h_model.pkl", "1000PEPEUSDT_5m_model.pkl", "notes.txt"):
+        (tmp_path / name).touch()
+    assert parse_trading_pairs("all", str(tmp_path)) == [("1000PEPE", "5m"), ("BTC", "1h")]
+
+@pytest.mark.asyncio
+async def test_run_group_keeps_per_pair_positions(monkeypatch):
+    """Tests that a group is fetched together and each pair trades from its own position state."""
+    models = {}
+
+    def pair(symbol, timeframe, label, in_position=False):
+        model = models[symbol] = MagicMock()
+        model.predict.side_effect = lambda X: np.full(len(X), label)
+        model.predict_proba.side_effect = lambda X: np.tile([0.25, 0.75], (len(X), 1))
+        return PairState(symbol, timeframe, 1.0, CandleCache(symbol, timeframe), in_position=in_position)
+
+    pairs = [pair("BTC", "1h", 1), pair("ETH", "1h", -1, in_position=True),
+             pair("SOL", "1h", 1, in_position=True), pair("XRP", "1h", 1)]
+    market_data = hourly_candles(60)
+    fetch = AsyncMock(side_effect=lambda symbol, **kwargs: None if symbol == "XRP" else market_data)
+    monkeypatch.setattr(candle_cache, "fetch_ohlcv_data", fetch)
+    monkeypatch.setattr(trade_loop.config, "ENABLE_REALTIME_FEATURES", False)
+
+    loop = TradeLoop.__new__(TradeLoop)
+    loop.models = MagicMock()
+    loop.models.get.side_effect = lambda symbol, timeframe: models[symbol]
+    loop.event_bus = EventBus()
+    loop.writer = MagicMock()
+    loop.order_executor = MagicMock()
+    loop.order_executor.create_order = AsyncMock(return_value={"id": "1", "price": 100.0})
+    events = loop.event_bus.subscribe()
+
+    await loop.run_group(pairs)
+
+    assert fetch.await_count == 4
+    assert [p.in_position for p in pairs] == [True, False, True, False]
+    sides = sorted(call.args[:3] for call in loop.order_executor.create_order.await_args_list)
+    assert sides == [("BTC/USDT", "market", "buy"), ("ETH/USDT", "market", "sell")]
+    published = events.drain()
+    assert not [e for e in published if isinstance(e, PredictionMade)]  # stored ones wait for their commit
+    assert len([e for e in published if isinstance(e, OrderFilled)]) == 2
+    models["XRP"].predict.assert_not_called()
+    assert loop.writer.log_trade.call_count == 2
+    assert sorted(c.args for c in loop.writer.log_prediction.call_args_list) == [
+        ("BTC", "1h", "buy", 75.0), ("ETH", "1h", "sell", 75.0), ("SOL", "1h", "buy", 75.0)]
+
+    loop._on_committed([{"table": "trades"}, {"table": "predictions", "symbol": "BTC", "timeframe": "1h",
+                                              "signal": "buy", "confidence": 75.0, "price": 100.0}])
+    [event] = events.drain()
+    assert (event.symbol, event.signal, event.confidence, event.price) == ("BTC", "buy", 75.0, 100.0)
+
+def test_streamed_candle_feeds_cache_and_bus():
+    """Tests that a streamed closed candle makes the pair's cache current and is published."""
+    cache = CandleCache("BTC", "1m")
+    loop = TradeLoop.__new__(TradeLoop)
+    loop.pairs = {("BTC", "1m"): PairState("BTC", "1m", 1.0, cache)}
+    loop.event_bus = EventBus()
+    events = loop.event_bus.subscribe()
+
+    loop._on_streamed_candle("BTC", "1m", [60_000, 1.0, 2.0, 0.5, 1.5, 10.0])
+
+    assert cache.is_current(120_000) and cache.frame()["close"].tolist() == [1.5]
+    [event] = events.drain()
+    assert (event.symbol, event.timeframe, event.timestamp, event.close) == ("BTC", "1m", 60_000, 1.5)
+
+@pytest.mark.asyncio
+async def test_hot_reload_swaps_in_models_trained_on_indicators(tmp_path):
+    """Tests that a retrained model on the training pipeline's indicator features passes the smoke test."""
+    history = add_indicators(hourly_candles(300, seed=1))
+    features = [c for c in history.columns if c != "timestamp"]
+    target = (history["close"].shift(-1) > history["close"]).astype(int)
+    path = str(tmp_path / model_filename("BTC", "1h"))
+
+    def train(trees):
+        model = xgb.XGBClassifier(n_estimators=trees, max_depth=2, n_jobs=1).fit(history[features], target)
+        export_native(model, path, features)
+        write_checksum(path)
+
+    train(5)
+    cache = CandleCache("BTC", "1h")
+    cache._merge(hourly_candles(60), now_ms())
+    loop = TradeLoop.__new__(TradeLoop)
+    loop.pairs = {("BTC", "1h"): PairState("BTC", "1h", 1.0, cache)}
+    loop.models = ModelRegistry(str(tmp_path))
+    loop.models.discover()
+    first = loop.models.get("BTC", "1h")
+    [(signal, _)] = loop._predict([(loop.pairs[("BTC", "1h")], cache.frame())])
+    assert signal in ("buy", "hold")
+
+    train(10)
+    os.utime(path, ns=(1, 1))
+    assert await loop._reload_models() == [("BTC", "1h")]
+    assert loop.models.promote() == [("BTC", "1h")]
+    assert loop.models.get("BTC", "1h") is not first and loop.models.rollbacks == 0